@@ -0,0 +1,7 @@
+"""
+Offline benchmarks for the database and the auth/link/unlink hot paths.
+
+Run `python -m benchmarks --help`. Nothing here talks to Discord or the real
+external APIs: Fenix, Mojang and the whitelist panel are served by the stubs
+in `src.server.stubs`, and interactions are faked.
+"""
@@ -0,0 +1,107 @@
+"""
+Usage:
+    python -m benchmarks [--suite db flows records] [--sizes 1000 10000 100000]
+                         [--backend tinydb sqlite] [--json results.json]
+                         [--compare baseline.json]
+"""
+
+import argparse
+import json
+import logging
+import platform
+import shutil
+import subprocess
+import sys
+import time
+
+from benchmarks.environment import WORK_DIR  # Must come before anything importing `src`
+from benchmarks import bench_db, bench_flows, bench_records
+from benchmarks.common import Result, format_table
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_baseline(path: str | None) -> dict[tuple[str, str, int, str], Result]:
+    if path is None:
+        return {}
+    with open(path) as f:
+        results = [Result(**raw) for raw in json.load(f)["results"]]
+    return {result.key: result for result in results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    parser.add_argument(
+        "--suite",
+        nargs="+",
+        choices=("db", "flows", "records"),
+        default=["db", "flows", "records"],
+    )
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1_000, 10_000, 100_000])
+    parser.add_argument(
+        "--backend",
+        nargs="+",
+        choices=("tinydb", "tinydb-wb", "sqlite"),
+        default=["tinydb", "sqlite"],
+        help="tinydb-wb is TinyDB with write-behind",
+    )
+    parser.add_argument("--iterations", type=int, default=1000, help="calls per read")
+    parser.add_argument(
+        "--write-iterations",
+        type=int,
+        default=20,
+        help="calls per write or full scan (a TinyDB write rewrites the whole file)",
+    )
+    parser.add_argument("--flow-iterations", type=int, default=50, help="calls per flow")
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="JSON results to compare against")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    baseline = load_baseline(args.compare)
+
+    results: list[Result] = []
+    if "db" in args.suite:
+        results += bench_db.run(
+            args.sizes, args.backend, args.iterations, args.write_iterations, WORK_DIR
+        )
+    if "flows" in args.suite:
+        results += bench_flows.run(args.sizes, args.backend, args.flow_iterations, WORK_DIR)
+    if "records" in args.suite:
+        results += bench_records.run(args.sizes)
+
+    print(format_table(results, baseline))
+    if "records" in args.suite:
+        print(bench_records.summary(results))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "commit": git_commit(),
+                    "timestamp": time.time(),
+                    "python": sys.version.split()[0],
+                    "platform": platform.platform(),
+                    "args": vars(args),
+                    "results": [result.to_dict() for result in results],
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
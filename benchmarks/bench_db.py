@@ -0,0 +1,109 @@
+"""Database operations on synthetic datasets, through the synchronous API."""
+
+import itertools
+import os
+import tempfile
+from typing import Iterator
+
+from src.db.db import Database
+from src.db.player import ISTPlayer
+
+from benchmarks.common import Result, measure, measure_once
+from benchmarks.fakes import (
+    INVITE_LIMIT,
+    discord_id,
+    ist_id,
+    load_database,
+    write_dataset,
+)
+
+
+def _spread(size: int) -> Iterator[int]:
+    """Indices visiting the whole dataset in a cache-unfriendly order."""
+    step = 7919  # prime, so every index comes up before one repeats
+    return itertools.cycle((i * step) % size for i in range(size))
+
+
+def bench_database(
+    database: Database, size: int, backend: str, iterations: int, write_iterations: int
+) -> list[Result]:
+    ist_count = max(1, size * 4 // 5)
+    any_player = _spread(size)
+    linked = _spread(ist_count // 2 or 1)
+    new_ids = itertools.count(10**7)
+    renames = itertools.count()
+
+    def search_discord_id() -> None:
+        database.search_discord_id(discord_id(next(any_player)))
+
+    def search_minecraft_name() -> None:
+        # Lookups are case-insensitive, so don't hit the stored spelling
+        database.search_minecraft_name(f"player{next(linked) * 2}")
+
+    def add_ist() -> None:
+        n = next(new_ids)
+        database.add_ist(
+            ISTPlayer(
+                id=ist_id(n),
+                discord_id=discord_id(n),
+                minecraft_name=None,
+                invited_ids=[],
+                invite_limit=INVITE_LIMIT,
+            )
+        )
+
+    def update_player() -> None:
+        n = next(renames)
+        i = (n * 7919) % ist_count
+        database.update_player(
+            ISTPlayer(
+                id=ist_id(i),
+                discord_id=discord_id(i),
+                minecraft_name=f"Renamed{n}",
+                minecraft_uuid=None,
+                invited_ids=[],
+                invite_limit=INVITE_LIMIT,
+            )
+        )
+
+    def get_all_players() -> None:
+        database.get_all_players()
+
+    def scan_names() -> None:
+        for _ in database.iter_players(fields=("minecraft_name",)):
+            pass
+
+    return [
+        measure("db", "search_discord_id", size, backend, search_discord_id, iterations),
+        measure("db", "search_minecraft_name", size, backend, search_minecraft_name, iterations),
+        measure("db", "add_ist", size, backend, add_ist, write_iterations),
+        measure("db", "update_player", size, backend, update_player, write_iterations),
+        measure("db", "get_all_players", size, backend, get_all_players, write_iterations),
+        measure("db", "scan_names", size, backend, scan_names, write_iterations),
+    ]
+
+
+def run(
+    sizes: list[int],
+    backends: list[str],
+    iterations: int,
+    write_iterations: int,
+    work_dir: str,
+) -> list[Result]:
+    results: list[Result] = []
+    for backend in backends:
+        for size in sizes:
+            directory = tempfile.mkdtemp(prefix=f"db-{backend}-{size}-", dir=work_dir)
+            write_dataset(os.path.join(directory, "players.json"), size)
+
+            load, database = measure_once(
+                "db", "load", size, backend, lambda: load_database(backend, directory)
+            )
+            results.append(load)
+            try:
+                results += bench_database(
+                    database, size, backend, iterations, write_iterations
+                )
+            finally:
+                database.close()
+    return results
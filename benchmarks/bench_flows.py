@@ -0,0 +1,225 @@
+"""
+End-to-end auth, link and unlink flows against the local API stubs.
+
+The real handlers run unchanged: `/auth` and `/unlink` are the registered
+command callbacks, the callback goes over HTTP to the app built by
+`callback.create_app`, and `/link` submits a `MinecraftAccountLinking`
+modal. Only Discord (fake interactions and members) and the external APIs
+(stubs) are replaced.
+"""
+
+import asyncio
+import itertools
+import os
+import tempfile
+import uuid
+from typing import Any, Callable, Coroutine, cast
+from urllib.parse import parse_qs, urlparse
+
+import aiohttp
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+import src.constants as const
+from src.commands import load_commands
+from src.db import aio
+from src.modals.minecraft import MinecraftAccountLinking
+from src.server import callback, requests, stubs, web_server
+from src.server.http_client import http_client
+from src.server.pipeline import JobStatus
+from src.server.whitelist import whitelist_sync
+
+from benchmarks.common import MEMORY_ITERATIONS, Result, measure_async
+from benchmarks.fakes import (
+    FakeGuild,
+    FakeInteraction,
+    FakeRole,
+    FakeUser,
+    discord_id,
+    load_database,
+    write_dataset,
+)
+
+Callback = Callable[[Any], Coroutine[Any, Any, None]]
+
+
+def command_callback(bot: commands.Bot, name: str) -> Callback:
+    """The command's own callback, bypassing checks such as rate limits."""
+    command = bot.tree.get_command(name)
+    assert isinstance(command, app_commands.Command)
+    return cast(Callback, command.callback)
+
+
+def state_from_dm(user: FakeUser) -> str:
+    """The OAuth state in the login link /auth sent to `user`."""
+    url = next(line for line in user.dms[-1].splitlines() if "state=" in line)
+    return parse_qs(urlparse(url.strip()).query)["state"][0]
+
+
+class Flows:
+    def __init__(self, bot: commands.Bot, base_url: str, session: aiohttp.ClientSession):
+        self.auth = command_callback(bot, "auth")
+        self.unlink = command_callback(bot, "unlink")
+        self.base_url = base_url
+        self.session = session
+        self.guild = FakeGuild()
+        self.new_users = itertools.count(10**7)
+        const.guild = cast(discord.Guild, self.guild)
+
+    def user(self, user_id: int) -> FakeUser:
+        user = self.guild.members.get(user_id)
+        if user is None:
+            user = self.guild.members[user_id] = FakeUser(user_id)
+        return user
+
+    def interaction(self, user: FakeUser) -> Any:
+        return FakeInteraction(user, self.guild)
+
+    async def run_auth(self) -> tuple[FakeUser, str]:
+        """Run /auth for a new user. Returns the user and its OAuth state."""
+        user = self.user(int(discord_id(next(self.new_users))))
+        await self.auth(self.interaction(user))
+        return user, state_from_dm(user)
+
+    async def callback(self, state: str, code: str) -> None:
+        async with self.session.get(
+            f"{self.base_url}/callback", params={"code": code, "state": state}
+        ) as response:
+            await response.read()
+            if response.status != 202:
+                raise RuntimeError(f"Callback answered {response.status}")
+
+    async def auth_e2e(self) -> None:
+        """/auth, the OAuth callback, and the pipeline until the welcome DM."""
+        user, state = await self.run_auth()
+        user.dm_received.clear()
+        await self.callback(state, f"ist{user.id}")
+        job = web_server.auth_pipeline.status(state)
+        while job is None or job.status not in (JobStatus.DONE, JobStatus.FAILED):
+            await user.dm_received.wait()
+            user.dm_received.clear()
+            job = web_server.auth_pipeline.status(state)
+        if job.status is not JobStatus.DONE:
+            raise RuntimeError(f"Auth job failed in '{job.stage}': {job.message}")
+
+    async def link(self, user: FakeUser, name: str) -> None:
+        interaction = self.interaction(user)
+        modal = MinecraftAccountLinking()
+        modal.mc_username._refresh_state(interaction, {"value": name})  # pyright: ignore[reportPrivateUsage, reportArgumentType]
+        await modal.on_submit(interaction)
+        if not interaction.response.messages[-1].startswith("Okay"):
+            raise RuntimeError(f"Link failed: {interaction.response.messages[-1]}")
+
+    async def run_unlink(self, user: FakeUser) -> None:
+        interaction = self.interaction(user)
+        await self.unlink(interaction)
+        if "unlinked" not in interaction.response.messages[-1]:
+            raise RuntimeError(f"Unlink failed: {interaction.response.messages[-1]}")
+
+
+async def bench_size(
+    flows: Flows, size: int, backend: str, iterations: int, prefix: str
+) -> list[Result]:
+    calls = iterations + MEMORY_ITERATIONS
+    results: list[Result] = []
+
+    # /auth alone, collecting the states for the callback benchmark
+    states: list[tuple[str, str]] = []
+
+    async def auth() -> None:
+        user, state = await flows.run_auth()
+        states.append((state, f"ist{user.id}"))
+
+    results.append(await measure_async("flows", "auth_command", size, backend, auth, iterations))
+
+    pending = iter(states)
+
+    async def callback() -> None:
+        state, code = next(pending)
+        await flows.callback(state, code)
+
+    results.append(await measure_async("flows", "callback", size, backend, callback, iterations))
+    results.append(
+        await measure_async("flows", "auth_e2e", size, backend, flows.auth_e2e, iterations)
+    )
+
+    # /link then /unlink for existing, unlinked IST players (odd indices)
+    ist_count = max(1, size * 4 // 5)
+    unlinked = [i for i in range(1, ist_count, 2)][:calls]
+    if len(unlinked) < calls:
+        raise ValueError(f"Dataset of {size} is too small for {iterations} iterations")
+    users = [flows.user(int(discord_id(i))) for i in unlinked]
+    names = (f"{prefix}{n}" for n in itertools.count())
+    to_link = iter(users)
+    to_unlink = iter(users)
+
+    async def link() -> None:
+        await flows.link(next(to_link), next(names))
+
+    async def unlink() -> None:
+        await flows.run_unlink(next(to_unlink))
+
+    results.append(await measure_async("flows", "link_modal", size, backend, link, iterations))
+    results.append(await measure_async("flows", "unlink_command", size, backend, unlink, iterations))
+    return results
+
+
+async def run_async(
+    sizes: list[int], backends: list[str], iterations: int, work_dir: str
+) -> list[Result]:
+    calls = iterations + MEMORY_ITERATIONS
+    # Fresh Minecraft names per run, so every link misses the UUID cache
+    prefixes = {
+        key: f"B{n}x" for n, key in enumerate(itertools.product(backends, sizes))
+    }
+    profiles = {
+        f"{prefix}{n}": uuid.uuid4().hex for prefix in prefixes.values() for n in range(calls)
+    }
+
+    const.ist_player_role = cast(discord.Role, FakeRole("IST Player"))
+    const.guest_player_role = cast(discord.Role, FakeRole("Guest Player"))
+    const.linked_player_role = cast(discord.Role, FakeRole("Linked Player"))
+
+    bot = commands.Bot(command_prefix="?", intents=discord.Intents.none())
+    load_commands(bot)
+
+    results: list[Result] = []
+    async with (
+        stubs.run_stub(stubs.mojang_app(profiles)) as mojang_url,
+        stubs.run_stub(stubs.whitelist_app()) as whitelist_url,
+        stubs.run_stub(stubs.fenix_app()) as fenix_url,
+        stubs.run_stub(callback.create_app(web_server.local_logins)) as base_url,
+        aiohttp.ClientSession() as browser,
+    ):
+        requests.MOJANG_API_URL = requests.MOJANG_SERVICES_URL = mojang_url
+        requests.WHITELIST_URL = f"{whitelist_url}/v1/server/whitelist"
+        callback.FENIX_BASE_URL = fenix_url
+
+        await http_client.start()
+        callback.state_store.start()
+        web_server.auth_pipeline.start()
+        whitelist_sync.start(reconcile=False)
+        flows = Flows(bot, base_url, browser)
+        try:
+            for backend in backends:
+                for size in sizes:
+                    directory = tempfile.mkdtemp(prefix=f"flows-{backend}-{size}-", dir=work_dir)
+                    write_dataset(os.path.join(directory, "players.json"), size)
+                    previous = aio.db.database
+                    aio.db.database = load_database(backend, directory)
+                    previous.close()
+                    results += await bench_size(
+                        flows, size, backend, iterations, prefixes[backend, size]
+                    )
+        finally:
+            await web_server.auth_pipeline.stop()
+            await whitelist_sync.stop()
+            await callback.state_store.stop()
+            await http_client.close()
+            await aio.db.close()
+    return results
+
+
+def run(sizes: list[int], backends: list[str], iterations: int, work_dir: str) -> list[Result]:
+    return asyncio.run(run_async(sizes, backends, iterations, work_dir))
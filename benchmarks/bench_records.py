@@ -0,0 +1,81 @@
+"""
+Memory held by an in-memory roster: plain dicts (as loaded from JSON) vs the
+compact records of `src.db.records`.
+"""
+
+import gc
+import json
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from src.db.records import StringPool, record_from_dict
+
+from benchmarks.common import Result
+from benchmarks.fakes import make_players
+
+
+def roster_memory(
+    suite: str, op: str, size: int, build: Callable[[], list[Any]]
+) -> Result:
+    """Build a roster of `size` players and measure what it keeps allocated."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        roster = build()
+        elapsed = time.perf_counter() - start
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del roster
+    return Result(
+        suite=suite,
+        op=op,
+        size=size,
+        backend="-",
+        iterations=size,
+        ops_per_sec=size / elapsed if elapsed else 0.0,
+        p50_ms=0.0,
+        p99_ms=0.0,
+        # What the roster keeps once built, not the transient JSON decoding
+        peak_mem_kb=retained / 1024,
+    )
+
+
+def run(sizes: list[int]) -> list[Result]:
+    results: list[Result] = []
+    for size in sizes:
+        ist_players, invited_players = make_players(size)
+        # Round-trip through JSON so nothing is shared, as after a real load
+        payload = json.dumps([*ist_players, *invited_players])
+        del ist_players, invited_players
+
+        dicts = roster_memory("records", "roster_dicts", size, lambda: json.loads(payload))
+
+        def build_records() -> list[Any]:
+            pool: StringPool = {}  # Dropped once built, as in Database.__init__
+            return [record_from_dict(data, pool) for data in json.loads(payload)]
+
+        records = roster_memory("records", "roster_records", size, build_records)
+        results += [dicts, records]
+    return results
+
+
+def summary(results: list[Result]) -> str:
+    """Bytes saved per player and per 100k players, for each size."""
+    by_size: dict[int, dict[str, Result]] = {}
+    for result in results:
+        by_size.setdefault(result.size, {})[result.op] = result
+    lines: list[str] = []
+    for size, ops in sorted(by_size.items()):
+        dicts, records = ops["roster_dicts"], ops["roster_records"]
+        saved = (dicts.peak_mem_kb - records.peak_mem_kb) * 1024
+        lines.append(
+            f"records {size:>8}: {dicts.peak_mem_kb * 1024 / size:6.0f} B/player as dicts,"
+            f" {records.peak_mem_kb * 1024 / size:6.0f} B/player as records,"
+            f" {saved / size * 100_000 / 2**20:7.1f} MB saved per 100k players"
+            f" ({saved / (dicts.peak_mem_kb * 1024):.0%})"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,295 @@
+"""
+Load generator for concurrent OAuth callbacks.
+
+For each concurrency level, pre-registers `--requests` logins through
+`create_auth_url` (for fake guild members), then has that many clients hit
+`/callback` on the real web app as fast as they can. Fenix is a local stub
+with injectable latency and error rate. Reports throughput, tail latency,
+response statuses, contention on the in-memory state store's lock
+(`--state-store memory` only), and tasks still alive once the level has
+drained (leaks).
+
+Usage:
+    python -m benchmarks.callback_load --concurrency 1 10 50 100 200 \\
+        --requests 2000 --fenix-latency 0.05 --fenix-error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, cast
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.environment import WORK_DIR  # Must come before anything importing `src`
+
+import aiohttp
+import discord
+
+import src.constants as const
+from src.db import aio
+from src.server import callback, stubs, web_server
+from src.server.http_client import http_client
+from src.server.state_store import MemoryStateStore, SQLiteStateStore
+
+from benchmarks.common import percentile
+from benchmarks.fakes import (
+    FakeGuild,
+    FakeRole,
+    FakeUser,
+    load_database,
+    write_dataset,
+)
+
+
+class InstrumentedLock(asyncio.Lock):
+    """asyncio.Lock recording how long acquirers wait and how long it is held."""
+
+    def __init__(self):
+        super().__init__()
+        self.reset()
+
+    def reset(self) -> None:
+        self.acquires = 0
+        self.contended = 0
+        self.waits: list[float] = []
+        self.holds: list[float] = []
+        self._acquired_at = 0.0
+
+    async def acquire(self) -> bool:
+        start = time.perf_counter()
+        if self.locked():
+            self.contended += 1
+        result = await super().acquire()
+        self._acquired_at = time.perf_counter()
+        self.acquires += 1
+        self.waits.append(self._acquired_at - start)
+        return result
+
+    def release(self) -> None:
+        self.holds.append(time.perf_counter() - self._acquired_at)
+        super().release()
+
+
+@dataclass(slots=True)
+class LevelReport:
+    concurrency: int
+    requests: int
+    seconds: float
+    requests_per_sec: float
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    p999_ms: float
+    max_ms: float
+    statuses: dict[str, int]
+    lock_acquires: int
+    lock_contended: int
+    lock_wait_p99_ms: float
+    lock_wait_max_ms: float
+    lock_hold_max_ms: float
+    pending_auth_left: int
+    leaked_tasks: dict[str, int]
+
+
+def task_name(task: asyncio.Task[Any]) -> str:
+    coro = task.get_coro()
+    return getattr(coro, "__qualname__", None) or task.get_name()
+
+
+# Alive after a level without being leaks: aiohttp's per-connection server
+# handler, kept while `http_client` pools a keep-alive connection to a stub,
+# and the inner task of a background loop's timed `asyncio.wait_for`, there
+# or not depending on whether its queue has anything due
+TRANSIENT_TASKS = frozenset({"RequestHandler.start", "Event.wait"})
+
+
+def live_task_names() -> collections.Counter[str]:
+    """
+    Running tasks by name, bar `TRANSIENT_TASKS`. Compared by name rather
+    than identity, since background loops keep replacing their inner tasks.
+    """
+    current = asyncio.current_task()
+    return collections.Counter(
+        name
+        for task in asyncio.all_tasks()
+        if not task.done() and task is not current
+        and (name := task_name(task)) not in TRANSIENT_TASKS
+    )
+
+
+async def register_logins(guild: FakeGuild, count: int, first_id: int) -> list[tuple[str, str]]:
+    """Create `count` pending logins. Returns their (state, code) pairs."""
+    logins: list[tuple[str, str]] = []
+    for user_id in range(first_id, first_id + count):
+        guild.members[user_id] = FakeUser(user_id)
+        url = await callback.create_auth_url(user_id)
+        state = parse_qs(urlparse(url).query)["state"][0]
+        logins.append((state, f"ist{user_id}"))
+    return logins
+
+
+async def run_level(
+    base_url: str,
+    logins: list[tuple[str, str]],
+    concurrency: int,
+    lock: InstrumentedLock,
+) -> LevelReport:
+    await asyncio.sleep(0.1)  # Let the reapers pick up the new logins first
+    baseline_tasks = live_task_names()
+    latencies: list[float] = []
+    statuses: collections.Counter[str] = collections.Counter()
+    queue = collections.deque(logins)
+    lock.reset()
+
+    async def client() -> None:
+        while queue:
+            state, code = queue.popleft()
+            start = time.perf_counter()
+            try:
+                async with session.get(
+                    f"{base_url}/callback", params={"code": code, "state": state}
+                ) as response:
+                    await response.read()
+                    statuses[str(response.status)] += 1
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+    connector = aiohttp.TCPConnector(limit=0)  # Don't cap the client's concurrency
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    # Let the jobs the callbacks queued finish and the server notice the
+    # closed keep-alive connections, then see what's still running
+    await web_server.auth_pipeline.join()
+    await asyncio.sleep(0.1)
+    leaked = live_task_names() - baseline_tasks
+
+    latencies.sort()
+    return LevelReport(
+        concurrency=concurrency,
+        requests=len(latencies),
+        seconds=elapsed,
+        requests_per_sec=len(latencies) / elapsed if elapsed else 0.0,
+        p50_ms=percentile(latencies, 0.50) * 1000,
+        p90_ms=percentile(latencies, 0.90) * 1000,
+        p99_ms=percentile(latencies, 0.99) * 1000,
+        p999_ms=percentile(latencies, 0.999) * 1000,
+        max_ms=(latencies[-1] if latencies else 0.0) * 1000,
+        statuses=dict(statuses),
+        lock_acquires=lock.acquires,
+        lock_contended=lock.contended,
+        lock_wait_p99_ms=percentile(sorted(lock.waits), 0.99) * 1000,
+        lock_wait_max_ms=max(lock.waits, default=0.0) * 1000,
+        lock_hold_max_ms=max(lock.holds, default=0.0) * 1000,
+        pending_auth_left=len(callback.state_store),
+        leaked_tasks=dict(leaked),
+    )
+
+
+async def run(args: argparse.Namespace) -> list[LevelReport]:
+    directory = tempfile.mkdtemp(prefix="callback-load-", dir=WORK_DIR)
+    write_dataset(os.path.join(directory, "players.json"), args.players)
+    previous = aio.db.database
+    aio.db.database = load_database(args.backend, directory)
+    previous.close()
+
+    guild = FakeGuild()
+    const.guild = cast(discord.Guild, guild)
+    const.ist_player_role = cast(discord.Role, FakeRole("IST Player"))
+
+    # Handlers look the store up on each call, so it can be swapped here
+    lock = InstrumentedLock()
+    capacity, ttl = callback.MAX_PENDING_AUTH, callback.CONNECTION_CLEANUP_TIMEOUT
+    if args.state_store == "sqlite":
+        store = SQLiteStateStore(capacity, ttl, os.path.join(directory, "auth_state.sqlite3"))
+    else:
+        store = MemoryStateStore(capacity, ttl)
+        store.lock = lock
+    callback.state_store = store
+
+    reports: list[LevelReport] = []
+    async with (
+        stubs.run_stub(
+            stubs.fenix_app(args.fenix_latency, args.fenix_error_rate)
+        ) as fenix_url,
+        stubs.run_stub(callback.create_app(web_server.local_logins)) as base_url,
+    ):
+        callback.FENIX_BASE_URL = fenix_url
+        await http_client.start()
+        store.start()
+        web_server.auth_pipeline.start()
+
+        try:
+            next_user = 10**7
+            for concurrency in args.concurrency:
+                logins = await register_logins(guild, args.requests, next_user)
+                next_user += args.requests
+                report = await run_level(base_url, logins, concurrency, lock)
+                reports.append(report)
+                print(format_report(report), flush=True)
+        finally:
+            await web_server.auth_pipeline.stop()
+            await store.stop()
+            await http_client.close()
+            await aio.db.close()
+    return reports
+
+
+def format_report(report: LevelReport) -> str:
+    statuses = " ".join(f"{status}:{count}" for status, count in sorted(report.statuses.items()))
+    leaked = ", ".join(f"{name} x{count}" for name, count in report.leaked_tasks.items())
+    return (
+        f"concurrency {report.concurrency:>4}: {report.requests_per_sec:8.1f} req/s"
+        f" | p50 {report.p50_ms:8.2f} ms  p99 {report.p99_ms:8.2f} ms"
+        f"  p99.9 {report.p999_ms:8.2f} ms  max {report.max_ms:8.2f} ms"
+        f" | {statuses}"
+        f" | lock: {report.lock_contended}/{report.lock_acquires} contended,"
+        f" wait p99 {report.lock_wait_p99_ms:.3f} ms, max {report.lock_wait_max_ms:.3f} ms,"
+        f" hold max {report.lock_hold_max_ms:.3f} ms"
+        f" | leaked tasks: {leaked or 'none'}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.callback_load",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 10, 50, 100, 200])
+    parser.add_argument("--requests", type=int, default=1000, help="callbacks per level")
+    parser.add_argument("--fenix-latency", type=float, default=0.0, help="seconds per Fenix call")
+    parser.add_argument("--fenix-error-rate", type=float, default=0.0, help="fraction of Fenix 503s")
+    parser.add_argument("--players", type=int, default=1000, help="players already in the database")
+    parser.add_argument("--backend", choices=("tinydb", "tinydb-wb", "sqlite"), default="sqlite")
+    parser.add_argument("--state-store", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("--json", metavar="PATH", help="write the reports as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    reports = asyncio.run(run(args))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {"args": vars(args), "levels": [asdict(report) for report in reports]},
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
@@ -0,0 +1,147 @@
+import gc
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable
+
+# How many extra calls are traced to measure peak memory (tracing is slow)
+MEMORY_ITERATIONS = 20
+
+
+@dataclass(slots=True)
+class Result:
+    suite: str
+    op: str
+    size: int
+    backend: str
+    iterations: int
+    ops_per_sec: float
+    p50_ms: float
+    p99_ms: float
+    peak_mem_kb: float
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @property
+    def key(self) -> tuple[str, str, int, str]:
+        return (self.suite, self.op, self.size, self.backend)
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+def _result(
+    suite: str, op: str, size: int, backend: str, latencies: list[float], total: float, peak: int
+) -> Result:
+    latencies.sort()
+    return Result(
+        suite=suite,
+        op=op,
+        size=size,
+        backend=backend,
+        iterations=len(latencies),
+        ops_per_sec=len(latencies) / total if total else 0.0,
+        p50_ms=percentile(latencies, 0.50) * 1000,
+        p99_ms=percentile(latencies, 0.99) * 1000,
+        peak_mem_kb=peak / 1024,
+    )
+
+
+def measure(
+    suite: str,
+    op: str,
+    size: int,
+    backend: str,
+    func: Callable[[], Any],
+    iterations: int,
+) -> Result:
+    """Time `iterations` calls of `func`, then trace a few more for peak memory."""
+    gc.collect()
+    latencies: list[float] = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call_start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - call_start)
+    total = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        for _ in range(min(iterations, MEMORY_ITERATIONS)):
+            func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return _result(suite, op, size, backend, latencies, total, peak)
+
+
+async def measure_async(
+    suite: str,
+    op: str,
+    size: int,
+    backend: str,
+    func: Callable[[], Awaitable[Any]],
+    iterations: int,
+) -> Result:
+    """Like `measure`, awaiting each call in turn."""
+    gc.collect()
+    latencies: list[float] = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call_start = time.perf_counter()
+        await func()
+        latencies.append(time.perf_counter() - call_start)
+    total = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        for _ in range(min(iterations, MEMORY_ITERATIONS)):
+            await func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return _result(suite, op, size, backend, latencies, total, peak)
+
+
+def measure_once(
+    suite: str, op: str, size: int, backend: str, func: Callable[[], Any]
+) -> tuple[Result, Any]:
+    """Time and trace a single expensive call (e.g. loading a dataset)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        value = func()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return _result(suite, op, size, backend, [elapsed], elapsed, peak), value
+
+
+def format_table(results: list[Result], baseline: dict[tuple[str, str, int, str], Result]) -> str:
+    # Wide enough for the longest backend name ("tinydb-wb") or the header
+    backend_width = max([len("backend"), *(len(result.backend) for result in results)])
+    header = (
+        f"{'suite':<6} {'backend':<{backend_width}} {'size':>7} {'op':<24} {'ops/s':>11}"
+        f" {'p50 ms':>9} {'p99 ms':>9} {'peak KB':>10}"
+    )
+    if baseline:
+        header += f" {'p50 vs base':>12}"
+    lines = [header, "-" * len(header)]
+    for result in results:
+        line = (
+            f"{result.suite:<6} {result.backend:<{backend_width}} {result.size:>7} {result.op:<24}"
+            f" {result.ops_per_sec:>11.1f} {result.p50_ms:>9.3f} {result.p99_ms:>9.3f}"
+            f" {result.peak_mem_kb:>10.1f}"
+        )
+        base = baseline.get(result.key)
+        if base is not None and base.p50_ms:
+            line += f" {result.p50_ms / base.p50_ms:>11.2f}x"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,19 @@
+"""
+Settings for benchmark runs, applied on import.
+
+`src` reads its settings when it is imported, so entry points import this
+module before anything from `src`. It keeps benchmark data out of the real
+data directory, and lifts the rate limits and the pending-login cap so they
+don't throttle the load being generated.
+"""
+
+import os
+import tempfile
+
+WORK_DIR = tempfile.mkdtemp(prefix="benchmarks-")
+
+os.environ["DB_DIR"] = WORK_DIR
+os.environ.setdefault("CALLBACK_IP_CALLS", "1000000000")
+os.environ.setdefault("CALLBACK_GLOBAL_CALLS", "1000000000")
+os.environ.setdefault("MAX_PENDING_AUTH", "1000000")
+os.environ.setdefault("FENIX_CLIENT_ID", "benchmark")
@@ -0,0 +1,174 @@
+"""Synthetic player datasets and stand-ins for the Discord objects the handlers use."""
+
+import asyncio
+import itertools
+import os
+import uuid
+from typing import Any
+
+from src.db.db import Database
+from src.db.player import InvitedPlayer, ISTPlayer
+from src.db.storage import (
+    SQLiteStorage,
+    StorageBackend,
+    TinyDBStorage,
+    atomic_write_json,
+    migrate_json_to_sqlite,
+)
+
+DISCORD_ID_BASE = 300_000_000_000_000_000
+INVITE_LIMIT = 3
+
+
+# --------------------------
+# 🧪 DATASETS
+# --------------------------
+def ist_id(i: int) -> str:
+    return f"ist{i:07d}"
+
+
+def discord_id(i: int) -> str:
+    return str(DISCORD_ID_BASE + i)
+
+
+def make_players(size: int) -> tuple[list[ISTPlayer], list[InvitedPlayer]]:
+    """
+    `size` players: 80% IST players, every other one linked, and 20% invited
+    players, all linked, spread over the first IST players.
+    """
+    ist_count = max(1, size * 4 // 5)
+    ist_players = [
+        ISTPlayer(
+            id=ist_id(i),
+            discord_id=discord_id(i),
+            minecraft_name=f"Player{i}" if i % 2 == 0 else None,
+            minecraft_uuid=str(uuid.UUID(int=i)) if i % 2 == 0 else None,
+            invited_ids=[],
+            invite_limit=INVITE_LIMIT,
+        )
+        for i in range(ist_count)
+    ]
+    invited_players: list[InvitedPlayer] = []
+    for j in range(size - ist_count):
+        inviter = ist_players[(j // INVITE_LIMIT) % ist_count]
+        invited_players.append(
+            InvitedPlayer(
+                id=f"inv{j:07d}",
+                discord_id=discord_id(ist_count + j),
+                minecraft_name=f"Guest{j}",
+                minecraft_uuid=str(uuid.UUID(int=10**9 + j)),
+                invited_by=inviter["id"],
+            )
+        )
+        inviter["invited_ids"].append(invited_players[-1]["id"])
+    return ist_players, invited_players
+
+
+def write_dataset(path: str, size: int) -> None:
+    """Write a dataset in the TinyDB `players.json` layout."""
+    ist_players, invited_players = make_players(size)
+    atomic_write_json(
+        path,
+        {
+            "ist_players": {str(n): p for n, p in enumerate(ist_players, 1)},
+            "invited_players": {str(n): p for n, p in enumerate(invited_players, 1)},
+        },
+    )
+
+
+def open_storage(backend: str, directory: str) -> StorageBackend:
+    """Open the dataset in `directory` (written by `write_dataset`) with `backend`."""
+    json_path = os.path.join(directory, "players.json")
+    if backend == "tinydb":
+        return TinyDBStorage(json_path)
+    if backend == "tinydb-wb":
+        return TinyDBStorage(json_path, write_behind=True)
+    if backend == "sqlite":
+        storage = SQLiteStorage(os.path.join(directory, "players.sqlite3"))
+        migrate_json_to_sqlite(json_path, storage)
+        return storage
+    raise ValueError(f"Unknown backend '{backend}'")
+
+
+def load_database(backend: str, directory: str) -> Database:
+    return Database(open_storage(backend, directory))
+
+
+# --------------------------
+# 🤖 DISCORD
+# --------------------------
+class FakeRole:
+    def __init__(self, name: str):
+        self.id = hash(name)
+        self.name = name
+
+
+class FakeUser:
+    """A guild member: receives DMs and roles."""
+
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.roles: set[FakeRole] = set()
+        self.dms: list[str] = []
+        self.dm_received = asyncio.Event()
+
+    async def send(self, content: str = "", **kwargs: Any) -> None:
+        self.dms.append(content)
+        self.dm_received.set()
+
+    async def add_roles(self, *roles: FakeRole, **kwargs: Any) -> None:
+        self.roles.update(roles)
+
+    async def remove_roles(self, *roles: FakeRole, **kwargs: Any) -> None:
+        self.roles.difference_update(roles)
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int = 1):
+        self.id = guild_id
+        self.members: dict[int, FakeUser] = {}
+
+    def get_member(self, user_id: int) -> FakeUser | None:
+        return self.members.get(user_id)
+
+    async def fetch_member(self, user_id: int) -> FakeUser | None:
+        return self.members.get(user_id)
+
+
+class FakeResponse:
+    def __init__(self):
+        self.messages: list[str] = []
+        self.modal: Any = None
+
+    def is_done(self) -> bool:
+        return bool(self.messages) or self.modal is not None
+
+    async def send_message(self, content: str = "", **kwargs: Any) -> None:
+        self.messages.append(content)
+
+    async def send_modal(self, modal: Any) -> None:
+        self.modal = modal
+
+    async def defer(self, **kwargs: Any) -> None:
+        self.messages.append("")
+
+
+class FakeFollowup:
+    def __init__(self):
+        self.messages: list[str] = []
+
+    async def send(self, content: str = "", **kwargs: Any) -> None:
+        self.messages.append(content)
+
+
+_interaction_ids = itertools.count(1)
+
+
+class FakeInteraction:
+    def __init__(self, user: FakeUser, guild: FakeGuild | None):
+        self.id = next(_interaction_ids)
+        self.user = user
+        self.guild = guild
+        self.command = None
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
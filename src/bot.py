@@ -1,18 +1,30 @@
-import discord
+# Load environment variables before any module reads its settings
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Set up logging before anything logs, so every record goes through the queue
+from src.utils.log import setup_logging, stop_logging
+
+setup_logging()
+
+# Imported first so the READY time is measured from process start
+from src.utils.gateway import bot_options
+
 from discord.ext import commands
 
 import asyncio
-
-# Import custom modules
-from dotenv import load_dotenv
+import logging
 from os import getenv
 
+# Import custom modules
 from src.commands import load_commands
 from src.events import load_events
 from src.server import web_server
+from src.db.aio import db
+
+log = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
 token = getenv("BOT_TOKEN")
 
 
@@ -20,9 +32,8 @@ async def main():
     if token is None:
         raise ValueError("BOT_TOKEN environment variable is not set.")
 
-    # Create bot instance
-    intents = discord.Intents.all()
-    bot = commands.Bot(command_prefix="?", intents=intents)
+    # Create bot instance (intents and caches follow BOT_CACHE_PROFILE)
+    bot = commands.Bot(command_prefix="?", **bot_options())
 
     # Load commands and events
     load_commands(bot)
@@ -30,15 +41,21 @@ async def main():
 
     # Run bot
     try:
+        db.start()
         await web_server.start_server(bot)
         await bot.start(token)
     except KeyboardInterrupt:
-        print("\nShutting down gracefully...")
+        log.info("Shutting down gracefully...")
     except Exception as e:
-        print(f"An error occurred: {e}")
+        log.exception("An error occurred: %s", e)
     finally:
-        await bot.close()
-        await web_server.stop_server()
+        try:
+            # Stop the web server first so queued logins can still reach Discord
+            await web_server.stop_server()
+            await bot.close()
+        finally:
+            # Always flush buffered database writes, even if shutdown fails
+            await db.close()
 
 
 # Run the main async function
@@ -46,4 +63,7 @@ try:
     asyncio.run(main())
 except KeyboardInterrupt:
     # Catch the KeyboardInterrupt raised by asyncio.run()
-    print("\nProgram finished gracefull exit.")
+    log.info("Program finished gracefull exit.")
+finally:
+    # Write out whatever is still queued before the process exits
+    stop_logging()
@@ -1,16 +1,27 @@
+import logging
+
 import discord
 from discord.ext import commands
 from beartype import beartype
-from src.server import web_server
-from src.db.db import db
+from src.server import callback
+from src.db.aio import db
+from src.errors.server import AuthCapacityError
 import src.constants as const
+from src.utils.ratelimit import rate_limit
+from src.utils.log import bind_interaction
+from src.utils.metrics import track_command
+
+log = logging.getLogger(__name__)
 
 
 @beartype
 def setup(bot: commands.Bot) -> None:
     @bot.tree.command(name="auth", description="Authenticate to get access (Fenix)")
+    @rate_limit(user_calls=3, user_period=60, global_calls=10, global_period=1)
+    @track_command("auth")
     async def auth(interaction: discord.Interaction) -> None:
         """Authenticate the user with the web server."""
+        bind_interaction(interaction)
 
         # verify if this command is in a guild
         if interaction.guild is None:
@@ -23,7 +34,7 @@ def setup(bot: commands.Bot) -> None:
 
         # if the user already exists in the database
         try:
-            db.search_discord_id(str(interaction.user.id))
+            await db.search_discord_id(str(interaction.user.id))
             await interaction.response.send_message(
                 "You are already authenticated. If you think this is a mistake, please contact the server administrators.",
                 ephemeral=True,
@@ -37,7 +48,15 @@ def setup(bot: commands.Bot) -> None:
                 ephemeral=True,
                 delete_after=const.DEFAULT_MESSAGE_DELETE_DELAY,
             )
-            url = await web_server.create_auth_url(interaction)
+            try:
+                url = await callback.create_auth_url(interaction.user.id)
+            except AuthCapacityError as e:
+                log.warning("AuthCapacityError: %s", e.message)
+                await interaction.followup.send(
+                    "Too many authentications are in progress right now. Please try again in a few minutes.",
+                    ephemeral=True,
+                )
+                return
             await interaction.user.send(
                 "To authenticate, please click the link below:\n\n"
                 f"{url}\n\n"
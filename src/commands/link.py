@@ -3,6 +3,9 @@ from discord.ext import commands
 from beartype import beartype
 from src.modals.minecraft import MinecraftAccountLinking
 import src.constants as const
+from src.utils.ratelimit import rate_limit
+from src.utils.log import bind_interaction
+from src.utils.metrics import track_command
 
 
 @beartype
@@ -11,8 +14,11 @@ def setup(bot: commands.Bot) -> None:
         name="link",
         description="Get your minecraft account linked to your discord account",
     )
+    @rate_limit(user_calls=5, user_period=60, global_calls=10, global_period=1)
+    @track_command("link")
     async def link(interaction: discord.Interaction) -> None:
         """Link MC - Discord"""
+        bind_interaction(interaction)
 
         # verify if this command is in a guild
         if interaction.guild is None:
@@ -1,11 +1,13 @@
 import discord
 from discord.ext import commands
 from beartype import beartype
+from src.utils.metrics import track_command
 
 
 @beartype
 def setup(bot: commands.Bot) -> None:
     @bot.tree.command(name="ping", description="Ping command")
+    @track_command("ping")
     async def ping(interaction: discord.Interaction) -> None:
         await interaction.response.send_message("🏓 Pong from Skythentic!")
 
@@ -1,10 +1,18 @@
+import logging
+
 import discord
 from discord.ext import commands
 from beartype import beartype
-from src.errors.db import SearchError
-from src.db.db import db
+from src.errors.db import ConcurrentModificationError
+from src.db.aio import db
+from src.server.whitelist import whitelist_sync
 from src.server.requests import *
 import src.constants as const
+from src.utils.ratelimit import rate_limit
+from src.utils.log import bind_interaction
+from src.utils.metrics import track_command
+
+log = logging.getLogger(__name__)
 
 
 @beartype
@@ -13,8 +21,11 @@ def setup(bot: commands.Bot) -> None:
         name="unlink",
         description="Unlink your Minecraft account from your Discord account",
     )
+    @rate_limit(user_calls=5, user_period=60, global_calls=10, global_period=1)
+    @track_command("unlink")
     async def unlink(interaction: discord.Interaction) -> None:
         """unlink MC - Discord"""
+        bind_interaction(interaction)
 
         # verify if this command is in a guild
         if interaction.guild is None:
@@ -25,22 +36,40 @@ def setup(bot: commands.Bot) -> None:
             )
             return
 
-        # check for player in database
-        player = None
+        # Read and unlink in one transaction, so a /link that lands meanwhile
+        # makes the commit fail instead of being overwritten. The role and the
+        # whitelist are only touched once the unlink is stored.
         try:
-            player = db.search_discord_id(str(interaction.user.id))
-        except SearchError as e:
-            print(f"SearchError: {e.message}")
-            await interaction.response.send_message(
-                "You have not been Authenticated Yet. This command can only be ran by authenticated users.\n\nIf you think this was a mistake, please contact a staff member.",
-                ephemeral=True,
-                delete_after=const.DEFAULT_MESSAGE_DELETE_DELAY,
-            )
-            return
+            async with db.transaction() as tx:
+                # check for player in database
+                player = await tx.find_by_discord_id(str(interaction.user.id))
+                if player is None:
+                    log.info("No player found with discord_id: %s", interaction.user.id)
+                    await interaction.response.send_message(
+                        "You have not been Authenticated Yet. This command can only be ran by authenticated users.\n\nIf you think this was a mistake, please contact a staff member.",
+                        ephemeral=True,
+                        delete_after=const.DEFAULT_MESSAGE_DELETE_DELAY,
+                    )
+                    return
+
+                minecraft_name = player["minecraft_name"]
+                if not minecraft_name:
+                    await interaction.response.send_message(
+                        "You have not linked your Minecraft account yet.\n\nIf you think this was a mistake, please contact a staff member.",
+                        ephemeral=True,
+                        delete_after=const.DEFAULT_MESSAGE_DELETE_DELAY,
+                    )
+                    return
+                stored_uuid = player.get("minecraft_uuid")
 
-        if not player["minecraft_name"]:
+                # remove the minecraft name from the database
+                player["minecraft_name"] = None
+                player["minecraft_uuid"] = None
+                await tx.update_player(player)
+        except ConcurrentModificationError as e:
+            log.info("Unlink raced another change: %s", e.message)
             await interaction.response.send_message(
-                "You have not linked your Minecraft account yet.\n\nIf you think this was a mistake, please contact a staff member.",
+                "Your account changed while it was being unlinked. Please try again.\n\nIf you think this was a mistake, please contact a staff member.",
                 ephemeral=True,
                 delete_after=const.DEFAULT_MESSAGE_DELETE_DELAY,
             )
@@ -52,9 +81,9 @@ def setup(bot: commands.Bot) -> None:
                 assert const.linked_player_role, "Linked Player role is None"
                 await interaction.user.remove_roles(const.linked_player_role)
             else:
-                print("Interaction user is not a member of the guild.")
+                log.warning("Interaction user is not a member of the guild.")
         except Exception as e:
-            print(f"Failed to remove role from user: {e}")
+            log.error("Failed to remove role from user: %s", e)
             await interaction.response.send_message(
                 "Failed to remove role from user. Please contact a staff member.\n\nIf you think this was a mistake, please contact a staff member.",
                 ephemeral=True,
@@ -62,11 +91,9 @@ def setup(bot: commands.Bot) -> None:
             )
             return
 
-        # remove the player from the whitelist
-        try:
-            await remove_player_from_whitelist(player)
-        except Exception as e:
-            print(f"Failed to remove player from whitelist: {e}")
+        uuid = stored_uuid or await fetch_uuid_async(minecraft_name)
+        if not uuid:
+            log.error("Failed to resolve UUID for %s.", minecraft_name)
             await interaction.response.send_message(
                 "Failed to remove you from the Minecraft server whitelist. Please contact a staff member.\n\nIf you think this was a mistake, please contact a staff member.",
                 ephemeral=True,
@@ -74,9 +101,8 @@ def setup(bot: commands.Bot) -> None:
             )
             return
 
-        # remove the minecraft name from the database
-        player["minecraft_name"] = None
-        db.update_player(player)
+        # queue the removal from the whitelist
+        await whitelist_sync.enqueue_remove(uuid, minecraft_name)
 
         await interaction.response.send_message(
             "Your Minecraft account has been unlinked from your Discord account! to link it again, please use the `/link` command.",
@@ -6,6 +6,10 @@ DEFAULT_MESSAGE_DELETE_DELAY = 120
 # Server constants
 MAX_INVITES = 5
 
+# Bot constants
+# This is assigned once at runtime and should be treated as constant after assignment.
+bot: discord.Client | None = None
+
 # Guild constants
 GUILD_ID = 1346582307783577635
 # This is assigned once at runtime and should be treated as constant after assignment.
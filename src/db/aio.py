@@ -0,0 +1,278 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Iterable, Optional, ParamSpec, Sequence, TypeVar
+
+from src.db.db import DEFAULT_PAGE_SIZE, Database, Page, PageTable, db as sync_db
+from src.db.player import *
+from src.db.storage import DB_FLUSH_INTERVAL
+from src.db.transaction import Transaction
+from src.utils.metrics import db_duration, db_total, track
+
+log = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+class AsyncTransaction:
+    """
+    `Transaction` for the event loop, run on the database thread. Other
+    calls may interleave between the awaits; the commit catches any that
+    touched the same players.
+
+        async with db.transaction() as tx:
+            player = await tx.find_by_discord_id(discord_id)
+            await tx.update_player(...)
+    """
+
+    def __init__(self, database: "AsyncDatabase"):
+        self.database = database
+        self.tx = Transaction(database.database)
+
+    async def __aenter__(self) -> "AsyncTransaction":
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is None and not self.tx.attempted:
+            await self.commit()
+
+    async def find_player(self, player_id: str) -> ISTPlayer | InvitedPlayer | None:
+        return await self.database.run(self.tx.find_player, player_id)
+
+    async def find_by_discord_id(self, discord_id: str) -> ISTPlayer | InvitedPlayer | None:
+        return await self.database.run(self.tx.find_by_discord_id, discord_id)
+
+    async def find_by_minecraft_name(self, name: str) -> ISTPlayer | InvitedPlayer | None:
+        return await self.database.run(self.tx.find_by_minecraft_name, name)
+
+    # Writes are buffered, but they check the player they touch, so they
+    # also run on the database thread
+    async def add_ist(self, ist_player: ISTPlayer) -> None:
+        return await self.database.run(self.tx.add_ist, ist_player)
+
+    async def add_invited(self, invited_player: InvitedPlayer) -> None:
+        return await self.database.run(self.tx.add_invited, invited_player)
+
+    async def update(self, table: str, player: dict[str, Any]) -> None:
+        return await self.database.run(self.tx.update, table, player)
+
+    async def update_player(self, player: ISTPlayer | InvitedPlayer) -> None:
+        return await self.database.run(self.tx.update_player, player)
+
+    async def delete_player(self, player_id: str) -> None:
+        return await self.database.run(self.tx.delete_player, player_id)
+
+    async def commit(self) -> None:
+        await self.database.run(self.tx.commit)
+
+
+class AsyncDatabase:
+    """
+    Awaitable facade over `Database` for use on the event loop.
+
+    Every call is handed to a single dedicated worker thread, so storage I/O
+    never blocks the loop. Calls run one at a time in submission order, which
+    keeps read-your-writes ordering: an awaited `update_player` is always
+    visible to the next `search_*`.
+    """
+
+    def __init__(self, database: Database):
+        self.database = database
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="database"
+        )
+        self._flush_task: asyncio.Task[None] | None = None
+
+    async def run(self, func: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
+        """Call `func` on the database thread, after everything queued before it."""
+        loop = asyncio.get_running_loop()
+        with track(db_duration, db_total, func.__name__):
+            return await loop.run_in_executor(
+                self._executor, partial(func, *args, **kwargs)
+            )
+
+    def start(self, flush_interval: float = DB_FLUSH_INTERVAL) -> None:
+        """
+        Start the periodic flush of buffered (write-behind) writes. Nothing to
+        do when the storage writes through.
+        """
+        if (
+            self._flush_task is None
+            and flush_interval > 0
+            and self.database.storage.buffers_writes
+        ):
+            self._flush_task = asyncio.create_task(self._flush_loop(flush_interval))
+
+    async def _flush_loop(self, flush_interval: float) -> None:
+        while True:
+            await asyncio.sleep(flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                log.exception("Failed to flush the database: %s", e)
+
+    async def flush(self) -> None:
+        """Persist any buffered writes now."""
+        return await self.run(self.database.flush)
+
+    async def close(self) -> None:
+        """Drain pending operations, flush, and close the underlying database."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.run(self.database.close)
+        self._executor.shutdown(wait=True)
+
+    # --------------------------
+    # 👥 IST PLAYERS
+    # --------------------------
+    async def add_ist(self, ist_player: ISTPlayer) -> None:
+        return await self.run(self.database.add_ist, ist_player)
+
+    async def get_ist(self, ist_id: str) -> ISTPlayer:
+        return await self.run(self.database.get_ist, ist_id)
+
+    async def get_all_ist(self) -> list[ISTPlayer]:
+        return await self.run(self.database.get_all_ist)
+
+    async def update_ist(self, ist_player: ISTPlayer) -> None:
+        return await self.run(self.database.update_ist, ist_player)
+
+    async def delete_ist(self, ist_id: str) -> None:
+        return await self.run(self.database.delete_ist, ist_id)
+
+    # --------------------------
+    # 👥 INVITED PLAYERS
+    # --------------------------
+    async def add_invited(self, invited_player: InvitedPlayer) -> None:
+        return await self.run(self.database.add_invited, invited_player)
+
+    async def get_invited(self, invited_id: str) -> InvitedPlayer:
+        return await self.run(self.database.get_invited, invited_id)
+
+    async def get_all_invited(self) -> list[InvitedPlayer]:
+        return await self.run(self.database.get_all_invited)
+
+    async def update_invited(self, invited_player: InvitedPlayer) -> None:
+        return await self.run(self.database.update_invited, invited_player)
+
+    async def delete_invited(self, invited_id: str) -> None:
+        return await self.run(self.database.delete_invited, invited_id)
+
+    # --------------------------
+    # 🔍 SEARCH
+    # --------------------------
+    async def search_minecraft_name(self, name: str) -> ISTPlayer | InvitedPlayer:
+        return await self.run(self.database.search_minecraft_name, name)
+
+    async def search_discord_id(self, discord_id: str) -> ISTPlayer | InvitedPlayer:
+        return await self.run(self.database.search_discord_id, discord_id)
+
+    # --------------------------
+    # 📄 PAGINATION
+    # --------------------------
+    async def page(
+        self,
+        table: PageTable = "players",
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        fields: Optional[Sequence[str]] = None,
+        offset: int = 0,
+    ) -> Page:
+        return await self.run(self.database.page, table, cursor, limit, fields, offset)
+
+    async def _iter(
+        self,
+        table: PageTable,
+        offset: int,
+        limit: Optional[int],
+        fields: Optional[Sequence[str]],
+        page_size: int,
+    ) -> AsyncIterator[dict[str, Any]]:
+        # One executor hop per page, so other calls interleave with long scans
+        remaining = limit
+        cursor: Optional[str] = None
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            page = await self.page(table, cursor, size, fields, offset)
+            for item in page.items:
+                yield item
+            if remaining is not None:
+                remaining -= len(page.items)
+            if page.next_cursor is None:
+                return
+            cursor = page.next_cursor
+
+    def iter_ist(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> AsyncIterator[dict[str, Any]]:
+        return self._iter("ist_players", offset, limit, fields, page_size)
+
+    def iter_invited(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> AsyncIterator[dict[str, Any]]:
+        return self._iter("invited_players", offset, limit, fields, page_size)
+
+    def iter_players(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> AsyncIterator[dict[str, Any]]:
+        return self._iter("players", offset, limit, fields, page_size)
+
+    # --------------------------
+    # Overarch methods for all players
+    # --------------------------
+    async def get_all_players(self) -> list[ISTPlayer | InvitedPlayer]:
+        return await self.run(self.database.get_all_players)
+
+    async def find_player(self, player_id: str) -> ISTPlayer | InvitedPlayer | None:
+        return await self.run(self.database.find_player, player_id)
+
+    async def get_player(self, player_id: str) -> ISTPlayer | InvitedPlayer:
+        return await self.run(self.database.get_player, player_id)
+
+    async def get_players(
+        self, player_ids: Iterable[str]
+    ) -> dict[str, ISTPlayer | InvitedPlayer]:
+        # Materialised here, the iterable may not be safe to read off the loop
+        return await self.run(self.database.get_players, list(player_ids))
+
+    async def update_player(self, player: ISTPlayer | InvitedPlayer) -> None:
+        return await self.run(self.database.update_player, player)
+
+    async def delete_player(self, player_id: str) -> None:
+        return await self.run(self.database.delete_player, player_id)
+
+    async def delete_players(self, player_ids: Iterable[str]) -> list[str]:
+        return await self.run(self.database.delete_players, list(player_ids))
+
+    # --------------------------
+    # 🔒 TRANSACTIONS
+    # --------------------------
+    def transaction(self) -> AsyncTransaction:
+        return AsyncTransaction(self)
+
+    async def link_minecraft(
+        self, discord_id: str, name: str, uuid: str | None
+    ) -> ISTPlayer | InvitedPlayer:
+        return await self.run(self.database.link_minecraft, discord_id, name, uuid)
+
+    async def invite_player(self, inviter_id: str, invited_player: InvitedPlayer) -> None:
+        return await self.run(self.database.invite_player, inviter_id, invited_player)
+
+
+# Global instance for import
+db = AsyncDatabase(sync_db)
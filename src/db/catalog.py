@@ -0,0 +1,111 @@
+"""
+One directory over both player tables.
+
+Players live in two tables, but ids, Discord ids and Minecraft names are
+looked up across the whole roster. The catalog resolves each of them with a
+single hash lookup to the player's record, whose `table` says where it is
+stored, so callers never probe one table and then the other.
+"""
+
+from itertools import chain
+from typing import Iterable
+
+from src.db.index import PlayerIndex
+from src.db.records import InvitedRecord, ISTRecord, PlayerRecord
+
+
+def _name_key(name: str) -> str:
+    """Minecraft names are case-insensitive, so index them case-folded."""
+    return name.casefold()
+
+
+class PlayerCatalog:
+    """
+    In-memory directory of every player, kept in sync through `put` / `remove`.
+
+    Each table keeps its own `PlayerIndex` (`ist`, `invited`) for ordered
+    scans. Should an id be in both tables, the IST player is the one found,
+    as the two-table lookups always did. Discord ids and Minecraft names are
+    unique across the roster, so they map to a single player.
+    """
+
+    def __init__(
+        self,
+        ist_records: Iterable[ISTRecord] = (),
+        invited_records: Iterable[InvitedRecord] = (),
+    ):
+        self.ist: PlayerIndex[ISTRecord] = PlayerIndex(ist_records)
+        self.invited: PlayerIndex[InvitedRecord] = PlayerIndex(invited_records)
+        self._by_id: dict[str, PlayerRecord] = {}
+        self._by_discord_id: dict[str, PlayerRecord] = {}
+        self._by_minecraft_name: dict[str, PlayerRecord] = {}
+        # Invited players first, so IST players win any clash
+        for record in chain(self.invited, self.ist):
+            self._link(record)
+
+    def __len__(self) -> int:
+        return len(self.ist) + len(self.invited)
+
+    def __contains__(self, player_id: str) -> bool:
+        return player_id in self._by_id
+
+    def index(self, table: str) -> PlayerIndex[ISTRecord] | PlayerIndex[InvitedRecord]:
+        if table == "ist_players":
+            return self.ist
+        if table == "invited_players":
+            return self.invited
+        raise ValueError(f"Unknown table: {table}")
+
+    # --------------------------
+    # ✏️ MUTATIONS
+    # --------------------------
+    def _link(self, record: PlayerRecord) -> None:
+        if isinstance(record, ISTRecord) or record.id not in self.ist:
+            self._by_id[record.id] = record
+        self._by_discord_id[record.discord_id] = record
+        if record.minecraft_name:
+            self._by_minecraft_name[_name_key(record.minecraft_name)] = record
+
+    def _unlink(self, record: PlayerRecord) -> None:
+        """Drop the keys of `record`, if they still point to it."""
+        if self._by_id.get(record.id) is record:
+            shadowed = self.invited.get(record.id) if isinstance(record, ISTRecord) else None
+            if shadowed is None:
+                del self._by_id[record.id]
+            else:
+                self._by_id[record.id] = shadowed
+        if self._by_discord_id.get(record.discord_id) is record:
+            del self._by_discord_id[record.discord_id]
+        if record.minecraft_name:
+            key = _name_key(record.minecraft_name)
+            if self._by_minecraft_name.get(key) is record:
+                del self._by_minecraft_name[key]
+
+    def put(self, record: PlayerRecord) -> None:
+        """Insert or replace a record in its table, refreshing its keys."""
+        if isinstance(record, ISTRecord):
+            previous: PlayerRecord | None = self.ist.put(record)
+        else:
+            previous = self.invited.put(record)
+        if previous is not None:
+            self._unlink(previous)
+        self._link(record)
+
+    def remove(self, table: str, player_id: str) -> PlayerRecord | None:
+        """Drop a record from `table` and its keys, returning it if present."""
+        record = self.index(table).remove(player_id)
+        if record is not None:
+            self._unlink(record)
+        return record
+
+    # --------------------------
+    # 🔍 LOOKUPS
+    # --------------------------
+    def get(self, player_id: str) -> PlayerRecord | None:
+        return self._by_id.get(player_id)
+
+    def get_by_discord_id(self, discord_id: str) -> PlayerRecord | None:
+        return self._by_discord_id.get(discord_id)
+
+    def get_by_minecraft_name(self, name: str) -> PlayerRecord | None:
+        return self._by_minecraft_name.get(_name_key(name))
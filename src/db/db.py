@@ -1,201 +1,442 @@
-import os
-from tinydb import TinyDB, Query
-from typing import cast, List
+import itertools
+from dataclasses import dataclass, fields as record_fields
+from typing import Any, Iterable, Iterator, Literal, Optional, Sequence, cast, List
 from src.errors.db import *
 from src.db.player import *
+from src.db.catalog import PlayerCatalog
+from src.db.index import PlayerIndex
+from src.db.records import InvitedRecord, ISTRecord, PlayerRecord, StringPool
+from src.db.storage import PLAYER_TYPES, TABLES, StorageBackend, WriteOp, open_storage
+from src.db.transaction import Key, Transaction
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "data", "players.json")
+DEFAULT_PAGE_SIZE = 500
 
+# "players" pages through IST players, then invited players
+PageTable = Literal["players", "ist_players", "invited_players"]
 
-class Database:
-    def __init__(self):
-        if not os.path.exists(DB_PATH):
-            with open(DB_PATH, "x") as f:
-                f.write("")
+# Every field a projection may ask for, across both player types
+PLAYER_FIELDS = frozenset(
+    field.name
+    for record in (ISTRecord, InvitedRecord)
+    for field in record_fields(record)
+    if field.name != "version"
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Page:
+    """
+    One page of players, in id order.
+
+    Pass `next_cursor` back to `Database.page` for the next one; it is None
+    once the scan is done.
+    """
+
+    items: list[dict[str, Any]]
+    next_cursor: Optional[str]
+
+
+def _check_fields(fields: Optional[Sequence[str]]) -> None:
+    if fields is None:
+        return
+    unknown = set(fields) - PLAYER_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown player fields: {', '.join(sorted(unknown))}")
 
-        # Initialize the database
-        self.db = TinyDB(DB_PATH)
 
-        # Initialize the tables
-        self.ist_players = self.db.table(  # pyright: ignore[reportUnknownMemberType]
-            "ist_players"
+def _project(record: PlayerRecord, fields: Optional[Sequence[str]]) -> dict[str, Any]:
+    """The stored shape of `record`, or only `fields` of it (those it has)."""
+    if fields is None:
+        return cast(dict[str, Any], record.to_dict())
+    projected: dict[str, Any] = {}
+    for field in fields:
+        if hasattr(record, field):
+            value = getattr(record, field)
+            projected[field] = (
+                list(cast(tuple[str, ...], value)) if isinstance(value, tuple) else value
+            )
+    return projected
+
+
+class Database:
+    def __init__(self, storage: StorageBackend | None = None):
+        # Initialize the storage backend (TinyDB or SQLite, see DB_BACKEND)
+        self.storage = storage or open_storage()
+
+        # Build the player catalog once; every mutation below keeps it in sync.
+        # It holds compact records (src.db.records), callers get fresh dicts.
+        pool: StringPool = {}  # Only while loading, see src.db.records
+        self.catalog = PlayerCatalog(
+            (
+                ISTRecord.from_dict(cast(ISTPlayer, record), pool)
+                for record in self.storage.all("ist_players")
+            ),
+            (
+                InvitedRecord.from_dict(cast(InvitedPlayer, record), pool)
+                for record in self.storage.all("invited_players")
+            ),
         )
-        self.invited_players = self.db.table( # pyright: ignore[reportUnknownMemberType]
-            "invited_players"
-        )  
+        # Stamped on every write, see src.db.transaction
+        self._versions = itertools.count(1)
+
+    def flush(self) -> None:
+        """Persist any writes buffered by the storage backend."""
+        self.storage.flush()
 
-        # Initialize the query object
-        self.query = Query()
+    def close(self) -> None:
+        """Flush and close the underlying storage backend."""
+        self.storage.close()
 
     # --------------------------
     # 👥 IST PLAYERS
     # --------------------------
     def add_ist(self, ist_player: ISTPlayer) -> None:
         """Add IST player to the database."""
-        if self.ist_players.contains(self.query.id == ist_player["id"]):
-            raise PlayerAlreadyExistsError(ist_player["id"])
-
-        result = self.ist_players.insert(  # pyright: ignore[reportUnknownMemberType]
-            ist_player
-        )
-        if not result:
-            raise InsertError("IST")
+        with self.transaction() as tx:
+            tx.add_ist(ist_player)
 
     def get_ist(self, ist_id: str) -> ISTPlayer:
         """Get IST player by ID."""
-        result = self.ist_players.get(  # pyright: ignore[reportUnknownMemberType]
-            self.query.id == ist_id
-        )
+        result = self.catalog.ist.get(ist_id)
         if result:
-            return cast(ISTPlayer, result)
+            return result.to_dict()
         raise PlayerNotFoundError(ist_id)
 
     def get_all_ist(self) -> List[ISTPlayer]:
         """Get all IST players."""
-        results = self.ist_players.all()
+        results = [result.to_dict() for result in self.catalog.ist]
         if results:
-            return [cast(ISTPlayer, result) for result in results]
+            return results
         raise PlayerNotFoundError("", message="No IST players found")
 
     def update_ist(self, ist_player: ISTPlayer) -> None:
         """Update IST player in the database."""
-        result = self.ist_players.update(  # pyright: ignore[reportUnknownMemberType]
-            ist_player, self.query.id == ist_player["id"]
-        )
-        if not result:
-            raise UpdateError(ist_player["id"], "IST")
+        with self.transaction() as tx:
+            tx.update("ist_players", dict(ist_player))
 
     def delete_ist(self, ist_id: str) -> None:
         """Delete IST player from the database."""
-        result = self.ist_players.remove(self.query.id == ist_id)
-        if not result:
-            raise DeleteError(ist_id, "IST")
+        with self.transaction() as tx:
+            if not tx.delete("ist_players", ist_id):
+                raise DeleteError(ist_id, "IST")
 
     # --------------------------
     # 👥 INVITED PLAYERS
     # --------------------------
     def add_invited(self, invited_player: InvitedPlayer) -> None:
         """Add invited player to the database."""
-        if self.invited_players.contains(self.query.id == invited_player["id"]):
-            raise PlayerAlreadyExistsError(invited_player["id"])
-
-        result = (
-            self.invited_players.insert(  # pyright: ignore[reportUnknownMemberType]
-                invited_player
-            )
-        )
-        if not result:
-            raise InsertError("Invited")
+        with self.transaction() as tx:
+            tx.add_invited(invited_player)
 
     def get_invited(self, invited_id: str) -> InvitedPlayer:
         """Get invited player by ID."""
-        result = self.invited_players.get(  # pyright: ignore[reportUnknownMemberType]
-            self.query.id == invited_id
-        )
+        result = self.catalog.invited.get(invited_id)
         if result:
-            return cast(InvitedPlayer, result)
+            return result.to_dict()
         raise PlayerNotFoundError(invited_id)
 
     def get_all_invited(self) -> List[InvitedPlayer]:
         """Get all invited players."""
-        results = self.invited_players.all()
+        results = [result.to_dict() for result in self.catalog.invited]
         if results:
-            return [cast(InvitedPlayer, result) for result in results]
+            return results
         raise PlayerNotFoundError("", message="No invited players found")
 
     def update_invited(self, invited_player: InvitedPlayer) -> None:
         """Update invited player in the database."""
-        result = (
-            self.invited_players.update(  # pyright: ignore[reportUnknownMemberType]
-                invited_player, self.query.id == invited_player["id"]
-            )
-        )
-        if not result:
-            raise UpdateError(invited_player["id"], "Invited")
+        with self.transaction() as tx:
+            tx.update("invited_players", dict(invited_player))
 
     def delete_invited(self, invited_id: str) -> None:
         """Delete invited player from the database."""
-        result = self.invited_players.remove(self.query.id == invited_id)
-        if not result:
-            raise DeleteError(invited_id, "Invited")
+        with self.transaction() as tx:
+            if not tx.delete("invited_players", invited_id):
+                raise DeleteError(invited_id, "Invited")
 
     # --------------------------
     # 🔍 SEARCH
     # --------------------------
     def search_minecraft_name(self, name: str) -> ISTPlayer | InvitedPlayer:
-        """Search for IST players by Minecraft name."""
-        results = self.ist_players.search(self.query.minecraft_name == name)
-        if results:
-            return cast(ISTPlayer, results[0])
-        results = self.invited_players.search(self.query.minecraft_name == name)
-        if results:
-            return cast(InvitedPlayer, results[0])
+        """Search for players by Minecraft name (case-insensitive)."""
+        result = self.catalog.get_by_minecraft_name(name)
+        if result:
+            return result.to_dict()
         raise SearchError("minecraft_name", name)
 
     def search_discord_id(self, discord_id: str) -> ISTPlayer | InvitedPlayer:
-        """Search for IST players by Discord ID."""
-        results = self.ist_players.search(self.query.discord_id == discord_id)
-        if results:
-            return cast(ISTPlayer, results[0])
-        results = self.invited_players.search(self.query.discord_id == discord_id)
-        if results:
-            return cast(InvitedPlayer, results[0])
+        """Search for players by Discord ID."""
+        result = self.catalog.get_by_discord_id(discord_id)
+        if result:
+            return result.to_dict()
         raise SearchError("discord_id", discord_id)
 
+    # --------------------------
+    # 📄 PAGINATION
+    # --------------------------
+    def page(
+        self,
+        table: PageTable = "players",
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        fields: Optional[Sequence[str]] = None,
+        offset: int = 0,
+    ) -> Page:
+        """
+        Get one page of players in id order, starting after `cursor` (or at
+        `offset` when there is none). Cursors are keyset based, so players
+        added or removed between pages never make a scan skip or repeat one.
+        """
+        if limit < 1:
+            raise ValueError("Page limit must be at least 1")
+        _check_fields(fields)
+        if table != "players" and table not in TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        tables = TABLES if table == "players" else (table,)
+
+        after: Optional[str] = None
+        if cursor is not None:
+            cursor_table, _, after = cursor.partition(":")
+            if cursor_table not in tables:
+                raise ValueError(f"Invalid cursor: {cursor}")
+            tables = tables[tables.index(cursor_table) :]
+            offset = 0
+
+        items: list[dict[str, Any]] = []
+        for name in tables:
+            index: PlayerIndex[Any] = self.catalog.index(name)
+            if after is None and offset >= len(index):
+                offset -= len(index)
+                continue
+
+            wanted = limit - len(items)
+            records = (
+                index.page_at(offset, wanted)
+                if after is None
+                else index.page_after(after, wanted)
+            )
+            after, offset = None, 0
+            items += [_project(record, fields) for record in records]
+            if len(items) == limit:
+                return Page(items, f"{name}:{records[-1].id}")
+        return Page(items, None)
+
+    def _iter(
+        self,
+        table: PageTable,
+        offset: int,
+        limit: Optional[int],
+        fields: Optional[Sequence[str]],
+        page_size: int,
+    ) -> Iterator[dict[str, Any]]:
+        remaining = limit
+        cursor: Optional[str] = None
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            page = self.page(table, cursor, size, fields, offset)
+            yield from page.items
+            if remaining is not None:
+                remaining -= len(page.items)
+            if page.next_cursor is None:
+                return
+            cursor = page.next_cursor
+
+    def iter_ist(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> Iterator[dict[str, Any]]:
+        """Iterate over IST players page by page, optionally only `fields` of each."""
+        return self._iter("ist_players", offset, limit, fields, page_size)
+
+    def iter_invited(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> Iterator[dict[str, Any]]:
+        """Iterate over invited players page by page, optionally only `fields` of each."""
+        return self._iter("invited_players", offset, limit, fields, page_size)
+
+    def iter_players(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Iterate over all players (IST, then invited) page by page, optionally
+        only `fields` of each. Memory stays at one page whatever the roster size.
+        """
+        return self._iter("players", offset, limit, fields, page_size)
+
     # --------------------------
     # Overarch methods for all players
     # --------------------------
 
     def get_all_players(self) -> list[ISTPlayer | InvitedPlayer]:
-        """Get all players from the database."""
-        all_players: list[ISTPlayer | InvitedPlayer] = []
-        try:
-            ist_players: list[ISTPlayer] = self.get_all_ist()
-            all_players.extend(ist_players)
-        except PlayerNotFoundError:
-            pass
-        try:
-            invited_players: list[InvitedPlayer] = self.get_all_invited()
-            all_players.extend(invited_players)
-        except PlayerNotFoundError:
-            pass
-        return all_players
+        """Get all players from the database (an empty list if there are none)."""
+        return cast(list[ISTPlayer | InvitedPlayer], list(self.iter_players()))
+
+    def find_player(self, player_id: str) -> ISTPlayer | InvitedPlayer | None:
+        """Get player by ID, or None if there is no such player."""
+        result = self.catalog.get(player_id)
+        return None if result is None else result.to_dict()
 
     def get_player(self, player_id: str) -> ISTPlayer | InvitedPlayer:
         """Get player by ID."""
-        result = self.get_ist(player_id)
-        if result:
-            return result
-        result = self.get_invited(player_id)
-        if result:
-            return result
-        raise PlayerNotFoundError(player_id)
+        result = self.find_player(player_id)
+        if result is None:
+            raise PlayerNotFoundError(player_id)
+        return result
+
+    def get_players(self, player_ids: Iterable[str]) -> dict[str, ISTPlayer | InvitedPlayer]:
+        """Get the players with the given IDs, by ID. Unknown IDs are left out."""
+        players: dict[str, ISTPlayer | InvitedPlayer] = {}
+        for player_id in player_ids:
+            result = self.catalog.get(player_id)
+            if result is not None:
+                players[player_id] = result.to_dict()
+        return players
 
     def update_player(self, player: ISTPlayer | InvitedPlayer) -> None:
         """Update player in the database."""
-        if is_ist_player(player):
-            self.update_ist(player)
-        elif is_invited_player(player):
-            self.update_invited(player)
-        else:
-            raise PlayerNotFoundError(player["id"])
+        with self.transaction() as tx:
+            tx.update_player(player)
 
     def delete_player(self, player_id: str) -> None:
         """Delete player from the database."""
+        result = self.catalog.get(player_id)
+        if result is None:
+            raise PlayerNotFoundError(player_id)
+        with self.transaction() as tx:
+            tx.delete(result.table, player_id)
 
-        # Check for ISTPlayer
-        try:
-            return self.delete_ist(player_id)
-        except PlayerNotFoundError:
-            pass
+    def delete_players(self, player_ids: Iterable[str]) -> list[str]:
+        """
+        Delete the players with the given IDs, in one storage write.
+        Returns the IDs that were deleted; unknown IDs are skipped.
+        """
+        deleted: list[str] = []
+        with self.transaction() as tx:
+            for player_id in dict.fromkeys(player_ids):
+                result = self.catalog.get(player_id)
+                if result is not None:
+                    tx.delete(result.table, player_id)
+                    deleted.append(player_id)
+        return deleted
+
+    # --------------------------
+    # 🔒 TRANSACTIONS
+    # --------------------------
+    def transaction(self) -> Transaction:
+        """Start a unit of work, committed as one write (see src.db.transaction)."""
+        return Transaction(self)
 
-        # Check for InvitedPlayer
-        try:
-            return self.delete_invited(player_id)
-        except PlayerNotFoundError:
-            pass
+    def commit(self, tx: Transaction) -> None:
+        """
+        Apply the writes of `tx` in one storage write, unless a player it read
+        changed since (ConcurrentModificationError) or a Minecraft name would
+        end up linked to two players (MinecraftNameTakenError).
+        """
+        catalog = self.catalog
+        for (table, player_id), version in tx.reads.items():
+            read: Optional[PlayerRecord] = catalog.index(table).get(player_id)
+            if (None if read is None else read.version) != version:
+                raise ConcurrentModificationError(player_id)
 
-        raise PlayerNotFoundError(player_id)
+        version = next(self._versions)
+        ops: list[WriteOp] = []
+        results: list[tuple[Key, Optional[PlayerRecord]]] = []
+        claimed: dict[str, Key] = {}
+        for key, (action, data) in tx.writes.items():
+            table, player_id = key
+            current: Optional[PlayerRecord] = catalog.index(table).get(player_id)
+            stored: Optional[dict[str, Any]]
+            if action == "insert":
+                if current is not None:
+                    raise PlayerAlreadyExistsError(player_id)
+                stored = data
+            elif current is None:
+                if action in ("update", "replace"):
+                    raise UpdateError(player_id, PLAYER_TYPES[table])
+                raise DeleteError(player_id, PLAYER_TYPES[table])
+            elif action == "update":
+                stored = {**current.to_dict(), **(data or {})}
+            else:
+                stored = data  # None for deletes, the whole player for replaces
+            op_action = "update" if action == "replace" else action
+            ops.append(WriteOp(op_action, table, player_id, stored))
+            if stored is None:
+                results.append((key, None))
+                continue
+
+            record: PlayerRecord = (
+                ISTRecord.from_dict(cast(ISTPlayer, stored), version=version)
+                if table == "ist_players"
+                else InvitedRecord.from_dict(cast(InvitedPlayer, stored), version=version)
+            )
+            results.append((key, record))
+            name = record.minecraft_name
+            if not name:
+                continue
+            if name.casefold() in claimed:
+                raise MinecraftNameTakenError(name)
+            claimed[name.casefold()] = key
+            if current is not None and (current.minecraft_name or "").casefold() == name.casefold():
+                continue  # Not a new link, so leave any older clash alone
+            owner = catalog.get_by_minecraft_name(name)
+            if owner is not None and (owner.table, owner.id) not in tx.writes:
+                raise MinecraftNameTakenError(name)
+
+        if not ops:
+            return
+        self.storage.apply(ops)
+        for (table, player_id), result in results:
+            if result is None:
+                catalog.remove(table, player_id)
+            else:
+                catalog.put(result)
+
+    def link_minecraft(
+        self, discord_id: str, name: str, uuid: str | None
+    ) -> ISTPlayer | InvitedPlayer:
+        """
+        Link a Minecraft account to the player with `discord_id`, in one write.
+        Returns the player as it was before. Raises SearchError if there is no
+        such player and MinecraftNameTakenError if another player has `name`.
+        """
+        with self.transaction() as tx:
+            player = tx.find_by_discord_id(discord_id)
+            if player is None:
+                raise SearchError("discord_id", discord_id)
+            owner = tx.find_by_minecraft_name(name)
+            if owner is not None and owner["id"] != player["id"]:
+                raise MinecraftNameTakenError(name)
+            linked = {**player, "minecraft_name": name, "minecraft_uuid": uuid}
+            tx.update_player(cast(ISTPlayer | InvitedPlayer, linked))
+        return player
+
+    def invite_player(self, inviter_id: str, invited_player: InvitedPlayer) -> None:
+        """
+        Add an invited player and record them in their inviter's
+        `invited_ids`, in one write. Raises InviteLimitReachedError if the
+        inviter has no invites left.
+        """
+        with self.transaction() as tx:
+            inviter = tx.find_player(inviter_id)
+            if inviter is None or not is_ist_player(inviter):
+                raise PlayerNotFoundError(inviter_id)
+            if len(inviter["invited_ids"]) >= inviter["invite_limit"]:
+                raise InviteLimitReachedError(inviter_id, inviter["invite_limit"])
+            tx.add_invited(cast(InvitedPlayer, {**invited_player, "invited_by": inviter_id}))
+            tx.update(
+                "ist_players",
+                {"id": inviter_id, "invited_ids": [*inviter["invited_ids"], invited_player["id"]]},
+            )
 
 
 # Global instance for import
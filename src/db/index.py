@@ -0,0 +1,67 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Generic, Iterable, Iterator, Optional, TypeVar
+
+from src.db.records import InvitedRecord, ISTRecord
+
+Record = TypeVar("Record", ISTRecord, InvitedRecord)
+
+
+class PlayerIndex(Generic[Record]):
+    """
+    The records of a single player table, by `id`.
+
+    Ids are also kept sorted, for keyset pagination: a page starts right after
+    the last id of the previous one, so writes between pages never make a
+    scan skip or repeat a player. Lookups across both tables go through
+    `src.db.catalog.PlayerCatalog`, which owns one index per table.
+    """
+
+    def __init__(self, records: Iterable[Record] = ()):
+        self._by_id: dict[str, Record] = {record.id: record for record in records}
+        # Sorted once here; `put` / `remove` keep it sorted from now on
+        self._sorted_ids: list[str] = sorted(self._by_id)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, player_id: str) -> bool:
+        return player_id in self._by_id
+
+    def __iter__(self) -> Iterator[Record]:
+        return iter(self._by_id.values())
+
+    # --------------------------
+    # ✏️ MUTATIONS
+    # --------------------------
+    def put(self, record: Record) -> Record | None:
+        """Insert or replace a record, returning the one it replaced."""
+        previous = self._by_id.get(record.id)
+        if previous is None:
+            insort(self._sorted_ids, record.id)
+        self._by_id[record.id] = record
+        return previous
+
+    def remove(self, player_id: str) -> Record | None:
+        """Drop a record, returning it if present."""
+        record = self._by_id.pop(player_id, None)
+        if record is not None:
+            del self._sorted_ids[bisect_left(self._sorted_ids, player_id)]
+        return record
+
+    # --------------------------
+    # 🔍 LOOKUPS
+    # --------------------------
+    def get(self, player_id: str) -> Record | None:
+        return self._by_id.get(player_id)
+
+    # --------------------------
+    # 📄 PAGINATION
+    # --------------------------
+    def page_after(self, cursor: Optional[str], limit: int) -> list[Record]:
+        """Up to `limit` records with ids after `cursor` (from the start if None)."""
+        start = 0 if cursor is None else bisect_right(self._sorted_ids, cursor)
+        return [self._by_id[player_id] for player_id in self._sorted_ids[start : start + limit]]
+
+    def page_at(self, offset: int, limit: int) -> list[Record]:
+        """Up to `limit` records starting at position `offset` in id order."""
+        return [self._by_id[player_id] for player_id in self._sorted_ids[offset : offset + limit]]
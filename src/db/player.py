@@ -1,9 +1,10 @@
-from typing import Any, TypeGuard, TypedDict, List
+from typing import Any, NotRequired, TypeGuard, TypedDict, List
 
 class ISTPlayer(TypedDict):
     id: str                     # ist_id
     discord_id: str
     minecraft_name: str | None
+    minecraft_uuid: NotRequired[str | None]  # stored when the account is linked
     invited_ids: List[str]
     invite_limit: int
 
@@ -12,6 +13,7 @@ class InvitedPlayer(TypedDict):
     id: str
     discord_id: str
     minecraft_name: str | None
+    minecraft_uuid: NotRequired[str | None]
     invited_by: str             # ist_id of inviter
 
 def is_ist_player(player: Any) -> TypeGuard[ISTPlayer]:
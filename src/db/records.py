@@ -0,0 +1,135 @@
+"""
+Compact in-memory player records.
+
+`ISTPlayer` / `InvitedPlayer` (see `src.db.player`) are the stored JSON shape
+and what the Database API hands out. The in-memory indexes keep these frozen,
+slotted records instead:
+
+- no per-record dict, just the fields;
+- player ids interned through a `pool` while loading, so an inviter's
+  `invited_ids`, the invited players' `id`s and their `invited_by` share one
+  string object each. The pool is dropped after the load: `sys.intern` would
+  keep an entry per player in the interpreter's intern table, which costs
+  more than the duplicates it saves;
+- `invited_ids` as a tuple, in stored order, so a record converts back to
+  exactly the player it was loaded from. `has_invited` scans it rather than
+  a set: the list is capped by `invite_limit` (MAX_INVITES is 5), where a
+  scan costs ~60 ns more per check than a frozenset while a frozenset
+  alongside would add 216-728 bytes to every inviter;
+- a class-level `kind` telling the two types apart without probing for keys;
+- a process-local `version`, stamped on every write for the optimistic
+  checks of `src.db.transaction`. It is not stored.
+"""
+
+from dataclasses import dataclass
+from typing import Any, ClassVar, Literal, cast
+
+from src.db.player import InvitedPlayer, ISTPlayer
+
+# Shared by every player who hasn't invited anyone yet
+_NO_INVITES: tuple[str, ...] = ()
+
+StringPool = dict[str, str]
+
+
+def _shared(pool: StringPool | None, value: str) -> str:
+    return value if pool is None else pool.setdefault(value, value)
+
+
+@dataclass(frozen=True, slots=True)
+class ISTRecord:
+    kind: ClassVar[Literal["ist"]] = "ist"
+    table: ClassVar[str] = "ist_players"
+
+    id: str
+    discord_id: str
+    minecraft_name: str | None
+    minecraft_uuid: str | None
+    invited_ids: tuple[str, ...]
+    invite_limit: int
+    version: int = 0
+
+    @classmethod
+    def from_dict(
+        cls, data: ISTPlayer, pool: StringPool | None = None, version: int = 0
+    ) -> "ISTRecord":
+        return cls(
+            id=_shared(pool, data["id"]),
+            discord_id=data["discord_id"],
+            minecraft_name=data["minecraft_name"],
+            minecraft_uuid=data.get("minecraft_uuid"),
+            invited_ids=(
+                tuple(_shared(pool, player_id) for player_id in data["invited_ids"])
+                if data["invited_ids"]
+                else _NO_INVITES
+            ),
+            invite_limit=data["invite_limit"],
+            version=version,
+        )
+
+    def to_dict(self) -> ISTPlayer:
+        player = _common_fields(self)
+        player["invited_ids"] = list(self.invited_ids)
+        player["invite_limit"] = self.invite_limit
+        return cast(ISTPlayer, player)
+
+    def has_invited(self, player_id: str) -> bool:
+        return player_id in self.invited_ids
+
+
+@dataclass(frozen=True, slots=True)
+class InvitedRecord:
+    kind: ClassVar[Literal["invited"]] = "invited"
+    table: ClassVar[str] = "invited_players"
+
+    id: str
+    discord_id: str
+    minecraft_name: str | None
+    minecraft_uuid: str | None
+    invited_by: str
+    version: int = 0
+
+    @classmethod
+    def from_dict(
+        cls, data: InvitedPlayer, pool: StringPool | None = None, version: int = 0
+    ) -> "InvitedRecord":
+        return cls(
+            id=_shared(pool, data["id"]),
+            discord_id=data["discord_id"],
+            minecraft_name=data["minecraft_name"],
+            minecraft_uuid=data.get("minecraft_uuid"),
+            invited_by=_shared(pool, data["invited_by"]),
+            version=version,
+        )
+
+    def to_dict(self) -> InvitedPlayer:
+        player = _common_fields(self)
+        player["invited_by"] = self.invited_by
+        return cast(InvitedPlayer, player)
+
+
+PlayerRecord = ISTRecord | InvitedRecord
+
+
+def _common_fields(record: PlayerRecord) -> dict[str, Any]:
+    """
+    The fields both player types start with, in stored order. `minecraft_uuid`
+    is NotRequired, so it is only there once set, as when it was stored.
+    """
+    fields: dict[str, Any] = {
+        "id": record.id,
+        "discord_id": record.discord_id,
+        "minecraft_name": record.minecraft_name,
+    }
+    if record.minecraft_uuid is not None:
+        fields["minecraft_uuid"] = record.minecraft_uuid
+    return fields
+
+
+def record_from_dict(
+    data: dict[str, Any], pool: StringPool | None = None, version: int = 0
+) -> PlayerRecord:
+    """Convert a stored player of either type, told apart by its fields."""
+    if "invite_limit" in data:
+        return ISTRecord.from_dict(cast(ISTPlayer, data), pool, version)
+    return InvitedRecord.from_dict(cast(InvitedPlayer, data), pool, version)
@@ -0,0 +1,605 @@
+"""
+Storage backends for the player database.
+
+The Database keeps every record in memory (see `src.db.catalog`), so a backend
+only has to load the tables once and persist mutations, one at a time or as
+an all-or-nothing batch (`apply`).
+"""
+
+import json
+import logging
+import os
+import pathlib
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Generator, Iterator, Literal, MutableMapping, Optional, Sequence, cast
+
+from tinydb import TinyDB, Query
+from tinydb.middlewares import Middleware
+from tinydb.storages import JSONStorage, Storage
+
+try:
+    import orjson  # pyright: ignore[reportMissingImports]
+except ImportError:
+    orjson = None
+
+from src.errors.db import (
+    DatabaseInitializationError,
+    DeleteError,
+    PlayerAlreadyExistsError,
+    UpdateError,
+)
+
+log = logging.getLogger(__name__)
+
+TABLES = ("ist_players", "invited_players")
+PLAYER_TYPES = {"ist_players": "IST", "invited_players": "Invited"}
+
+DATA_DIR = os.getenv("DB_DIR", os.path.join(os.path.dirname(__file__), "data"))
+JSON_PATH = os.path.join(DATA_DIR, "players.json")
+SQLITE_PATH = os.path.join(DATA_DIR, "players.sqlite3")
+DB_BACKEND = os.getenv("DB_BACKEND", "tinydb")
+
+# Write-behind (TinyDB only): buffer mutations and flush at most once per
+# interval, or sooner once this many writes are pending.
+DB_WRITE_BEHIND = os.getenv("DB_WRITE_BEHIND", "0") == "1"
+DB_FLUSH_INTERVAL = float(os.getenv("DB_FLUSH_INTERVAL", "2.0"))
+DB_FLUSH_MAX_DIRTY = int(os.getenv("DB_FLUSH_MAX_DIRTY", "100"))
+
+
+def dumps(record: dict[str, Any]) -> str:
+    """JSON for a stored record, via orjson when it is installed (several times faster)."""
+    if orjson is not None:
+        return orjson.dumps(record).decode("utf-8")
+    return json.dumps(record)
+
+
+def loads(data: str | bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def atomic_write_json(path: str, data: Any) -> None:
+    """Write JSON to a temp file and swap it in, so readers never see half a file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+@dataclass(frozen=True, slots=True)
+class WriteOp:
+    """One mutation in a batch passed to `StorageBackend.apply`."""
+
+    action: Literal["insert", "update", "delete"]
+    table: str
+    player_id: str
+    record: Optional[dict[str, Any]] = None  # None for deletes
+
+
+def _op_error(op: WriteOp) -> Exception:
+    """The error a single-record call would have raised for a failed `op`."""
+    player_type = PLAYER_TYPES[op.table]
+    if op.action == "insert":
+        return PlayerAlreadyExistsError(op.player_id)
+    if op.action == "update":
+        return UpdateError(op.player_id, player_type)
+    return DeleteError(op.player_id, player_type)
+
+
+class StorageBackend(ABC):
+    """Persistence layer behind the Database API."""
+
+    @abstractmethod
+    def all(self, table: str) -> Iterator[dict[str, Any]]:
+        """Yield every record stored in the table."""
+
+    @abstractmethod
+    def insert(self, table: str, record: dict[str, Any]) -> bool:
+        """Insert a new record. Returns False if nothing was written."""
+
+    @abstractmethod
+    def update(self, table: str, record: dict[str, Any]) -> bool:
+        """Replace the record with the same id. Returns False if it is missing."""
+
+    @abstractmethod
+    def delete(self, table: str, player_id: str) -> bool:
+        """Delete the record with the given id. Returns False if it is missing."""
+
+    def delete_many(self, table: str, player_ids: Sequence[str]) -> int:
+        """Delete the records with the given ids. Returns how many were deleted."""
+        return sum(self.delete(table, player_id) for player_id in player_ids)
+
+    def insert_many(
+        self, table: str, records: Sequence[dict[str, Any]], replace: bool = False
+    ) -> int:
+        """
+        Insert records in bulk. Records whose id is already stored are skipped,
+        or replace the stored one if `replace`. Returns how many were written.
+        """
+        written = 0
+        for record in records:
+            if self.insert(table, record) or (replace and self.update(table, record)):
+                written += 1
+        return written
+
+    @abstractmethod
+    def apply(self, ops: Sequence[WriteOp]) -> None:
+        """
+        Apply `ops` in order as a single write: all of them or, if one fails
+        (an insert over an existing id, an update or delete of a missing
+        one), none. Raises the error of the failed op.
+        """
+
+    @property
+    def buffers_writes(self) -> bool:
+        """Whether writes wait in memory until `flush`."""
+        return False
+
+    def flush(self) -> None:
+        """Persist any buffered writes. A no-op for write-through backends."""
+
+    def close(self) -> None:
+        """Flush and release any resources held by the backend."""
+
+
+# --------------------------
+# 📄 TINYDB
+# --------------------------
+class WriteBehindJSONStorage(Storage):
+    """
+    TinyDB storage that keeps the document tree in memory and coalesces writes.
+
+    `write` only marks the tree dirty; the file is rewritten atomically once
+    `max_dirty` writes are pending or when `flush` is called (the database
+    executor calls it every flush interval, and on shutdown). Anything written
+    since the last flush is lost if the process dies, hence opt-in.
+
+    TinyDB edits the tree it reads in place, so `read` hands out a copy and
+    only a `write` swaps it in: an operation (or batch) that fails halfway
+    leaves the tree, and the next flush, untouched.
+    """
+
+    def __init__(self, path: str, max_dirty: int = DB_FLUSH_MAX_DIRTY):
+        super().__init__()
+        self.path = path
+        self.max_dirty = max_dirty
+        self.dirty = 0
+        self.last_flush = time.monotonic()
+
+        self.data: dict[str, dict[str, Any]] | None = None
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path) as f:
+                self.data = json.load(f)
+
+    def read(self) -> dict[str, dict[str, Any]] | None:
+        if self.data is None:
+            return None
+        # Documents are copied too, TinyDB updates them in place. Their
+        # values are replaced on update, never mutated, so they are shared.
+        return {
+            name: {doc_id: dict(doc) for doc_id, doc in table.items()}
+            for name, table in self.data.items()
+        }
+
+    def write(self, data: dict[str, dict[str, Any]]) -> None:
+        self.data = data
+        self.dirty += 1
+        if self.dirty >= self.max_dirty:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.dirty or self.data is None:
+            return
+        atomic_write_json(self.path, self.data)
+        self.dirty = 0
+        self.last_flush = time.monotonic()
+
+    def close(self) -> None:
+        self.flush()
+
+
+class BatchingMiddleware(Middleware):
+    """
+    Lets a batch of TinyDB operations share one storage write.
+
+    Inside `batch()`, TinyDB's writes only replace an in-memory copy of the
+    document tree, which is written once on exit, or dropped if the batch
+    raises. The tree is also read only once per batch, so the file is parsed,
+    or the write-behind tree copied, once however many operations it holds.
+    """
+
+    def __init__(self, storage_cls: type[Storage]):
+        super().__init__(storage_cls)
+        self.batching = False
+        self.changed = False
+        self.pending: dict[str, dict[str, Any]] | None = None
+
+    def read(self) -> dict[str, dict[str, Any]] | None:
+        if not self.batching:
+            return self.storage.read()
+        if self.pending is None:
+            self.pending = self.storage.read()
+        return self.pending
+
+    def write(self, data: dict[str, dict[str, Any]]) -> None:
+        if self.batching:
+            self.pending = data
+            self.changed = True
+        else:
+            self.storage.write(data)
+
+    @contextmanager
+    def batch(self) -> Generator[None, None, None]:
+        self.batching = True
+        try:
+            yield
+            if self.changed and self.pending is not None:
+                self.storage.write(self.pending)
+        finally:
+            self.batching = False
+            self.changed = False
+            self.pending = None
+
+
+class TinyDBStorage(StorageBackend):
+    """
+    The original single-file JSON store.
+
+    Every write rewrites the file, unless `write_behind` is enabled, in which
+    case writes are buffered by `WriteBehindJSONStorage`. With `read_only`
+    the file must exist and is never written.
+    """
+
+    def __init__(
+        self, path: str = JSON_PATH, write_behind: bool = False, read_only: bool = False
+    ):
+        if read_only:
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if not os.path.exists(path):
+                with open(path, "x") as f:
+                    f.write("")
+
+        self.write_behind = write_behind and not read_only
+        self.batching = BatchingMiddleware(
+            WriteBehindJSONStorage if self.write_behind else JSONStorage
+        )
+        # JSONStorage takes the access mode, WriteBehindJSONStorage always writes
+        options = {"access_mode": "r"} if read_only else {}
+        self.db = TinyDB(path, storage=self.batching, **options)
+        self.tables = {
+            name: self.db.table(name)  # pyright: ignore[reportUnknownMemberType]
+            for name in TABLES
+        }
+        self.query = Query()
+
+    def all(self, table: str) -> Iterator[dict[str, Any]]:
+        for doc in self.tables[table].all():
+            yield dict(doc)
+
+    def insert(self, table: str, record: dict[str, Any]) -> bool:
+        return bool(
+            self.tables[table].insert(  # pyright: ignore[reportUnknownMemberType]
+                record
+            )
+        )
+
+    def update(self, table: str, record: dict[str, Any]) -> bool:
+        # TinyDB merges fields into the document, so swap its contents whole
+        def replace(doc: MutableMapping[str, Any]) -> None:
+            doc.clear()
+            doc.update(record)
+
+        return bool(
+            self.tables[table].update(  # pyright: ignore[reportUnknownMemberType]
+                replace, self.query.id == record["id"]
+            )
+        )
+
+    def delete(self, table: str, player_id: str) -> bool:
+        return bool(self.tables[table].remove(self.query.id == player_id))
+
+    def delete_many(self, table: str, player_ids: Sequence[str]) -> int:
+        # One pass over the table and a single file write
+        wanted = set(player_ids)
+        return len(
+            self.tables[table].remove(
+                self.query.id.test(  # pyright: ignore[reportUnknownMemberType]
+                    wanted.__contains__
+                )
+            )
+        )
+
+    def insert_many(
+        self, table: str, records: Sequence[dict[str, Any]], replace: bool = False
+    ) -> int:
+        # Last duplicate wins when replacing, the first one otherwise
+        by_id: dict[str, dict[str, Any]] = {}
+        for record in records:
+            if replace or record["id"] not in by_id:
+                by_id[record["id"]] = record
+
+        docs = self.tables[table]
+        with self.batching.batch():
+            if replace:
+                docs.remove(
+                    self.query.id.test(  # pyright: ignore[reportUnknownMemberType]
+                        by_id.__contains__
+                    )
+                )
+            else:
+                for doc in docs.all():
+                    by_id.pop(cast(str, doc["id"]), None)
+            docs.insert_multiple(by_id.values())  # pyright: ignore[reportUnknownMemberType]
+        return len(by_id)
+
+    def apply(self, ops: Sequence[WriteOp]) -> None:
+        with self.batching.batch():
+            for op in ops:
+                # TinyDB doesn't enforce unique ids, the Database checks them
+                if op.action == "insert":
+                    done = self.insert(op.table, cast(dict[str, Any], op.record))
+                elif op.action == "update":
+                    done = self.update(op.table, cast(dict[str, Any], op.record))
+                else:
+                    done = self.delete(op.table, op.player_id)
+                if not done:
+                    raise _op_error(op)
+
+    @property
+    def buffers_writes(self) -> bool:
+        return self.write_behind
+
+    def flush(self) -> None:
+        storage = self.batching.storage
+        if isinstance(storage, WriteBehindJSONStorage):
+            storage.flush()
+
+    def close(self) -> None:
+        self.db.close()
+
+
+# --------------------------
+# 🗄️ SQLITE
+# --------------------------
+class SQLiteStorage(StorageBackend):
+    """
+    SQLite store with one row per player.
+
+    The lookup keys live in their own indexed columns and the full record is
+    kept as JSON, so a write touches a single row instead of the whole file.
+    With `read_only` the database must exist and is opened in SQLite's
+    read-only mode.
+    """
+
+    def __init__(self, path: str = SQLITE_PATH, read_only: bool = False):
+        if read_only:
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+            uri = f"{pathlib.Path(path).resolve().as_uri()}?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # The connection is shared with the database executor thread; all
+        # access is serialised by the caller.
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+        with self.conn:
+            for table in TABLES:
+                self.conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ("
+                    " id TEXT PRIMARY KEY,"
+                    " discord_id TEXT NOT NULL,"
+                    " minecraft_name TEXT,"
+                    " data TEXT NOT NULL)"
+                )
+                self.conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {table}_discord_id"
+                    f" ON {table} (discord_id)"
+                )
+                self.conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {table}_minecraft_name"
+                    f" ON {table} (minecraft_name COLLATE NOCASE)"
+                )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+
+    def _check_table(self, table: str) -> str:
+        # Table names are interpolated into SQL, so only allow the known ones
+        if table not in TABLES:
+            raise ValueError(f"Unknown table '{table}'")
+        return table
+
+    def all(self, table: str) -> Iterator[dict[str, Any]]:
+        cursor = self.conn.execute(f"SELECT data FROM {self._check_table(table)}")
+        for (data,) in cursor:
+            yield cast(dict[str, Any], loads(data))
+
+    def insert(self, table: str, record: dict[str, Any]) -> bool:
+        try:
+            with self.conn:
+                self.conn.execute(
+                    f"INSERT INTO {self._check_table(table)}"
+                    " (id, discord_id, minecraft_name, data) VALUES (?, ?, ?, ?)",
+                    (
+                        record["id"],
+                        record["discord_id"],
+                        record["minecraft_name"],
+                        dumps(record),
+                    ),
+                )
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def update(self, table: str, record: dict[str, Any]) -> bool:
+        with self.conn:
+            cursor = self.conn.execute(
+                f"UPDATE {self._check_table(table)}"
+                " SET discord_id = ?, minecraft_name = ?, data = ? WHERE id = ?",
+                (
+                    record["discord_id"],
+                    record["minecraft_name"],
+                    dumps(record),
+                    record["id"],
+                ),
+            )
+        return cursor.rowcount > 0
+
+    def delete(self, table: str, player_id: str) -> bool:
+        with self.conn:
+            cursor = self.conn.execute(
+                f"DELETE FROM {self._check_table(table)} WHERE id = ?", (player_id,)
+            )
+        return cursor.rowcount > 0
+
+    def delete_many(self, table: str, player_ids: Sequence[str]) -> int:
+        with self.conn:
+            cursor = self.conn.executemany(
+                f"DELETE FROM {self._check_table(table)} WHERE id = ?",
+                [(player_id,) for player_id in player_ids],
+            )
+        return cursor.rowcount
+
+    def insert_many(
+        self, table: str, records: Sequence[dict[str, Any]], replace: bool = False
+    ) -> int:
+        with self.conn:
+            cursor = self.conn.executemany(
+                f"INSERT OR {'REPLACE' if replace else 'IGNORE'}"
+                f" INTO {self._check_table(table)}"
+                " (id, discord_id, minecraft_name, data) VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        record["id"],
+                        record["discord_id"],
+                        record["minecraft_name"],
+                        dumps(record),
+                    )
+                    for record in records
+                ],
+            )
+        return cursor.rowcount
+
+    def apply(self, ops: Sequence[WriteOp]) -> None:
+        with self.conn:
+            for op in ops:
+                table = self._check_table(op.table)
+                if op.action == "delete":
+                    cursor = self.conn.execute(
+                        f"DELETE FROM {table} WHERE id = ?", (op.player_id,)
+                    )
+                    done = cursor.rowcount > 0
+                else:
+                    record = cast(dict[str, Any], op.record)
+                    row = (
+                        record["discord_id"],
+                        record["minecraft_name"],
+                        dumps(record),
+                        op.player_id,
+                    )
+                    if op.action == "insert":
+                        try:
+                            self.conn.execute(
+                                f"INSERT INTO {table}"
+                                " (discord_id, minecraft_name, data, id) VALUES (?, ?, ?, ?)",
+                                row,
+                            )
+                        except sqlite3.IntegrityError:
+                            raise _op_error(op) from None
+                        done = True
+                    else:
+                        cursor = self.conn.execute(
+                            f"UPDATE {table}"
+                            " SET discord_id = ?, minecraft_name = ?, data = ? WHERE id = ?",
+                            row,
+                        )
+                        done = cursor.rowcount > 0
+                if not done:
+                    # Leaving the `with` block rolls back the ops already run
+                    raise _op_error(op)
+
+    def get_meta(self, key: str) -> str | None:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else cast(str, row[0])
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+            )
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def migrate_json_to_sqlite(json_path: str, storage: SQLiteStorage) -> int:
+    """
+    Copy the players from a TinyDB `players.json` into SQLite, once.
+
+    The JSON file is left untouched as a backup. Returns the number of
+    records copied (0 if the migration already ran or there is nothing to copy).
+    """
+    if storage.get_meta("migrated_from_json") is not None:
+        return 0
+    if not os.path.exists(json_path) or os.path.getsize(json_path) == 0:
+        storage.set_meta("migrated_from_json", "")
+        return 0
+
+    with open(json_path) as f:
+        tables = cast(dict[str, dict[str, dict[str, Any]]], json.load(f))
+
+    copied = 0
+    with storage.conn:
+        for table in TABLES:
+            for record in tables.get(table, {}).values():
+                storage.conn.execute(
+                    f"INSERT OR REPLACE INTO {table}"
+                    " (id, discord_id, minecraft_name, data) VALUES (?, ?, ?, ?)",
+                    (
+                        record["id"],
+                        record["discord_id"],
+                        record["minecraft_name"],
+                        dumps(record),
+                    ),
+                )
+                copied += 1
+        storage.conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            ("migrated_from_json", json_path),
+        )
+    return copied
+
+
+def open_storage(backend: str = DB_BACKEND, read_only: bool = False) -> StorageBackend:
+    """
+    Open the storage backend selected by the `DB_BACKEND` setting. With
+    `read_only` nothing is created, migrated or written, and a missing store
+    raises FileNotFoundError.
+    """
+    if backend == "tinydb":
+        return TinyDBStorage(JSON_PATH, write_behind=DB_WRITE_BEHIND, read_only=read_only)
+    if backend == "sqlite":
+        if read_only:
+            return SQLiteStorage(SQLITE_PATH, read_only=True)
+        storage = SQLiteStorage(SQLITE_PATH)
+        copied = migrate_json_to_sqlite(JSON_PATH, storage)
+        if copied:
+            log.info("Migrated %d players from %s to %s", copied, JSON_PATH, SQLITE_PATH)
+        return storage
+    raise DatabaseInitializationError(
+        f"Unknown DB_BACKEND '{backend}'. Use 'tinydb' or 'sqlite'."
+    )
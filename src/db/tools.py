@@ -0,0 +1,340 @@
+"""
+Export and import the player roster as NDJSON, one player per line.
+
+    python -m src.db.tools export [-o players.ndjson] [--table ist_players]
+    python -m src.db.tools import players.ndjson [--replace] [--chunk-size 50000]
+    python -m src.db.tools import players.ndjson --check
+
+Lines are the stored player records, IST players first. On import each line
+is validated against `ISTPlayer` / `InvitedPlayer`, told apart by their
+fields, and checked like `Database.commit` would: Discord ids and
+(case-insensitive) Minecraft names must stay unique across the roster, and
+`invited_by` must name an IST player stored or earlier in the file. Players
+are written in chunks of one storage write each, so memory stays at one
+chunk plus the keys of the roster, whatever the file size. Players whose id
+is already stored are skipped, or replaced with `--replace`. `--check` runs
+the same checks against the stored roster, opened read-only, and writes
+nothing. Both commands work on the DB_BACKEND storage directly: stop the
+bot first, it only reads the storage at startup. TinyDB rewrites its whole
+file on every chunk, so prefer SQLite for large rosters.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from types import UnionType
+from typing import IO, Any, Iterator, Optional, Union, get_args, get_origin, get_type_hints
+
+from src.db.player import InvitedPlayer, ISTPlayer
+from src.db.storage import DB_BACKEND, TABLES, StorageBackend, dumps, loads, open_storage
+from src.utils.log import setup_logging, stop_logging
+
+log = logging.getLogger(__name__)
+
+# --- Configuration ---
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "50000"))
+# --- End Configuration ---
+
+
+class InvalidRecordError(ValueError):
+    """Raised for an NDJSON line that isn't a valid player."""
+
+    def __init__(self, line_number: int, reason: str):
+        self.line_number = line_number
+        self.reason = reason
+        super().__init__(f"Line {line_number}: {reason}")
+
+
+# --------------------------
+# ✅ VALIDATION
+# --------------------------
+# Field -> (accepted classes, class of list items or None), from the TypedDicts.
+# Decoded JSON only holds exact builtins, so classes are compared directly,
+# which also keeps a `true` out of an int field.
+FieldTypes = dict[str, tuple[frozenset[type], Optional[type]]]
+
+
+def _field_types(player_type: type) -> FieldTypes:
+    fields: FieldTypes = {}
+    for name, hint in get_type_hints(player_type).items():
+        options = get_args(hint) if get_origin(hint) in (Union, UnionType) else (hint,)
+        types: set[type] = set()
+        item_type: Optional[type] = None
+        for option in options:
+            if get_origin(option) is list:
+                types.add(list)
+                item_type = get_args(option)[0]
+            else:
+                types.add(option)
+        fields[name] = (frozenset(types), item_type)
+    return fields
+
+
+# Table -> (required fields, field types)
+PLAYER_TYPES: dict[str, tuple[frozenset[str], FieldTypes]] = {
+    "ist_players": (ISTPlayer.__required_keys__, _field_types(ISTPlayer)),
+    "invited_players": (InvitedPlayer.__required_keys__, _field_types(InvitedPlayer)),
+}
+
+
+def validate(record: Any, line_number: int = 0) -> str:
+    """Check `record` is an ISTPlayer or InvitedPlayer, returning its table."""
+    if record.__class__ is not dict:
+        raise InvalidRecordError(line_number, "not a JSON object")
+    table = "ist_players" if "invite_limit" in record else "invited_players"
+    required, field_types = PLAYER_TYPES[table]
+
+    if not required <= record.keys():
+        missing = sorted(required - record.keys())
+        raise InvalidRecordError(line_number, f"missing {', '.join(missing)}")
+    for name, value in record.items():
+        if name not in field_types:
+            raise InvalidRecordError(line_number, f"unknown field '{name}'")
+        types, item_type = field_types[name]
+        if value.__class__ not in types:
+            raise InvalidRecordError(line_number, f"bad value for '{name}': {value!r}")
+        if item_type is not None:
+            for item in value:
+                if item.__class__ is not item_type:
+                    raise InvalidRecordError(line_number, f"bad item in '{name}': {item!r}")
+    return table
+
+
+Key = tuple[str, str]  # (table, player id)
+
+
+class RosterKeys:
+    """
+    The ids, Discord ids and Minecraft names taken so far, to check imported
+    players against the stored roster and the lines before them.
+    """
+
+    def __init__(self, storage: Optional[StorageBackend] = None):
+        # Discord id and case-folded Minecraft name of every player
+        self.players: dict[Key, tuple[str, Optional[str]]] = {}
+        self.by_discord_id: dict[str, Key] = {}
+        self.by_minecraft_name: dict[str, Key] = {}
+        if storage is not None:
+            for table in TABLES:
+                for record in storage.all(table):
+                    self._claim((table, record["id"]), record)
+
+    def _claim(self, key: Key, record: dict[str, Any]) -> None:
+        name = record["minecraft_name"]
+        name_key = name.casefold() if name else None
+        self.players[key] = (record["discord_id"], name_key)
+        self.by_discord_id[record["discord_id"]] = key
+        if name_key:
+            self.by_minecraft_name[name_key] = key
+
+    def _release(self, key: Key) -> None:
+        discord_id, name_key = self.players.pop(key)
+        if self.by_discord_id.get(discord_id) == key:
+            del self.by_discord_id[discord_id]
+        if name_key and self.by_minecraft_name.get(name_key) == key:
+            del self.by_minecraft_name[name_key]
+
+    def check(
+        self, table: str, record: dict[str, Any], replace: bool, line_number: int = 0
+    ) -> bool:
+        """
+        Check `record` can join the roster and take its keys. Returns False if
+        it will be skipped, its id being taken and `replace` off.
+        """
+        key = (table, record["id"])
+        if key in self.players and not replace:
+            return False
+
+        owner = self.by_discord_id.get(record["discord_id"])
+        if owner is not None and owner != key:
+            raise InvalidRecordError(
+                line_number, f"discord_id {record['discord_id']} is taken by player {owner[1]}"
+            )
+        name = record["minecraft_name"]
+        owner = self.by_minecraft_name.get(name.casefold()) if name else None
+        if owner is not None and owner != key:
+            raise InvalidRecordError(
+                line_number, f"minecraft_name {name} is taken by player {owner[1]}"
+            )
+        inviter = ("ist_players", record["invited_by"]) if table == "invited_players" else None
+        if inviter is not None and inviter not in self.players:
+            raise InvalidRecordError(
+                line_number, f"invited_by {record['invited_by']} is not an IST player"
+            )
+
+        if key in self.players:
+            self._release(key)
+        self._claim(key, record)
+        return True
+
+
+# --------------------------
+# 📤 EXPORT
+# --------------------------
+def export_players(
+    storage: StorageBackend, out: IO[str], tables: tuple[str, ...] = TABLES
+) -> int:
+    """Write the players of `tables` to `out` as NDJSON. Returns how many."""
+    exported = 0
+    for table in tables:
+        for record in storage.all(table):
+            out.write(dumps(record))
+            out.write("\n")
+            exported += 1
+    return exported
+
+
+# --------------------------
+# 📥 IMPORT
+# --------------------------
+def read_players(lines: IO[bytes]) -> Iterator[tuple[int, str, dict[str, Any]]]:
+    """Yield (line number, table, record) for every non-blank line, validated."""
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = loads(line)
+        except ValueError as e:
+            raise InvalidRecordError(line_number, f"invalid JSON ({e})") from None
+        yield line_number, validate(record, line_number), record
+
+
+def import_players(
+    storage: Optional[StorageBackend],
+    lines: IO[bytes],
+    replace: bool = False,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    dry_run: bool = False,
+) -> tuple[int, int]:
+    """
+    Import NDJSON players into `storage`, one storage write per chunk.
+    With `dry_run` they are only checked against it, and with no storage
+    against each other. Returns the number of (players read, written).
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    keys = RosterKeys(storage)
+    chunks: dict[str, list[dict[str, Any]]] = {table: [] for table in TABLES}
+    read = written = 0
+
+    def write(table: str) -> None:
+        nonlocal written
+        if storage is not None and not dry_run and chunks[table]:
+            written += storage.insert_many(table, chunks[table], replace)
+            storage.flush()
+        chunks[table] = []
+
+    for line_number, table, record in read_players(lines):
+        read += 1
+        if not keys.check(table, record, replace, line_number):
+            continue
+        chunks[table].append(record)
+        if len(chunks[table]) >= chunk_size:
+            write(table)
+            log.info("Imported %d players...", read)
+    for table in TABLES:
+        write(table)
+    return read, written
+
+
+# --------------------------
+# 🚀 CLI
+# --------------------------
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be positive, got {number}")
+    return number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.db.tools",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--backend", choices=("tinydb", "sqlite"), default=DB_BACKEND)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="write the roster as NDJSON")
+    export_parser.add_argument("-o", "--output", default="-", help="file, or - for stdout")
+    export_parser.add_argument("--table", choices=TABLES, help="only this table")
+
+    import_parser = commands.add_parser("import", help="load players from NDJSON")
+    import_parser.add_argument("input", help="file, or - for stdin")
+    import_parser.add_argument(
+        "--replace", action="store_true", help="overwrite players with the same id"
+    )
+    import_parser.add_argument("--chunk-size", type=_positive_int, default=IMPORT_CHUNK_SIZE)
+    import_parser.add_argument("--check", action="store_true", help="only validate the file")
+    args = parser.parse_args()
+
+    # Keep stdout for the NDJSON when exporting there
+    setup_logging(stream=sys.stderr)
+    start = time.perf_counter()
+    try:
+        if args.command == "export":
+            storage = open_storage(args.backend)
+            try:
+                tables = (args.table,) if args.table else TABLES
+                if args.output == "-":
+                    count = export_players(storage, sys.stdout, tables)
+                else:
+                    with open(args.output, "w", encoding="utf-8") as out:
+                        count = export_players(storage, out, tables)
+            finally:
+                storage.close()
+            log.info("Exported %d players in %.1fs", count, time.perf_counter() - start)
+            return
+
+        # A check reads the stored roster too, so it accepts what an import
+        # would, but never writes
+        storage: Optional[StorageBackend] = None
+        if not args.check:
+            storage = open_storage(args.backend)
+        else:
+            try:
+                storage = open_storage(args.backend, read_only=True)
+            except FileNotFoundError:
+                log.info("Nothing stored yet, checking the file on its own")
+        try:
+            if args.input == "-":
+                read, written = import_players(
+                    storage, sys.stdin.buffer, args.replace, args.chunk_size, args.check
+                )
+            else:
+                with open(args.input, "rb") as lines:
+                    read, written = import_players(
+                        storage, lines, args.replace, args.chunk_size, args.check
+                    )
+        finally:
+            if storage is not None:
+                storage.close()
+        if args.check:
+            log.info("%d valid players", read)
+        else:
+            log.info(
+                "Imported %d players (%d skipped) in %.1fs",
+                written,
+                read - written,
+                time.perf_counter() - start,
+            )
+    except InvalidRecordError as e:
+        if args.check:
+            log.error("Invalid player at line %d: %s", e.line_number, e.reason)
+        else:
+            log.error(
+                "Import stopped at line %d: %s. Chunks before it were written;"
+                " fix the file and import again with --replace.",
+                e.line_number,
+                e.reason,
+            )
+        sys.exit(1)
+    finally:
+        stop_logging()
+
+
+if __name__ == "__main__":
+    main()
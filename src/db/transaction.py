@@ -0,0 +1,181 @@
+"""
+Units of work over the Database.
+
+    with db.transaction() as tx:
+        inviter = tx.find_player(inviter_id)
+        tx.add_invited(invited)
+        tx.update_player({**inviter, "invited_ids": [...]})
+
+Reads go through the catalog and remember the `version` of every player they
+see; writes are only buffered. On commit the Database checks that none of
+those players changed since, that no Minecraft name ends up linked twice,
+then applies every write in one storage write (`StorageBackend.apply`).
+A transaction that loses a race raises ConcurrentModificationError and
+writes nothing, so the caller can read again and retry.
+"""
+
+from typing import TYPE_CHECKING, Any, Literal, Optional, cast
+
+from src.db.player import *
+from src.db.records import PlayerRecord
+from src.db.storage import TABLES, PLAYER_TYPES
+from src.errors.db import PlayerAlreadyExistsError, PlayerNotFoundError, UpdateError
+
+if TYPE_CHECKING:
+    from src.db.db import Database
+
+Key = tuple[str, str]  # (table, player id)
+Action = Literal["insert", "update", "replace", "delete"]
+
+
+class Transaction:
+    """Buffered writes plus the versions they were based on, see module docs."""
+
+    def __init__(self, database: "Database"):
+        self.database = database
+        # Version of every player read, None if it was looked up and missing
+        self.reads: dict[Key, Optional[int]] = {}
+        # Net effect on each player written; inserts, updates and replaces
+        # carry the fields to write, only updates are merged over the stored
+        # player
+        self.writes: dict[Key, tuple[Action, Optional[dict[str, Any]]]] = {}
+        self.done = False
+        # Set before the first commit runs, so leaving the `with` block
+        # doesn't commit again after a failed explicit `commit()`
+        self.attempted = False
+
+    def __enter__(self) -> "Transaction":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is None and not self.attempted:
+            self.commit()
+
+    # --------------------------
+    # 🔍 READS
+    # --------------------------
+    def _record(self, key: Key) -> Optional[PlayerRecord]:
+        record = self.database.catalog.index(key[0]).get(key[1])
+        self.reads.setdefault(key, None if record is None else record.version)
+        return record
+
+    def _view(self, key: Key) -> Optional[dict[str, Any]]:
+        """The player at `key` as this transaction would leave it."""
+        action, data = self.writes.get(key, (None, None))
+        if action == "delete":
+            return None
+        if action in ("insert", "replace"):
+            return dict(cast(dict[str, Any], data))
+        record = self._record(key)
+        if record is None:
+            return None
+        return {**record.to_dict(), **(data or {})}
+
+    def find_player(self, player_id: str) -> ISTPlayer | InvitedPlayer | None:
+        """Get player by ID, or None. IST players shadow invited ones."""
+        for table in TABLES:
+            player = self._view((table, player_id))
+            if player is not None:
+                return cast(ISTPlayer | InvitedPlayer, player)
+        return None
+
+    def _find_by(self, field: str, value: str) -> ISTPlayer | InvitedPlayer | None:
+        def matches(player: Optional[dict[str, Any]]) -> bool:
+            if player is None or player[field] is None:
+                return False
+            if field == "minecraft_name":
+                return cast(str, player[field]).casefold() == value.casefold()
+            return player[field] == value
+
+        # This transaction's own writes first, they may have moved the key
+        for key in self.writes:
+            player = self._view(key)
+            if matches(player):
+                return cast(ISTPlayer | InvitedPlayer, player)
+
+        catalog = self.database.catalog
+        record = (
+            catalog.get_by_minecraft_name(value)
+            if field == "minecraft_name"
+            else catalog.get_by_discord_id(value)
+        )
+        if record is None:
+            return None
+        player = self._view((record.table, record.id))
+        return cast(ISTPlayer | InvitedPlayer, player) if matches(player) else None
+
+    def find_by_discord_id(self, discord_id: str) -> ISTPlayer | InvitedPlayer | None:
+        return self._find_by("discord_id", discord_id)
+
+    def find_by_minecraft_name(self, name: str) -> ISTPlayer | InvitedPlayer | None:
+        """Case-insensitive, like `Database.search_minecraft_name`."""
+        return self._find_by("minecraft_name", name)
+
+    # --------------------------
+    # ✏️ WRITES
+    # --------------------------
+    def _add(self, table: str, player: dict[str, Any]) -> None:
+        key = (table, player["id"])
+        action, _ = self.writes.get(key, (None, None))
+        if action == "delete":
+            # Deleted then added back: the stored player is replaced whole
+            self.writes[key] = ("replace", dict(player))
+        elif action is not None or self._record(key) is not None:
+            raise PlayerAlreadyExistsError(player["id"])
+        else:
+            self.writes[key] = ("insert", dict(player))
+
+    def add_ist(self, ist_player: ISTPlayer) -> None:
+        self._add("ist_players", dict(ist_player))
+
+    def add_invited(self, invited_player: InvitedPlayer) -> None:
+        self._add("invited_players", dict(invited_player))
+
+    def update(self, table: str, player: dict[str, Any]) -> None:
+        """Update the fields given in `player` of the player in `table`."""
+        key = (table, player["id"])
+        action, data = self.writes.get(key, (None, None))
+        if action is None:
+            if self._record(key) is None:
+                raise UpdateError(player["id"], PLAYER_TYPES[table])
+            self.writes[key] = ("update", dict(player))
+        elif action == "delete":
+            raise UpdateError(player["id"], PLAYER_TYPES[table])
+        else:
+            self.writes[key] = (action, {**cast(dict[str, Any], data), **player})
+
+    def update_player(self, player: ISTPlayer | InvitedPlayer) -> None:
+        """Update a player of either type, told apart like `Database.update_player`."""
+        if is_ist_player(player):
+            self.update("ist_players", dict(player))
+        elif is_invited_player(player):
+            self.update("invited_players", dict(player))
+        else:
+            raise PlayerNotFoundError(player["id"])
+
+    def delete(self, table: str, player_id: str) -> bool:
+        """Delete the player from `table`. Returns False if it isn't there."""
+        key = (table, player_id)
+        action, _ = self.writes.get(key, (None, None))
+        if action == "insert":
+            del self.writes[key]
+        elif action in ("update", "replace") or (action is None and self._record(key) is not None):
+            self.writes[key] = ("delete", None)
+        else:
+            return False
+        return True
+
+    def delete_player(self, player_id: str) -> None:
+        if not any(self.delete(table, player_id) for table in TABLES):
+            raise PlayerNotFoundError(player_id)
+
+    # --------------------------
+    # 💾 COMMIT
+    # --------------------------
+    def commit(self) -> None:
+        """Apply the buffered writes, see `Database.commit`."""
+        if self.done:
+            raise RuntimeError("Transaction already committed")
+        self.attempted = True
+        self.database.commit(self)
+        self.done = True
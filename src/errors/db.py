@@ -92,3 +92,37 @@ class PlayerAlreadyExistsError(DatabaseError):
         self.player_id = player_id
         self.message = message or f"Player with ID '{player_id}' already exists."
         super().__init__(self.message)
+
+
+class ConcurrentModificationError(DatabaseError):
+    """Raised when a transaction commits over a player changed since it was read."""
+
+    def __init__(self, player_id: str, message: Optional[str] = None):
+        self.player_id = player_id
+        self.message = (
+            message or f"Player with ID '{player_id}' was modified by another operation."
+        )
+        super().__init__(self.message)
+
+
+class MinecraftNameTakenError(DatabaseError):
+    """Raised when a Minecraft name is already linked to another player."""
+
+    def __init__(self, minecraft_name: str, message: Optional[str] = None):
+        self.minecraft_name = minecraft_name
+        self.message = (
+            message or f"Minecraft name '{minecraft_name}' is already linked to another player."
+        )
+        super().__init__(self.message)
+
+
+class InviteLimitReachedError(DatabaseError):
+    """Raised when an IST player has no invites left."""
+
+    def __init__(self, player_id: str, invite_limit: int, message: Optional[str] = None):
+        self.player_id = player_id
+        self.invite_limit = invite_limit
+        self.message = (
+            message or f"Player with ID '{player_id}' has used all {invite_limit} invites."
+        )
+        super().__init__(self.message)
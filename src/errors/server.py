@@ -0,0 +1,55 @@
+"""
+Custom exceptions for the web server and outbound HTTP calls.
+These exceptions provide more specific error types than generic exceptions
+to allow for better error handling in the application.
+"""
+
+from typing import Optional
+
+
+class ServerError(Exception):
+    """Base class for all server-related exceptions."""
+
+    pass
+
+
+class UpstreamError(ServerError):
+    """Raised when an external API fails in a way that is worth retrying later."""
+
+    def __init__(
+        self, service: str, status: Optional[int] = None, message: Optional[str] = None
+    ):
+        self.service = service
+        self.status = status
+        self.message = message or (
+            f"{service} request failed"
+            + (f" with status {status}." if status is not None else ".")
+        )
+        super().__init__(self.message)
+
+
+class AuthCapacityError(ServerError):
+    """Raised when too many OAuth logins are pending to start another one."""
+
+    def __init__(self, limit: int, message: Optional[str] = None):
+        self.limit = limit
+        self.message = (
+            message or f"Too many pending authentications (limit {limit})."
+        )
+        super().__init__(self.message)
+
+
+class NotInGuildError(ServerError):
+    """Raised when a user has to be a member of the guild but isn't."""
+
+    def __init__(self, message: Optional[str] = None):
+        self.message = message or "User isn't a member of the guild."
+        super().__init__(self.message)
+
+
+class IPCError(ServerError):
+    """Raised when a request to the bot process over IPC fails."""
+
+    def __init__(self, message: Optional[str] = None):
+        self.message = message or "IPC request failed."
+        super().__init__(self.message)
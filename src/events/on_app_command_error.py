@@ -0,0 +1,52 @@
+import logging
+import math
+
+import discord
+from discord import app_commands
+from discord.ext.commands import Bot
+from beartype import beartype
+
+import src.constants as const
+from src.utils.log import bind_interaction
+from src.utils.metrics import rate_limited_total
+from src.utils.ratelimit import RateLimited
+
+log = logging.getLogger(__name__)
+
+
+@beartype
+def setup(bot: Bot) -> None:
+    @bot.tree.error
+    async def on_app_command_error(
+        interaction: discord.Interaction, error: app_commands.AppCommandError
+    ) -> None:
+        bind_interaction(interaction)
+        if isinstance(error, RateLimited):
+            rate_limited_total.inc("command", error.scope)
+            message = (
+                f"Slow down! Please try again in {math.ceil(error.retry_after)} seconds."
+                if error.scope == "user"
+                else "The bot is busy right now. Please try again in a few seconds."
+            )
+        else:
+            log.error(
+                "Error in command '%s': %s",
+                interaction.command and interaction.command.name,
+                error,
+                exc_info=error,
+            )
+            message = "Oops! Something went wrong. Please try again later."
+
+        try:
+            if not interaction.response.is_done():
+                await interaction.response.send_message(
+                    message,
+                    ephemeral=True,
+                    delete_after=const.DEFAULT_MESSAGE_DELETE_DELAY,
+                )
+            else:
+                await interaction.followup.send(message, ephemeral=True)
+        except Exception as followup_error:
+            log.error("Failed to send error message to user: %s", followup_error)
+
+    _ = on_app_command_error  # Silence unaccessed function warning
@@ -1,22 +1,62 @@
+import hashlib
+import json
+import logging
+import os
+
 from discord.ext.commands import Bot
 from beartype import beartype
 
 import src.constants as const
+from src.db.storage import DATA_DIR, atomic_write_json
+from src.utils.gateway import startup_report
+
+log = logging.getLogger(__name__)
+
+# Hash of the last command tree synced to each guild, so restarts and gateway
+# reconnects only hit the rate-limited sync endpoint when commands change
+COMMAND_SYNC_PATH = os.path.join(DATA_DIR, "command_sync.json")
+
+
+def command_tree_hash(bot: Bot) -> str:
+    """Stable hash of the JSON payload that a guild sync would upload."""
+    payload = [
+        command.to_dict(bot.tree)
+        for command in bot.tree.get_commands(guild=const.guild)
+    ]
+    payload.sort(key=lambda command: (command["name"], command.get("type", 1)))
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def load_synced_hashes() -> dict[str, str]:
+    try:
+        with open(COMMAND_SYNC_PATH) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
 
 
 @beartype
 def setup(bot: Bot) -> None:
+    initialized = False
+
     @bot.event
     async def on_ready() -> None:
+        # on_ready fires again after every gateway reconnect; the guild, the
+        # commands and the roles only need setting up once per process
+        nonlocal initialized
+        if initialized:
+            log.info("✅ Reconnected to the gateway.")
+            return
+
         # Print bot information
         if bot.user is not None:
-            print(f"✅ Logged in as {bot.user} (ID: {bot.user.id})")
+            log.info("✅ Logged in as %s (ID: %d)", bot.user, bot.user.id)
         else:
-            print("❌ Bot user is None. Login might have failed.")
-        print("------")
+            log.error("❌ Bot user is None. Login might have failed.")
 
         if not const.GUILD_ID:
-            print(
+            log.warning(
                 "⚠️ GUILD_ID environment variable is not set. Skipping slash command sync to guild."
             )
             return
@@ -24,40 +64,51 @@ def setup(bot: Bot) -> None:
         # Check if the guild is valid
         const.guild = bot.get_guild(int(const.GUILD_ID))
         if not const.guild:
-            print(f"⚠️ Guild with ID {const.GUILD_ID} not found.")
+            log.warning("⚠️ Guild with ID %s not found.", const.GUILD_ID)
             return
 
-        # Sync slash commands to the guild
+        # Sync slash commands to the guild, unless they haven't changed
         try:
             bot.tree.copy_global_to(guild=const.guild)
-            synced = await bot.tree.sync(guild=const.guild)
-            print(f"✅ Synced {len(synced)} slash commands to guild {const.guild.id}.")
+            tree_hash = command_tree_hash(bot)
+            synced_hashes = load_synced_hashes()
+            if synced_hashes.get(str(const.guild.id)) == tree_hash:
+                log.info(
+                    "✅ Slash commands unchanged, skipping sync to guild %d.", const.guild.id
+                )
+            else:
+                synced = await bot.tree.sync(guild=const.guild)
+                synced_hashes[str(const.guild.id)] = tree_hash
+                atomic_write_json(COMMAND_SYNC_PATH, synced_hashes)
+                log.info(
+                    "✅ Synced %d slash commands to guild %d.", len(synced), const.guild.id
+                )
         except Exception as e:
-            print(f"⚠️ Failed to sync slash commands to guild {const.guild.id}: {e}")
+            log.exception("⚠️ Failed to sync slash commands to guild %d: %s", const.guild.id, e)
             return
-        print("------")
 
         const.ist_player_role = const.guild.get_role(const.IST_PLAYER_ROLE_ID)
         const.guest_player_role = const.guild.get_role(const.GUEST_PLAYER_ROLE_ID)
         const.linked_player_role = const.guild.get_role(const.LINKED_PLAYER_ROLE_ID)
 
         if not const.ist_player_role:
-            print("⚠️ IST_PLAYER_ROLE_ID role not found.")
+            log.warning("⚠️ IST_PLAYER_ROLE_ID role not found.")
 
         if not const.guest_player_role:
-            print("⚠️ GUEST_PLAYER_ROLE_ID role not found.")
+            log.warning("⚠️ GUEST_PLAYER_ROLE_ID role not found.")
 
         if not const.linked_player_role:
-            print("⚠️ LINKED_PLAYER_ROLE_ID role not found.")
+            log.warning("⚠️ LINKED_PLAYER_ROLE_ID role not found.")
 
-        print(
-            f"✅ Roles verified in guild '{const.guild}': "
-            f"ist_player_role: '{const.ist_player_role}', "
-            f"guest_player_role: '{const.guest_player_role}', "
-            f"linked_player_role: '{const.linked_player_role}'."
+        log.info(
+            "✅ Roles verified in guild '%s': "
+            "ist_player_role: '%s', guest_player_role: '%s', linked_player_role: '%s'.",
+            const.guild,
+            const.ist_player_role,
+            const.guest_player_role,
+            const.linked_player_role,
         )
-        print("------")
-        print("Bot is ready!")
-        print("------")
+        log.info("Bot is ready! %s", startup_report())
+        initialized = True
 
     _ = on_ready  # Silence unaccessed function warni
@@ -1,11 +1,17 @@
+import logging
 import typing
 import discord
 from discord import ui
 
 import src.constants as const
-from src.errors.db import SearchError
+from src.errors.db import MinecraftNameTakenError, SearchError
 from src.server.requests import *
-from src.db.db import db
+from src.db.aio import db
+from src.server.whitelist import whitelist_sync
+from src.utils.log import bind_interaction
+from src.utils.metrics import track_command
+
+log = logging.getLogger(__name__)
 
 class MinecraftAccountLinking(ui.Modal, title="Link Minecraft Account"):
     # Define the text input field
@@ -20,13 +26,17 @@ class MinecraftAccountLinking(ui.Modal, title="Link Minecraft Account"):
     )
 
     # This method is called when the user clicks the "Submit" button
+    @track_command("link_modal")
     async def on_submit(self, interaction: discord.Interaction):
+        bind_interaction(interaction)
+
         # Get the value entered by the user from the TextInput attribute
         username = self.mc_username.value
         discord_id = interaction.user.id
 
         # Check if the username exists
-        if not await fetch_uuid_async(username):
+        uuid = await fetch_uuid_async(username)
+        if not uuid:
             await interaction.response.send_message(
                 "That username does not exist. Please try again.\n\nIf you think this was a mistake, please contact a staff member.",
                 ephemeral=True,
@@ -34,35 +44,26 @@ class MinecraftAccountLinking(ui.Modal, title="Link Minecraft Account"):
             )
             return
 
-        # Check if the player exists in the database
-        player = None
+        # Link the account in one transaction, so a concurrent link of the same
+        # username (or by the same user) can't slip in between the checks
         try:
-            player = db.search_discord_id(str(discord_id))
+            player = await db.link_minecraft(str(discord_id), username, uuid)
         except SearchError as e:
-            print(f"SearchError: {e.message}")
+            log.info("SearchError: %s", e.message)
             await interaction.response.send_message(
                 "You have not been Authenticated Yet. Please try again.\n\nIf you think this was a mistake, please contact a staff member.",
                 ephemeral=True,
                 delete_after=const.DEFAULT_MESSAGE_DELETE_DELAY,
             )
             return
-
-        # Check if the username is already linked to another user
-        try:
-            result = db.search_minecraft_name(username)
-            if result and result["discord_id"] != str(discord_id):
-                await interaction.response.send_message(
-                    "That username is already linked to another account. Please try again.\n\nIf you think this was a mistake, please contact a staff member.",
-                    ephemeral=True,
-                    delete_after=const.DEFAULT_MESSAGE_DELETE_DELAY,
-                )
-                return
-        except SearchError as e:
-            pass  # No player found with that username, so we can proceed
-
-        # Update the player's Minecraft username in the database
-        player["minecraft_name"] = username
-        db.update_player(player)
+        except MinecraftNameTakenError:
+            await interaction.response.send_message(
+                "That username is already linked to another account. Please try again.\n\nIf you think this was a mistake, please contact a staff member.",
+                ephemeral=True,
+                delete_after=const.DEFAULT_MESSAGE_DELETE_DELAY,
+            )
+            return
+        previous_name, previous_uuid = player["minecraft_name"], player.get("minecraft_uuid")
 
         # Give the user the linked player role
         try:
@@ -70,30 +71,23 @@ class MinecraftAccountLinking(ui.Modal, title="Link Minecraft Account"):
                 assert const.linked_player_role, "Linked Player role is None"
                 await interaction.user.add_roles(const.linked_player_role)
             else:
-                print("Interaction user is not a member of the guild.")
+                log.warning("Interaction user is not a member of the guild.")
         except Exception as e:
-            print(f"Failed to add role to user: {e}")
+            log.error("Failed to add role to user: %s", e)
             await interaction.response.send_message(
                 "Failed to add role to user. Please contact a staff member.\n\nIf you think this was a mistake, please contact a staff member.",
                 ephemeral=True,
                 delete_after=const.DEFAULT_MESSAGE_DELETE_DELAY,
             )
 
-        # Whitelist the user on the Minecraft server
-        try:
-            await add_player_to_whitelist(player)
-        except Exception as e:
-            print(f"Failed to whitelist player: {e}")
-            await interaction.response.send_message(
-                "Failed to whitelist you on the Minecraft server. Please contact a staff member.\n\nIf you think this was a mistake, please contact a staff member.",
-                ephemeral=True,
-                delete_after=const.DEFAULT_MESSAGE_DELETE_DELAY,
-            )
-            return
+        # Queue the whitelist changes; the sync worker retries until the panel accepts them
+        if previous_name and previous_uuid and previous_uuid != uuid:
+            await whitelist_sync.enqueue_remove(previous_uuid, previous_name)
+        await whitelist_sync.enqueue_add(uuid, username)
 
         # Send a confirmation message back to the user (ephemeral is usually best)
         await interaction.response.send_message(
-            f"Okay, I've recorded your Minecraft username as: `{username}` and you've been whitlisted on the minecraft server! Thanks!",
+            f"Okay, I've recorded your Minecraft username as: `{username}` and you'll be whitelisted on the minecraft server in a moment! Thanks!",
             ephemeral=True,
             delete_after=const.DEFAULT_MESSAGE_DELETE_DELAY,
         )
@@ -102,7 +96,7 @@ class MinecraftAccountLinking(ui.Modal, title="Link Minecraft Account"):
     async def on_error(
         self, interaction: discord.Interaction, error: Exception
     ) -> None:
-        print(f"Error in MinecraftUsernameModal: {error}")  # Log the error
+        log.error("Error in MinecraftUsernameModal: %s", error, exc_info=error)
         # Notify the user something went wrong
         try:
             # Check if response already sent, use followup if needed
@@ -117,4 +111,4 @@ class MinecraftAccountLinking(ui.Modal, title="Link Minecraft Account"):
                     ephemeral=True,
                 )
         except Exception as followup_error:
-            print(f"Failed to send error message to user: {followup_error}")
\ No newline at end of file
+            log.error("Failed to send error message to user: %s", followup_error)
\ No newline at end of file
@@ -0,0 +1,339 @@
+"""
+The OAuth callback web app, without the Discord and database side of logins.
+
+`/callback` checks the OAuth state, talks to FenixEdu and hands the result to
+a `Logins`: in the bot process that is the auth pipeline (see
+`src.server.web_server`), in a web worker it is the bot over IPC (see
+`src.server.worker`). Nothing here imports the database or the bot, so the
+workers can serve this app without loading either.
+"""
+
+import asyncio
+import logging
+import os
+import secrets
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+from urllib.parse import urlparse
+
+import aiohttp
+from aiohttp import web
+
+from src.server import pages
+from src.server.http_client import http_client
+from src.server.middleware import correlation_middleware, rate_limit_middleware
+from src.server.pages import Outcome
+from src.server.state_store import PendingAuth, StateStore, open_state_store
+from src.utils import diagnostics
+from src.utils.log import set_context
+from src.utils.metrics import handle_metrics, registry
+
+log = logging.getLogger(__name__)
+
+# --- Configuration (Replace with your actual values, consider using environment variables) ---
+FENIX_CLIENT_ID = os.getenv("FENIX_CLIENT_ID")
+FENIX_CLIENT_SECRET = os.getenv("FENIX_CLIENT_SECRET")
+# Make sure this matches the Redirect URL in your FenixEdu application registration
+FENIX_REDIRECT_URI = "http://localhost:8080/callback"
+FENIX_BASE_URL = "https://fenix.tecnico.ulisboa.pt"
+ACCESS_TOKEN_PATH = "/oauth/access_token"
+PERSON_API_PATH = "/api/fenix/v1/person"
+API_REQUEST_TIMEOUT = 10
+CONNECTION_CLEANUP_TIMEOUT = 180
+MAX_PENDING_AUTH = int(os.getenv("MAX_PENDING_AUTH", "1000"))
+# --- End Configuration ---
+
+# Pending logins by OAuth state (see src.server.state_store)
+state_store: StateStore = open_state_store(MAX_PENDING_AUTH, CONNECTION_CLEANUP_TIMEOUT)
+
+
+registry.gauge(
+    "auth_pending_connections",
+    "OAuth logins waiting for their callback.",
+    lambda: len(state_store),
+)
+
+
+def pending_auth_stats() -> dict[str, int]:
+    """Size of the pending OAuth state, for monitoring."""
+    return state_store.stats()
+
+
+def callback_address() -> tuple[str, int]:
+    """Host and port to serve `/callback` on, taken from FENIX_REDIRECT_URI."""
+    # Basic parsing, assumes http://host:port/path format
+    try:
+        parsed_uri = urlparse(FENIX_REDIRECT_URI)
+        return parsed_uri.hostname or "localhost", parsed_uri.port or 8080
+    except Exception:
+        log.warning(
+            "Could not parse REDIRECT_URI ('%s'). Defaulting server to localhost:8080",
+            FENIX_REDIRECT_URI,
+        )
+        return "localhost", 8080
+
+
+async def create_auth_url(discord_user_id: int) -> str:
+    """
+    Creates the authorization URL for FenixEdu OAuth.
+
+    Raises AuthCapacityError if MAX_PENDING_AUTH logins are already pending.
+    """
+    auth_id = secrets.token_urlsafe(16)
+
+    auth_url = f"{FENIX_BASE_URL}/oauth/userdialog?client_id={FENIX_CLIENT_ID}&redirect_uri={FENIX_REDIRECT_URI}&state={auth_id}"
+
+    # Remember who started the login until the callback comes back (or it expires)
+    await state_store.put(auth_id, PendingAuth(discord_user_id, time.time()))
+
+    return auth_url
+
+
+async def exchange_code_for_token(
+    auth_code: str, session: aiohttp.ClientSession
+) -> dict[str, str] | None:
+    """
+    Exchanges an authorization code for an access token and refresh token.
+
+    Args:
+        auth_code: The authorization code received from the FenixEdu callback.
+        session: An active aiohttp.ClientSession instance.
+
+    Returns:
+        A dictionary containing token information (access_token, refresh_token,
+        expires_in, etc.) if successful, None otherwise.
+    """
+    if not auth_code:
+        log.error("exchange_code_for_token called without an authorization code.")
+        return None
+
+    token_url = f"{FENIX_BASE_URL}{ACCESS_TOKEN_PATH}"
+    # Use base registered URI for token exchange based on Fenix docs example
+    redirect_uri_for_exchange = FENIX_REDIRECT_URI.split("?")[0]
+
+    token_payload = {
+        "client_id": FENIX_CLIENT_ID,
+        "client_secret": FENIX_CLIENT_SECRET,
+        "redirect_uri": redirect_uri_for_exchange,
+        "code": auth_code,
+        "grant_type": "authorization_code",
+    }
+    headers = {
+        "Accept": "application/json",
+        "Content-Type": "application/x-www-form-urlencoded",
+    }
+
+    try:
+        timeout = aiohttp.ClientTimeout(total=API_REQUEST_TIMEOUT)
+        async with session.post(
+            token_url,
+            data=token_payload,
+            headers=headers,
+            timeout=timeout,
+            trace_request_ctx={"target": "fenix_token"},
+        ) as response:
+            if response.status == 200:
+                try:
+                    token_data = await response.json()
+                    return token_data
+                except aiohttp.ContentTypeError:
+                    resp_text = await response.text()
+                    log.error(
+                        "Failed to decode JSON response from %s. Response: %s",
+                        token_url,
+                        resp_text[:200],
+                    )
+                    return None
+            else:
+                error_details = await response.text()
+                log.error(
+                    "Failed to exchange code for token. Status: %d, Details: %s",
+                    response.status,
+                    error_details[:200],
+                )
+                return None
+    except asyncio.TimeoutError:
+        log.error("Request to %s timed out during code exchange.", token_url)
+        return None
+    except aiohttp.ClientError as e:
+        log.error("Network or HTTP error during code exchange: %s", e)
+        return None
+    except Exception as e:
+        log.exception("Unexpected error during code exchange: %s", e)
+        return None
+
+
+async def get_fenix_user_info(
+    access_token: str, session: aiohttp.ClientSession
+) -> dict[str, str] | None:
+    """
+    Fetches user information from the FenixEdu /person API endpoint.
+
+    Args:
+        access_token: The valid OAuth 2.0 access token for the user.
+        session: An active aiohttp.ClientSession instance.
+
+    Returns:
+        A dictionary containing the user's information if successful, None otherwise.
+        The 'username' field typically holds the IST ID (e.g., istXXXXXX).
+    """
+    if not access_token:
+        log.error("get_fenix_user_info called without an access token.")
+        return None
+
+    target_url = f"{FENIX_BASE_URL}{PERSON_API_PATH}"
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    try:
+        timeout = aiohttp.ClientTimeout(total=API_REQUEST_TIMEOUT)
+        async with session.get(
+            target_url,
+            headers=headers,
+            timeout=timeout,
+            trace_request_ctx={"target": "fenix_person"},
+        ) as response:
+            if response.status == 200:
+                try:
+                    person_data = await response.json()
+                    return person_data
+                except aiohttp.ContentTypeError:
+                    resp_text = await response.text()
+                    log.error(
+                        "Failed to decode JSON response from %s. Response: %s",
+                        target_url,
+                        resp_text[:200],
+                    )
+                    return None
+            else:
+                error_details = await response.text()
+                log.error(
+                    "Failed to fetch user info. Status: %d, Details: %s",
+                    response.status,
+                    error_details[:200],
+                )
+                return None
+    except asyncio.TimeoutError:
+        log.error("Request to %s timed out.", target_url)
+        return None
+    except aiohttp.ClientError as e:
+        log.error("Network or HTTP error fetching user info: %s", e)
+        return None
+    except Exception as e:
+        log.exception("Unexpected error fetching user info: %s", e)
+        return None
+
+
+# --------------------------
+# 🔀 LOGIN HAND-OFF
+# --------------------------
+class Logins(ABC):
+    """
+    Where `/callback` hands completed logins: straight to the pipeline when it
+    runs in the bot process, or over IPC from a web worker.
+    """
+
+    @abstractmethod
+    async def submit(self, state: str, discord_user_id: int, ist_id: str) -> bool:
+        """Queue the Discord/DB work. Returns False if the bot is too busy."""
+
+    @abstractmethod
+    async def notify(self, discord_user_id: int, message: str) -> None:
+        """DM the user about a login that failed before reaching the pipeline."""
+
+    @abstractmethod
+    async def status(self, state: str) -> Optional[tuple[str, str]]:
+        """Status and message of the job for `state`, None if unknown."""
+
+
+# Where `create_app` keeps its `Logins`
+LOGINS_KEY = web.AppKey("logins", Logins)
+
+
+# --------------------------
+# 🌐 ROUTES
+# --------------------------
+async def handle_callback(request: web.Request) -> web.Response:
+    """Handles the OAuth callback from FenixEdu."""
+    # Extract parameters from query
+    auth_code = request.query.get("code", None)
+    auth_id = request.query.get("state", None)
+
+    if not auth_code or not auth_id:
+        log.warning("Callback received without code or state.")
+        return pages.respond(request, Outcome.INVALID_PARAMS)
+
+    # Check if the auth_id is valid and retrieve who started the login
+    pending = await state_store.pop(auth_id)
+    if pending is None:
+        log.warning("No pending login found for the provided auth_id.")
+        return pages.respond(request, Outcome.INTERACTION_MISSING)
+
+    logins = request.app[LOGINS_KEY]
+
+    # Gather user info from FenixEdu
+    session = http_client.session
+    token_result = await exchange_code_for_token(auth_code, session)
+    if not token_result:
+        log.error("Token exchange failed. No result returned.")
+        await logins.notify(
+            pending.discord_user_id,
+            "Failed to authenticate. Please try again. \n\n if the problem persists, contact the server admins.",
+        )
+        return pages.respond(request, Outcome.TOKEN_FAILED)
+
+    user_info = await get_fenix_user_info(token_result["access_token"], session)
+    if not user_info:
+        log.error("Failed to fetch user info. No result returned.")
+        await logins.notify(
+            pending.discord_user_id,
+            "Failed to authenticate. Please try again. \n\n if the problem persists, contact the server admins.",
+        )
+        return pages.respond(request, Outcome.USER_INFO_FAILED)
+
+    set_context(ist_id=user_info["username"])
+
+    # Hand the Discord/DB work to the pipeline and answer the browser right away
+    if not await logins.submit(auth_id, pending.discord_user_id, user_info["username"]):
+        log.error("Auth pipeline queue is full.")
+        await logins.notify(
+            pending.discord_user_id,
+            "The server is busy right now. Please run /auth again in a few minutes.",
+        )
+        return pages.respond(request, Outcome.BUSY)
+
+    return pages.respond(request, Outcome.PROCESSING)
+
+
+async def handle_callback_status(request: web.Request) -> web.Response:
+    """Reports the progress of the background work for an OAuth state."""
+    logins = request.app[LOGINS_KEY]
+    status = await logins.status(request.query.get("state", ""))
+    if status is None:
+        return web.json_response(
+            {"status": "unknown", "message": Outcome.INTERACTION_MISSING.message},
+            status=404,
+            headers={"Cache-Control": "no-store"},
+        )
+    return web.json_response(
+        {"status": status[0], "message": status[1]},
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+def create_app(logins: Logins) -> web.Application:
+    """
+    Builds the web application: OAuth callback, status polling and metrics.
+
+    Completed logins go to `logins`, so the same app runs in the bot process
+    and in the web workers.
+    """
+    app = web.Application(
+        middlewares=[correlation_middleware, rate_limit_middleware({"/callback"})]
+    )
+    app[LOGINS_KEY] = logins
+    app.router.add_get("/callback", handle_callback)
+    app.router.add_get(pages.STATUS_PATH, handle_callback_status)
+    app.router.add_get("/metrics", handle_metrics)
+    diagnostics.install(app)
+    return app
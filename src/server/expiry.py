@@ -0,0 +1,106 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+log = logging.getLogger(__name__)
+
+
+class ExpiryReaper:
+    """
+    Single background task that expires keys at their deadlines.
+
+    Deadlines live in a min-heap of `(deadline, seq, key)`, so scheduling is
+    O(log n). `discard` is O(1): it only forgets the live deadline, and the
+    stale heap entry is skipped when it surfaces. The heap is rebuilt once
+    stale entries outnumber live ones, which keeps memory bounded by the
+    number of live keys.
+    """
+
+    def __init__(self, on_expire: Callable[[list[str]], Awaitable[None]]):
+        self.on_expire = on_expire
+        self._heap: list[tuple[float, int, str]] = []
+        self._deadlines: dict[str, float] = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def __len__(self) -> int:
+        """Number of live (not yet expired or discarded) keys."""
+        return len(self._deadlines)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._deadlines
+
+    @property
+    def heap_size(self) -> int:
+        """Heap entries, including stale ones awaiting lazy removal."""
+        return len(self._heap)
+
+    def schedule(self, key: str, ttl: float) -> None:
+        """Expire `key` in `ttl` seconds, replacing any earlier deadline."""
+        deadline = time.monotonic() + ttl
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._seq), key))
+
+        # Only wake the reaper if this is now the earliest deadline
+        if self._heap[0][2] == key:
+            self._wakeup.set()
+        self._maybe_compact()
+
+    def discard(self, key: str) -> bool:
+        """Cancel the expiry of `key`. Returns False if it wasn't scheduled."""
+        return self._deadlines.pop(key, None) is not None
+
+    def _maybe_compact(self) -> None:
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [
+                entry
+                for entry in self._heap
+                if self._deadlines.get(entry[2]) == entry[0]
+            ]
+            heapq.heapify(self._heap)
+
+    def _pop_expired(self, now: float) -> list[str]:
+        expired: list[str] = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, key = heapq.heappop(self._heap)
+            if self._deadlines.get(key) == deadline:
+                del self._deadlines[key]
+                expired.append(key)
+        return expired
+
+    async def _run(self) -> None:
+        while True:
+            expired = self._pop_expired(time.monotonic())
+            if expired:
+                try:
+                    await self.on_expire(expired)
+                except Exception as e:
+                    log.exception("Failed to expire %d keys: %s", len(expired), e)
+
+            # Clear before reading the heap, so a schedule() from here on
+            # still wakes us up
+            self._wakeup.clear()
+            timeout = (
+                max(0.0, self._heap[0][0] - time.monotonic()) if self._heap else None
+            )
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
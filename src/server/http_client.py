@@ -0,0 +1,64 @@
+import os
+from typing import Optional
+
+import aiohttp
+
+from src.utils.metrics import http_trace_config
+
+# --- Configuration ---
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "10"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_TOTAL_TIMEOUT = float(os.getenv("HTTP_TOTAL_TIMEOUT", "10"))
+# --- End Configuration ---
+
+
+class HTTPClient:
+    """
+    Application-scoped aiohttp session shared by all outbound requests.
+
+    Reusing one pooled connector keeps TCP/TLS connections to Mojang, Fenix and
+    the whitelist panel alive between calls instead of handshaking every time.
+    Call sites can still pass a per-request `timeout` to override the default.
+    """
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            raise RuntimeError("HTTP client is not started. Call start() first.")
+        return self._session
+
+    async def start(self) -> None:
+        """Create the pooled session. Must run inside the event loop."""
+        if self._session is not None and not self._session.closed:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=HTTP_TOTAL_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            trace_configs=[http_trace_config()],
+        )
+
+    async def close(self) -> None:
+        """Close the session and every pooled connection."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+# Global instance for import
+http_client = HTTPClient()
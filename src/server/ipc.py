@@ -0,0 +1,222 @@
+"""
+Local IPC between the bot process and the web workers (`src.server.worker`).
+
+Messages are JSON lines over a Unix socket (IPC_SOCKET, if set) or a
+localhost TCP port (IPC_HOST/IPC_PORT). A client's first line must carry the
+shared IPC_SECRET, anything else drops the connection. After that, each
+request is `{"id": n, "type": ..., ...}` and its reply echoes the id, so one
+connection carries any number of concurrent requests.
+"""
+
+import asyncio
+import hmac
+import itertools
+import json
+import logging
+import os
+from typing import Any, Awaitable, Callable, Optional
+
+from src.errors.server import IPCError
+
+log = logging.getLogger(__name__)
+
+# --- Configuration ---
+IPC_SOCKET = os.getenv("IPC_SOCKET", "")  # Unix socket path; TCP if empty
+IPC_HOST = os.getenv("IPC_HOST", "127.0.0.1")
+IPC_PORT = int(os.getenv("IPC_PORT", "8099"))
+IPC_SECRET = os.getenv("IPC_SECRET", "")
+IPC_TIMEOUT = float(os.getenv("IPC_TIMEOUT", "10"))
+IPC_MAX_LINE = 64 * 1024
+# --- End Configuration ---
+
+Message = dict[str, Any]
+IPCHandler = Callable[[Message], Awaitable[Message]]
+
+
+def _encode(message: Message) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class IPCServer:
+    """Answers requests from the web workers with `handler`, one task each."""
+
+    def __init__(
+        self,
+        handler: IPCHandler,
+        secret: str = IPC_SECRET,
+        socket_path: str = IPC_SOCKET,
+        host: str = IPC_HOST,
+        port: int = IPC_PORT,
+    ):
+        self.handler = handler
+        self.secret = secret
+        self.socket_path = socket_path
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: set[asyncio.Task[Any]] = set()
+
+    @property
+    def address(self) -> str:
+        return self.socket_path or f"{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        if not self.secret:
+            raise ValueError("IPC_SECRET must be set to accept web worker connections.")
+        if self.socket_path:
+            self._server = await asyncio.start_unix_server(
+                self._serve, path=self.socket_path, limit=IPC_MAX_LINE
+            )
+        else:
+            self._server = await asyncio.start_server(
+                self._serve, self.host, self.port, limit=IPC_MAX_LINE
+            )
+        log.info("IPC server listening on %s", self.address)
+
+    async def _authenticate(self, reader: asyncio.StreamReader) -> bool:
+        try:
+            line = await asyncio.wait_for(reader.readline(), IPC_TIMEOUT)
+            secret = json.loads(line).get("secret", "")
+        except (asyncio.TimeoutError, ValueError, AttributeError):
+            return False
+        return isinstance(secret, str) and hmac.compare_digest(secret, self.secret)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        assert task is not None
+        self._connections.add(task)
+        requests: set[asyncio.Task[None]] = set()
+        try:
+            if not await self._authenticate(reader):
+                log.warning("Rejected an IPC connection with a bad secret.")
+                return
+            while line := await reader.readline():
+                request = asyncio.create_task(self._answer(line, writer))
+                requests.add(request)
+                request.add_done_callback(requests.discard)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+            log.warning("IPC connection dropped: %s", e)
+        finally:
+            await asyncio.gather(*requests, return_exceptions=True)
+            writer.close()
+            self._connections.discard(task)
+
+    async def _answer(self, line: bytes, writer: asyncio.StreamWriter) -> None:
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            reply = {"id": request_id, "ok": True, **await self.handler(request)}
+        except Exception as e:
+            log.exception("IPC request failed: %s", e)
+            reply = {"id": request_id, "ok": False, "error": str(e)}
+        if not writer.is_closing():
+            writer.write(_encode(reply))
+            await writer.drain()
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for task in self._connections:
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+
+class IPCClient:
+    """
+    Sends requests to the bot process over one connection, opened on first
+    use and reopened after it drops.
+    """
+
+    def __init__(
+        self,
+        secret: str = IPC_SECRET,
+        socket_path: str = IPC_SOCKET,
+        host: str = IPC_HOST,
+        port: int = IPC_PORT,
+        timeout: float = IPC_TIMEOUT,
+    ):
+        self.secret = secret
+        self.socket_path = socket_path
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._ids = itertools.count()
+        # Request id -> (connection it was sent on, future for its reply)
+        self._pending: dict[int, tuple[asyncio.StreamWriter, asyncio.Future[Message]]] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task[None]] = None
+        self._connect_lock = asyncio.Lock()
+
+    async def _connect(self) -> asyncio.StreamWriter:
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return self._writer
+            try:
+                if self.socket_path:
+                    reader, writer = await asyncio.open_unix_connection(
+                        self.socket_path, limit=IPC_MAX_LINE
+                    )
+                else:
+                    reader, writer = await asyncio.open_connection(
+                        self.host, self.port, limit=IPC_MAX_LINE
+                    )
+            except OSError as e:
+                raise IPCError(f"Can't reach the bot process: {e}") from e
+            writer.write(_encode({"secret": self.secret}))
+            self._writer = writer
+            self._reader_task = asyncio.create_task(self._read_replies(reader, writer))
+            return writer
+
+    async def _read_replies(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while line := await reader.readline():
+                reply = json.loads(line)
+                _, future = self._pending.pop(reply.get("id"), (None, None))
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+            log.warning("IPC connection dropped: %s", e)
+        finally:
+            writer.close()
+            if self._writer is writer:
+                self._writer = None
+            # Whatever was in flight on this connection will never be answered
+            for request_id, (sent_on, future) in list(self._pending.items()):
+                if sent_on is writer:
+                    del self._pending[request_id]
+                    if not future.done():
+                        future.set_exception(
+                            IPCError("Connection to the bot process closed.")
+                        )
+
+    async def request(self, type: str, **fields: Any) -> Message:
+        """Send a request and wait for its reply. Raises IPCError on failure."""
+        writer = await self._connect()
+        request_id = next(self._ids)
+        future: asyncio.Future[Message] = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = (writer, future)
+        try:
+            writer.write(_encode({"id": request_id, "type": type, **fields}))
+            await writer.drain()
+            reply = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError as e:
+            raise IPCError(f"IPC request '{type}' timed out.") from e
+        except ConnectionError as e:
+            raise IPCError(f"IPC request '{type}' failed: {e}") from e
+        finally:
+            self._pending.pop(request_id, None)
+        if not reply.get("ok"):
+            raise IPCError(reply.get("error") or f"IPC request '{type}' failed.")
+        return reply
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None:
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
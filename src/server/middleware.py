@@ -0,0 +1,115 @@
+import ipaddress
+import math
+import os
+from typing import Awaitable, Callable, Optional
+
+from aiohttp import web
+
+from src.utils.log import bind
+from src.utils.metrics import rate_limited_total
+from src.utils.ratelimit import KeyedRateLimiter, TokenBucket
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+Network = ipaddress.IPv4Network | ipaddress.IPv6Network
+
+# --- Configuration ---
+# 0 turns the per-IP limit off, e.g. when every student comes through one NAT
+CALLBACK_IP_CALLS = int(os.getenv("CALLBACK_IP_CALLS", "10"))
+CALLBACK_IP_PERIOD = float(os.getenv("CALLBACK_IP_PERIOD", "60"))
+CALLBACK_GLOBAL_CALLS = int(os.getenv("CALLBACK_GLOBAL_CALLS", "50"))
+CALLBACK_GLOBAL_PERIOD = float(os.getenv("CALLBACK_GLOBAL_PERIOD", "1"))
+# Reverse proxies (addresses or CIDRs, comma separated) whose X-Forwarded-For
+# is believed; empty to key on the connecting address
+TRUSTED_PROXIES = os.getenv("TRUSTED_PROXIES", "")
+# --- End Configuration ---
+
+
+def parse_networks(value: str) -> list[Network]:
+    """Parse a comma separated list of addresses and CIDRs."""
+    return [ipaddress.ip_network(part.strip()) for part in value.split(",") if part.strip()]
+
+
+def _is_trusted(address: str, trusted: list[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted)
+
+
+def client_address(request: web.Request, trusted: list[Network]) -> str:
+    """
+    The address of the client behind `request`. If it came from a trusted
+    proxy, the right-most X-Forwarded-For hop that isn't one of them, since
+    everything to its left was written by the client.
+    """
+    remote = request.remote or ""
+    if not trusted or not _is_trusted(remote, trusted):
+        return remote
+    forwarded = ",".join(request.headers.getall("X-Forwarded-For", []))
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop, trusted):
+            return hop
+    return hops[0] if hops else remote
+
+
+@web.middleware
+async def correlation_middleware(
+    request: web.Request, handler: Handler
+) -> web.StreamResponse:
+    """Tags everything logged while handling a request with its OAuth state."""
+    state = request.query.get("state")
+    if state is None:
+        return await handler(request)
+    with bind(state=state):
+        return await handler(request)
+
+
+def rate_limit_middleware(
+    paths: set[str],
+    ip_calls: int = CALLBACK_IP_CALLS,
+    ip_period: float = CALLBACK_IP_PERIOD,
+    global_calls: int = CALLBACK_GLOBAL_CALLS,
+    global_period: float = CALLBACK_GLOBAL_PERIOD,
+    trusted_proxies: str = TRUSTED_PROXIES,
+):
+    """
+    Per-client-IP and global token buckets for the given paths.
+
+    Clients are told apart by `client_address`, so behind a reverse proxy
+    set `trusted_proxies` or they all share the proxy's bucket. `ip_calls`
+    of 0 leaves only the global limit. Throttled requests get a 429 with a
+    Retry-After header before any handler work (or outbound call) happens.
+    """
+    per_ip: Optional[KeyedRateLimiter] = (
+        KeyedRateLimiter(ip_calls / ip_period, ip_calls) if ip_calls > 0 else None
+    )
+    trusted = parse_networks(trusted_proxies)
+    overall = TokenBucket(global_calls / global_period, global_calls)
+
+    @web.middleware
+    async def rate_limit(request: web.Request, handler: Handler) -> web.StreamResponse:
+        if request.path not in paths:
+            return await handler(request)
+
+        scope = "ip"
+        retry_after = 0.0
+        if per_ip is not None:
+            retry_after = per_ip.hit(client_address(request, trusted))
+        if not retry_after:
+            scope = "global"
+            retry_after = overall.try_acquire()
+        if retry_after:
+            rate_limited_total.inc(request.path, scope)
+            return web.Response(
+                status=429,
+                text="Too many requests. Please slow down and try again shortly.",
+                headers={
+                    "Retry-After": str(math.ceil(retry_after)),
+                    "Cache-Control": "no-store",
+                },
+            )
+        return await handler(request)
+
+    return rate_limit
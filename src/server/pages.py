@@ -0,0 +1,202 @@
+"""
+Result pages served by the OAuth callback.
+
+Every outcome page is rendered once at import time into encoded bytes (plus
+gzip and, when the `brotli` package is installed, brotli variants), so the
+handler only picks a pre-built body and header set per request. The
+PROCESSING page polls `STATUS_PATH` and shows the final result itself.
+"""
+
+import gzip
+import html
+from dataclasses import dataclass
+from enum import Enum
+from string import Template
+
+from aiohttp import web
+
+try:
+    import brotli  # pyright: ignore[reportMissingImports]
+except ImportError:
+    brotli = None
+
+PAGE_CLOSE_DELAY = 10  # seconds before the page closes itself
+STATUS_PATH = "/callback/status"
+STATUS_POLL_INTERVAL = 1000  # milliseconds
+
+# Polls the job status until the background work finishes, then shows its
+# result and starts the countdown
+_POLL_SCRIPT = Template(
+    """function pollStatus() {
+                const state = new URLSearchParams(window.location.search).get('state');
+                fetch('$path?state=' + encodeURIComponent(state), {cache: 'no-store'})
+                    .then(response => response.json())
+                    .then(job => {
+                        if (job.status === 'queued' || job.status === 'running') {
+                            setTimeout(pollStatus, $interval);
+                            return;
+                        }
+                        document.getElementById('message').textContent = job.message;
+                        updateCountdown();
+                    })
+                    .catch(() => setTimeout(pollStatus, 2 * $interval));
+            }"""
+).substitute(path=STATUS_PATH, interval=STATUS_POLL_INTERVAL)
+
+_TEMPLATE = Template(
+    """<!DOCTYPE html>
+<html>
+    <head>
+        <meta charset="utf-8">
+        <style>
+            body {
+                font-family: Arial, sans-serif;
+                text-align: center;
+                margin-top: 50px;
+            }
+            h1 {
+                color: #333;
+            }
+            p {
+                font-size: 18px;
+            }
+            #countdown {
+                font-weight: bold;
+                color: red;
+            }
+        </style>
+        <title>Authentication Callback</title>
+        <script>
+            let timeLeft = $delay;
+            function updateCountdown() {
+                document.getElementById('countdown').textContent = timeLeft;
+                if (timeLeft == 0) {
+                    window.close();
+                } else {
+                    timeLeft--;
+                    setTimeout(updateCountdown, 1000);
+                }
+            }
+            $script
+            window.onload = $onload;
+        </script>
+    </head>
+    <body>
+        <h1>Authentication Callback Received</h1>
+        <p id="message">$message</p>
+        <p>This window will close in <span id="countdown">$delay</span> seconds.</p>
+    </body>
+</html>
+"""
+)
+
+
+class Outcome(Enum):
+    """Every result the callback can show, with its message and HTTP status."""
+
+    SUCCESS = ("Authentication successful!", 200)
+    PROCESSING = ("Authentication received! Finishing your setup...", 202)
+    BUSY = ("The server is busy right now. Please run /auth again in a few minutes.", 503)
+    INVALID_PARAMS = ("Invalid Callback Parameters... Contact the server admins.", 400)
+    INTERACTION_MISSING = ("Interaction Missing... Contact the server admins.", 404)
+    TOKEN_FAILED = ("Token exchange failed.", 502)
+    USER_INFO_FAILED = ("Failed to fetch user info.", 502)
+    NOT_IN_SERVER = ("User isn't in the server. Please contact the server admins.", 403)
+    ROLE_FAILED = ("Failed to add role to user. Please contact the server admins.", 500)
+    DB_FAILED = (
+        "Failed to add IST player to the database. If you think this is a mistake, please contact the server admins.",
+        500,
+    )
+
+    def __init__(self, message: str, status: int):
+        self.message = message
+        self.status = status
+
+
+@dataclass(frozen=True, slots=True)
+class Page:
+    status: int
+    bodies: dict[str, bytes]  # content-encoding ("identity", "gzip", "br") -> body
+    headers: dict[str, dict[str, str]]  # content-encoding -> response headers
+
+
+def render(message: str, poll: bool = False) -> str:
+    return _TEMPLATE.substitute(
+        message=html.escape(message),
+        delay=PAGE_CLOSE_DELAY,
+        script=_POLL_SCRIPT if poll else "",
+        onload="pollStatus" if poll else "updateCountdown",
+    )
+
+
+def build_page(message: str, status: int = 200, poll: bool = False) -> Page:
+    """Render, encode and compress a page once."""
+    body = render(message, poll).encode("utf-8")
+    bodies = {"identity": body, "gzip": gzip.compress(body, compresslevel=9)}
+    if brotli is not None:
+        bodies["br"] = brotli.compress(body)  # pyright: ignore
+
+    headers: dict[str, dict[str, str]] = {}
+    for encoding, encoded in bodies.items():
+        headers[encoding] = {
+            "Content-Type": "text/html; charset=utf-8",
+            "Content-Length": str(len(encoded)),
+            # The callback URL carries a one-time code, never cache the result
+            "Cache-Control": "no-store",
+            "Vary": "Accept-Encoding",
+        }
+        if encoding != "identity":
+            headers[encoding]["Content-Encoding"] = encoding
+    return Page(status=status, bodies=bodies, headers=headers)
+
+
+PAGES: dict[Outcome, Page] = {
+    outcome: build_page(
+        outcome.message, outcome.status, poll=outcome is Outcome.PROCESSING
+    )
+    for outcome in Outcome
+}
+
+
+def _accepted_encodings(header: str) -> dict[str, float]:
+    """Parse Accept-Encoding into {coding: q}, a q of 0 meaning "not this"."""
+    accepted: dict[str, float] = {}
+    for item in header.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.lower()] = q
+    return accepted
+
+
+def _pick_encoding(request: web.Request, page: Page) -> str:
+    accepted = _accepted_encodings(request.headers.get("Accept-Encoding", ""))
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = "identity", 0.0
+    # Ties go to the first, smallest, encoding
+    for encoding in ("br", "gzip"):
+        q = accepted.get(encoding, wildcard)
+        if encoding in page.bodies and q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def page_response(request: web.Request, page: Page) -> web.Response:
+    """Serve a pre-built page in the best encoding the client accepts."""
+    encoding = _pick_encoding(request, page)
+    return web.Response(
+        body=page.bodies[encoding], status=page.status, headers=page.headers[encoding]
+    )
+
+
+def respond(request: web.Request, outcome: Outcome) -> web.Response:
+    """Serve the pre-rendered page for a callback outcome."""
+    return page_response(request, PAGES[outcome])
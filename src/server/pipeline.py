@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
+
+import aiohttp
+import discord
+
+from src.server.expiry import ExpiryReaper
+from src.utils.log import bind, current_context
+
+log = logging.getLogger(__name__)
+
+# --- Configuration ---
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "1000"))
+PIPELINE_STAGE_ATTEMPTS = int(os.getenv("PIPELINE_STAGE_ATTEMPTS", "3"))
+PIPELINE_RETRY_BACKOFF = float(os.getenv("PIPELINE_RETRY_BACKOFF", "0.5"))
+PIPELINE_STATUS_TTL = float(os.getenv("PIPELINE_STATUS_TTL", "300"))
+# --- End Configuration ---
+
+Payload = TypeVar("Payload")
+
+
+class JobStatus(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+@dataclass(slots=True)
+class Job(Generic[Payload]):
+    key: str
+    payload: Payload
+    status: JobStatus = JobStatus.QUEUED
+    message: str = ""
+    stage: str = ""
+    # Correlation ids of the submitter, re-bound while the job runs
+    context: dict[str, str] = field(default_factory=dict[str, str])
+
+
+@dataclass(frozen=True, slots=True)
+class Stage(Generic[Payload]):
+    """
+    One step of a job.
+
+    `run` is retried on transient errors. Once it gives up, `on_error` decides
+    what happens: return a message to fail the job with it, or None to log the
+    error and carry on with the next stage.
+    """
+
+    name: str
+    run: Callable[[Job[Payload]], Awaitable[None]]
+    on_error: Callable[[Job[Payload], Exception], Awaitable[Optional[str]]]
+
+
+def is_transient(error: Exception) -> bool:
+    """Errors worth retrying: timeouts, network failures and 5xx from Discord."""
+    if isinstance(error, discord.HTTPException):
+        return error.status >= 500 or error.status == 429
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientError, OSError))
+
+
+class Pipeline(Generic[Payload]):
+    """
+    Bounded worker pool that runs queued jobs through a fixed list of stages.
+
+    Job status is kept for `status_ttl` seconds after the job finishes so the
+    browser can poll it.
+    """
+
+    def __init__(
+        self,
+        stages: list[Stage[Payload]],
+        on_success: Callable[[Job[Payload]], str],
+        workers: int = PIPELINE_WORKERS,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+        attempts: int = PIPELINE_STAGE_ATTEMPTS,
+        backoff: float = PIPELINE_RETRY_BACKOFF,
+        status_ttl: float = PIPELINE_STATUS_TTL,
+    ):
+        self.stages = stages
+        self.on_success = on_success
+        self.workers = workers
+        self.attempts = attempts
+        self.backoff = backoff
+        self.status_ttl = status_ttl
+
+        self._queue: asyncio.Queue[Job[Payload]] = asyncio.Queue(maxsize=queue_size)
+        self._jobs: dict[str, Job[Payload]] = {}
+        self._reaper = ExpiryReaper(self._forget)
+        self._tasks: list[asyncio.Task[None]] = []
+
+    def __len__(self) -> int:
+        """Jobs waiting in the queue."""
+        return self._queue.qsize()
+
+    async def _forget(self, keys: list[str]) -> None:
+        for key in keys:
+            self._jobs.pop(key, None)
+
+    def submit(self, key: str, payload: Payload) -> bool:
+        """Queue a job. Returns False if the queue is full."""
+        job = Job(key=key, payload=payload, context=current_context())
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            return False
+        self._jobs[key] = job
+        return True
+
+    def status(self, key: str) -> Optional[Job[Payload]]:
+        return self._jobs.get(key)
+
+    async def _run_stage(self, stage: Stage[Payload], job: Job[Payload]) -> None:
+        for attempt in range(1, self.attempts + 1):
+            try:
+                return await stage.run(job)
+            except Exception as e:
+                if attempt == self.attempts or not is_transient(e):
+                    raise
+                log.warning("Stage '%s' failed, retrying: %s", stage.name, e)
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+
+    async def _process(self, job: Job[Payload]) -> None:
+        job.status = JobStatus.RUNNING
+        for stage in self.stages:
+            job.stage = stage.name
+            try:
+                await self._run_stage(stage, job)
+            except Exception as e:
+                message = await stage.on_error(job, e)
+                if message is not None:
+                    job.status = JobStatus.FAILED
+                    job.message = message
+                    return
+        job.status = JobStatus.DONE
+        job.message = self.on_success(job)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            with bind(**job.context):
+                try:
+                    await self._process(job)
+                except Exception as e:
+                    log.exception("Job crashed in stage '%s': %s", job.stage, e)
+                    job.status = JobStatus.FAILED
+                    job.message = "Unexpected error. Please contact the server admins."
+                finally:
+                    self._reaper.schedule(job.key, self.status_ttl)
+                    self._queue.task_done()
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._reaper.start()
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+
+    async def join(self) -> None:
+        """Wait until every submitted job has finished."""
+        await self._queue.join()
+
+    async def stop(self, drain_timeout: float = 10) -> None:
+        """Give queued jobs a chance to finish, then stop the workers."""
+        try:
+            await asyncio.wait_for(self.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            log.warning("Stopping pipeline with %d jobs still queued.", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._reaper.stop()
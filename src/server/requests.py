@@ -1,87 +1,243 @@
+import asyncio
+import logging
+import os
 import aiohttp
 from src.db.player import *
+from src.errors.server import UpstreamError
+from src.server.http_client import http_client
+from src.server.uuid_cache import uuid_cache
+from src.utils.ratelimit import AsyncRateLimiter
+
+log = logging.getLogger(__name__)
+
+# --- Configuration ---
+MOJANG_API_URL = os.getenv("MOJANG_API_URL", "https://api.mojang.com")
+MOJANG_SERVICES_URL = os.getenv(
+    "MOJANG_SERVICES_URL", "https://api.minecraftservices.com"
+)
+MOJANG_BULK_CHUNK_SIZE = 10  # Maximum names per bulk lookup accepted by Mojang
+MOJANG_BULK_RATE = float(os.getenv("MOJANG_BULK_RATE", "1.0"))  # requests/second
+MOJANG_BULK_BURST = int(os.getenv("MOJANG_BULK_BURST", "3"))
+WHITELIST_URL = os.getenv(
+    "WHITELIST_URL", "http://eu-de-1.arthmc.xyz:11095/v1/server/whitelist"
+)
+WHITELIST_API_KEY = os.getenv("WHITELIST_API_KEY", "16$2!LBaQre39B*MT4MHSeOe8Vaji3")
+# --- End Configuration ---
+
+mojang_bulk_limiter = AsyncRateLimiter(MOJANG_BULK_RATE, MOJANG_BULK_BURST)
 
 
 async def add_player_to_whitelist(player: ISTPlayer | InvitedPlayer) -> None:
     """Adds the player to the whitelist asynchronously."""
     if not player["minecraft_name"]:
-        print("Player has no Minecraft name. Cannot add to whitelist.")
+        log.warning("Player has no Minecraft name. Cannot add to whitelist.")
         return
 
-    uuid = await fetch_uuid_async(player["minecraft_name"])
+    uuid = player.get("minecraft_uuid") or await fetch_uuid_async(
+        player["minecraft_name"]
+    )
 
     if not uuid:
-        print(
-            f"Player {player['minecraft_name']} does not exist. Cannot add to whitelist."
+        log.warning(
+            "Player %s does not exist. Cannot add to whitelist.", player["minecraft_name"]
         )
         return
 
-    url = "http://eu-de-1.arthmc.xyz:11095/v1/server/whitelist"
-    headers = {
-        "accept": "application/json",
-        "key": "16$2!LBaQre39B*MT4MHSeOe8Vaji3",
-        "Content-Type": "application/x-www-form-urlencoded",
-    }
-    data = {"uuid": uuid, "name": player["minecraft_name"]}
-
-    timeout = aiohttp.ClientTimeout(total=10)
-
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        async with session.post(url, headers=headers, data=data) as response:
-            if response.status != 200:
-                raise Exception(
-                    f"Failed to add player to whitelist. Status: {response.status}"
-                )
+    await send_whitelist_op("POST", uuid, player["minecraft_name"])
 
 
 async def remove_player_from_whitelist(player: ISTPlayer | InvitedPlayer) -> None:
     """Removes the player from the whitelist asynchronously."""
     if not player["minecraft_name"]:
-        print("Player has no Minecraft name. Cannot remove from whitelist.")
+        log.warning("Player has no Minecraft name. Cannot remove from whitelist.")
         return
 
-    uuid = await fetch_uuid_async(player["minecraft_name"])
+    uuid = player.get("minecraft_uuid") or await fetch_uuid_async(
+        player["minecraft_name"]
+    )
 
     if not uuid:
-        print(
-            f"Player {player['minecraft_name']} does not exist. Cannot remove from whitelist."
+        log.warning(
+            "Player %s does not exist. Cannot remove from whitelist.",
+            player["minecraft_name"],
         )
         return
 
-    url = "http://eu-de-1.arthmc.xyz:11095/v1/server/whitelist"
+    try:
+        await send_whitelist_op("DELETE", uuid, player["minecraft_name"])
+    except UpstreamError as e:
+        log.error("Failed to remove player from whitelist: %s", e.message)
+
+
+async def send_whitelist_op(method: str, uuid: str, name: str) -> None:
+    """
+    Sends one whitelist change to the panel: POST adds, DELETE removes.
+
+    Raises UpstreamError if the panel doesn't accept it.
+    """
     headers = {
         "accept": "application/json",
-        "key": "16$2!LBaQre39B*MT4MHSeOe8Vaji3",
+        "key": WHITELIST_API_KEY,
         "Content-Type": "application/x-www-form-urlencoded",
     }
-    data = {"uuid": uuid, "name": player["minecraft_name"]}
-
+    data = {"uuid": uuid, "name": name}
     timeout = aiohttp.ClientTimeout(total=10)
 
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        async with session.delete(url, headers=headers, data=data) as response:
+    try:
+        async with http_client.session.request(
+            method,
+            WHITELIST_URL,
+            headers=headers,
+            data=data,
+            timeout=timeout,
+            trace_request_ctx={"target": "whitelist"},
+        ) as response:
             if response.status != 200:
-                print(
-                    f"Failed to remove player from whitelist. Status: {response.status}"
-                )
                 text = await response.text()
-                print(f"Response: {text}")
+                raise UpstreamError(
+                    "Whitelist",
+                    response.status,
+                    f"Whitelist {method} for {name} failed. Status: {response.status}, Response: {text[:200]}",
+                )
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise UpstreamError(
+            "Whitelist", message=f"Whitelist request failed: {e}"
+        ) from e
+
+
+async def fetch_whitelist() -> dict[str, str]:
+    """
+    Fetches the server's current whitelist as a dashed UUID -> name map.
+
+    Expects the panel to answer GET on the whitelist endpoint with a JSON list
+    of `{"uuid": ..., "name": ...}` entries.
+    """
+    headers = {"accept": "application/json", "key": WHITELIST_API_KEY}
+    timeout = aiohttp.ClientTimeout(total=10)
+
+    try:
+        async with http_client.session.get(
+            WHITELIST_URL,
+            headers=headers,
+            timeout=timeout,
+            trace_request_ctx={"target": "whitelist"},
+        ) as response:
+            if response.status != 200:
+                raise UpstreamError("Whitelist", response.status)
+            entries = await response.json()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise UpstreamError(
+            "Whitelist", message=f"Whitelist request failed: {e}"
+        ) from e
+
+    return {entry["uuid"].lower(): entry["name"] for entry in entries}
 
 
 async def fetch_uuid_async(username: str) -> str | None:
-    url = f"https://api.mojang.com/users/profiles/minecraft/{username}"
+    """
+    Resolves a Minecraft username to its dashed UUID, or None if it doesn't exist.
+
+    Results are served from `uuid_cache`; concurrent calls for the same name
+    share one request to Mojang. Lookups that fail (timeouts, rate limits)
+    return None without being cached.
+    """
+    try:
+        return await uuid_cache.get(username, _request_uuid)
+    except UpstreamError as e:
+        log.warning("Failed to fetch UUID for '%s': %s", username, e.message)
+        return None
+
+
+def format_uuid(raw_uuid: str) -> str:
+    """Inserts the dashes into an undashed Mojang UUID."""
+    return f"{raw_uuid[:8]}-{raw_uuid[8:12]}-{raw_uuid[12:16]}-{raw_uuid[16:20]}-{raw_uuid[20:]}"
+
+
+async def _request_uuid(username: str) -> str | None:
+    url = f"{MOJANG_API_URL}/users/profiles/minecraft/{username}"
     timeout = aiohttp.ClientTimeout(total=5)
 
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        async with session.get(url) as response:
+    try:
+        async with http_client.session.get(
+            url, timeout=timeout, trace_request_ctx={"target": "mojang"}
+        ) as response:
             if response.status == 200:
                 data = await response.json()
-                raw_uuid = data["id"]
-                formatted_uuid = f"{raw_uuid[:8]}-{raw_uuid[8:12]}-{raw_uuid[12:16]}-{raw_uuid[16:20]}-{raw_uuid[20:]}"
-                return formatted_uuid
-            elif response.status == 204:
-                print(f"Username '{username}' not found.")
+                return format_uuid(data["id"])
+            elif response.status in (204, 404):
+                log.info("Username '%s' not found.", username, extra={"sample": 10})
                 return None
             else:
-                print(f"Failed to fetch UUID. Status: {response.status}")
-                return None
+                raise UpstreamError("Mojang", response.status)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise UpstreamError("Mojang", message=f"Mojang request failed: {e}") from e
+
+
+async def fetch_uuids_bulk(names: list[str]) -> dict[str, str | None]:
+    """
+    Resolves many Minecraft usernames at once.
+
+    Names already in `uuid_cache` are answered locally; the rest are sent to
+    Mojang's bulk lookup in chunks of 10, run concurrently under
+    `mojang_bulk_limiter`. Returns a map from each requested name to its UUID,
+    or None if the account doesn't exist. Names whose chunk failed are left
+    out of the map so callers can retry them.
+    """
+    resolved: dict[str, str | None] = {}
+    missing: dict[str, str] = {}  # casefolded name -> name as requested
+
+    for name in names:
+        hit, uuid = uuid_cache.peek(name)
+        if hit:
+            resolved[name] = uuid
+        else:
+            missing.setdefault(name.casefold(), name)
+
+    to_fetch = list(missing.values())
+    chunks = [
+        to_fetch[i : i + MOJANG_BULK_CHUNK_SIZE]
+        for i in range(0, len(to_fetch), MOJANG_BULK_CHUNK_SIZE)
+    ]
+    results = await asyncio.gather(
+        *(_request_uuids_chunk(chunk) for chunk in chunks), return_exceptions=True
+    )
+
+    fetched: dict[str, str | None] = {}  # casefolded name -> uuid
+    for chunk, result in zip(chunks, results):
+        if isinstance(result, BaseException):
+            log.warning("Bulk UUID lookup failed for %d names: %s", len(chunk), result)
+            continue
+        for name in chunk:
+            uuid = result.get(name.casefold())
+            uuid_cache.put(name, uuid)
+            fetched[name.casefold()] = uuid
+
+    # Map back every spelling the caller used
+    for name in names:
+        if name not in resolved and name.casefold() in fetched:
+            resolved[name] = fetched[name.casefold()]
+    return resolved
+
+
+async def _request_uuids_chunk(names: list[str]) -> dict[str, str]:
+    """Looks up at most 10 names. Returns casefolded name -> dashed UUID."""
+    url = f"{MOJANG_SERVICES_URL}/minecraft/profile/lookup/bulk/byname"
+    timeout = aiohttp.ClientTimeout(total=10)
+
+    await mojang_bulk_limiter.acquire()
+    try:
+        async with http_client.session.post(
+            url,
+            json=names,
+            timeout=timeout,
+            trace_request_ctx={"target": "mojang_bulk"},
+        ) as response:
+            if response.status != 200:
+                raise UpstreamError("Mojang bulk", response.status)
+            profiles = await response.json()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise UpstreamError(
+            "Mojang bulk", message=f"Mojang bulk request failed: {e}"
+        ) from e
+
+    return {profile["name"].casefold(): format_uuid(profile["id"]) for profile in profiles}
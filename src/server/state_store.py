@@ -0,0 +1,260 @@
+"""
+Where pending OAuth logins wait for their callback.
+
+A pending login is the Discord user id that ran /auth plus when it started,
+keyed by the OAuth `state`. Nothing in it is tied to the bot process, so the
+callback can be served by other processes:
+
+- `MemoryStateStore`: a dict in this process. Only usable when `/callback` is
+  served by the bot process itself.
+- `SQLiteStateStore`: a SQLite file (WAL) shared by the bot process, which
+  adds logins, and the web worker processes, which take them
+  (see `src.server.worker`).
+
+Select one with AUTH_STATE_STORE=memory|sqlite.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Optional, ParamSpec, TypeVar
+
+from src.db.storage import DATA_DIR
+from src.errors.server import AuthCapacityError
+from src.server.expiry import ExpiryReaper
+
+log = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+# --- Configuration ---
+AUTH_STATE_STORE = os.getenv("AUTH_STATE_STORE", "memory")  # memory | sqlite
+AUTH_STATE_DB = os.getenv("AUTH_STATE_DB", os.path.join(DATA_DIR, "auth_state.sqlite3"))
+AUTH_STATE_PURGE_INTERVAL = float(os.getenv("AUTH_STATE_PURGE_INTERVAL", "30"))
+# --- End Configuration ---
+
+
+@dataclass(frozen=True, slots=True)
+class PendingAuth:
+    discord_user_id: int
+    created_at: float  # time.time(), comparable across processes
+
+
+class StateStore(ABC):
+    """Pending logins by OAuth state, at most `capacity`, each living `ttl` seconds."""
+
+    def __init__(self, capacity: int, ttl: float):
+        self.capacity = capacity
+        self.ttl = ttl
+
+    @abstractmethod
+    async def put(self, state: str, pending: PendingAuth) -> None:
+        """Add a pending login. Raises AuthCapacityError if the store is full."""
+
+    @abstractmethod
+    async def pop(self, state: str) -> Optional[PendingAuth]:
+        """Take the login for `state`. Returns None if it's unknown or expired."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Pending logins, for monitoring (may lag behind for shared stores)."""
+
+    def stats(self) -> dict[str, int]:
+        return {"pending": len(self)}
+
+    def start(self) -> None:
+        """Start expiring old logins. Must run inside the event loop."""
+
+    async def stop(self) -> None:
+        return None
+
+
+# --------------------------
+# 🧠 IN MEMORY
+# --------------------------
+class MemoryStateStore(StateStore):
+    """Logins in a dict, expired by one `ExpiryReaper` task."""
+
+    def __init__(self, capacity: int, ttl: float):
+        super().__init__(capacity, ttl)
+        self.pending: dict[str, PendingAuth] = {}
+        self.lock = asyncio.Lock()
+        self._reaper = ExpiryReaper(self._expire)
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": len(self.pending),
+            "scheduled": len(self._reaper),
+            "heap_size": self._reaper.heap_size,
+        }
+
+    async def _expire(self, states: list[str]) -> None:
+        async with self.lock:
+            for state in states:
+                if self.pending.pop(state, None) is not None:
+                    log.info(
+                        "Cleaned up expired auth connection.",
+                        extra={"state": state, "sample": 10},
+                    )
+
+    async def put(self, state: str, pending: PendingAuth) -> None:
+        async with self.lock:
+            if len(self.pending) >= self.capacity:
+                raise AuthCapacityError(self.capacity)
+            self.pending[state] = pending
+            self._reaper.schedule(state, self.ttl)
+
+    async def pop(self, state: str) -> Optional[PendingAuth]:
+        async with self.lock:
+            self._reaper.discard(state)
+            return self.pending.pop(state, None)
+
+    def start(self) -> None:
+        self._reaper.start()
+
+    async def stop(self) -> None:
+        await self._reaper.stop()
+
+
+# --------------------------
+# 🗄️ SQLITE (SHARED)
+# --------------------------
+class SQLiteStateStore(StateStore):
+    """
+    Logins in a SQLite file that several processes open at once.
+
+    Calls run on a dedicated thread, like `AsyncDatabase`. The capacity check
+    and insert, and the read and delete of a pop, each run in one IMMEDIATE
+    transaction, so two processes can never take the same login. Expired rows
+    are ignored by `pop` and deleted every `purge_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        ttl: float,
+        path: str = AUTH_STATE_DB,
+        purge_interval: float = AUTH_STATE_PURGE_INTERVAL,
+    ):
+        super().__init__(capacity, ttl)
+        self.path = path
+        self.purge_interval = purge_interval
+        self._count = 0  # As of the last put or purge
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="auth-state")
+        self._purge_task: Optional[asyncio.Task[None]] = None
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Autocommit mode, transactions are opened explicitly below
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")  # Other processes' writes
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending_auth ("
+            " state TEXT PRIMARY KEY,"
+            " discord_user_id INTEGER NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS pending_auth_created_at ON pending_auth (created_at)"
+        )
+
+    def __len__(self) -> int:
+        return self._count
+
+    async def _run(self, func: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    def _put(self, state: str, pending: PendingAuth) -> None:
+        cutoff = time.time() - self.ttl
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            (count,) = self.conn.execute(
+                "SELECT COUNT(*) FROM pending_auth WHERE created_at > ?", (cutoff,)
+            ).fetchone()
+            if count >= self.capacity:
+                raise AuthCapacityError(self.capacity)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pending_auth (state, discord_user_id, created_at)"
+                " VALUES (?, ?, ?)",
+                (state, pending.discord_user_id, pending.created_at),
+            )
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        self._count = count + 1
+
+    def _pop(self, state: str) -> Optional[PendingAuth]:
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT discord_user_id, created_at FROM pending_auth WHERE state = ?",
+                (state,),
+            ).fetchone()
+            if row is not None:
+                self.conn.execute("DELETE FROM pending_auth WHERE state = ?", (state,))
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        if row is None or row[1] <= time.time() - self.ttl:
+            return None
+        return PendingAuth(discord_user_id=row[0], created_at=row[1])
+
+    def _purge(self) -> int:
+        cursor = self.conn.execute(
+            "DELETE FROM pending_auth WHERE created_at <= ?", (time.time() - self.ttl,)
+        )
+        (self._count,) = self.conn.execute("SELECT COUNT(*) FROM pending_auth").fetchone()
+        return cursor.rowcount
+
+    async def put(self, state: str, pending: PendingAuth) -> None:
+        await self._run(self._put, state, pending)
+
+    async def pop(self, state: str) -> Optional[PendingAuth]:
+        return await self._run(self._pop, state)
+
+    async def _purge_loop(self) -> None:
+        while True:
+            try:
+                purged = await self._run(self._purge)
+                if purged:
+                    log.info("Cleaned up %d expired auth connections.", purged)
+            except Exception as e:
+                log.exception("Failed to purge expired auth connections: %s", e)
+            await asyncio.sleep(self.purge_interval)
+
+    def start(self) -> None:
+        if self._purge_task is None:
+            self._purge_task = asyncio.create_task(self._purge_loop())
+
+    async def stop(self) -> None:
+        if self._purge_task is not None:
+            self._purge_task.cancel()
+            await asyncio.gather(self._purge_task, return_exceptions=True)
+            self._purge_task = None
+        await self._run(self.conn.close)
+        self._executor.shutdown(wait=True)
+
+
+def open_state_store(
+    capacity: int, ttl: float, kind: str = AUTH_STATE_STORE
+) -> StateStore:
+    """Open the store selected by the `AUTH_STATE_STORE` setting."""
+    if kind == "memory":
+        return MemoryStateStore(capacity, ttl)
+    if kind == "sqlite":
+        return SQLiteStateStore(capacity, ttl)
+    raise ValueError(f"Unknown AUTH_STATE_STORE '{kind}'. Use 'memory' or 'sqlite'.")
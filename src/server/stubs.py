@@ -0,0 +1,191 @@
+"""
+Local stand-ins for the external APIs the bot talks to, for offline testing.
+
+Each factory returns an aiohttp `web.Application` that mimics the subset of
+the real API used by `src.server.requests` and `src.server.callback`. Point the matching `*_URL`
+setting at the address from `run_stub` to use it:
+
+    async with run_stub(mojang_app({"Steve": "8667ba71b85a4004af54457a9734eed7"})) as url:
+        requests.MOJANG_API_URL = requests.MOJANG_SERVICES_URL = url
+        ...
+
+Run `python -m src.server.stubs` to serve them all on localhost.
+"""
+
+import asyncio
+import logging
+import random
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Awaitable, Callable, cast
+
+from aiohttp import web
+
+from src.utils.log import setup_logging, stop_logging
+
+log = logging.getLogger(__name__)
+
+
+def _add_faults(app: web.Application, latency: float, error_rate: float) -> None:
+    """Delay every request by `latency` seconds and fail a fraction with a 503."""
+
+    @web.middleware
+    async def faults(
+        request: web.Request,
+        handler: Callable[[web.Request], Awaitable[web.StreamResponse]],
+    ) -> web.StreamResponse:
+        if latency:
+            await asyncio.sleep(latency)
+        if error_rate and random.random() < error_rate:
+            return web.Response(status=503, text="Injected failure")
+        return await handler(request)
+
+    app.middlewares.append(faults)
+
+
+# --------------------------
+# 🟩 MOJANG
+# --------------------------
+def mojang_app(
+    profiles: dict[str, str], latency: float = 0.0, error_rate: float = 0.0
+) -> web.Application:
+    """
+    Mojang profile API. `profiles` maps usernames to undashed UUIDs.
+
+    Serves both the single lookup (`MOJANG_API_URL`) and the bulk lookup
+    (`MOJANG_SERVICES_URL`), so one stub can stand in for both hosts.
+    """
+    by_key = {name.casefold(): (name, uuid) for name, uuid in profiles.items()}
+    app = web.Application()
+    app["stats"] = {"requests": 0}
+    _add_faults(app, latency, error_rate)
+
+    async def profile(request: web.Request) -> web.Response:
+        request.app["stats"]["requests"] += 1
+        match = by_key.get(request.match_info["name"].casefold())
+        if match is None:
+            return web.Response(status=404)
+        return web.json_response({"id": match[1], "name": match[0]})
+
+    async def bulk(request: web.Request) -> web.Response:
+        request.app["stats"]["requests"] += 1
+        names = cast(list[str], await request.json())
+        if len(names) > 10:
+            return web.json_response({"error": "Too many names"}, status=400)
+        found = [by_key[n.casefold()] for n in names if n.casefold() in by_key]
+        return web.json_response([{"id": uuid, "name": name} for name, uuid in found])
+
+    app.router.add_get("/users/profiles/minecraft/{name}", profile)
+    app.router.add_post("/minecraft/profile/lookup/bulk/byname", bulk)
+    return app
+
+
+# --------------------------
+# 📋 WHITELIST PANEL
+# --------------------------
+def whitelist_app(
+    entries: dict[str, str] | None = None, latency: float = 0.0, error_rate: float = 0.0
+) -> web.Application:
+    """Whitelist panel API. `entries` maps dashed UUIDs to names."""
+    app = web.Application()
+    app["whitelist"] = dict(entries or {})
+    app["stats"] = {"requests": 0}
+    _add_faults(app, latency, error_rate)
+
+    async def listing(request: web.Request) -> web.Response:
+        request.app["stats"]["requests"] += 1
+        whitelist = cast(dict[str, str], request.app["whitelist"])
+        return web.json_response(
+            [{"uuid": uuid, "name": name} for uuid, name in whitelist.items()]
+        )
+
+    async def change(request: web.Request) -> web.Response:
+        request.app["stats"]["requests"] += 1
+        form = await request.post()
+        uuid, name = str(form["uuid"]), str(form["name"])
+        whitelist = cast(dict[str, str], request.app["whitelist"])
+        if request.method == "POST":
+            whitelist[uuid] = name
+        else:
+            whitelist.pop(uuid, None)
+        return web.json_response({"success": True})
+
+    app.router.add_get("/v1/server/whitelist", listing)
+    app.router.add_post("/v1/server/whitelist", change)
+    app.router.add_delete("/v1/server/whitelist", change)
+    return app
+
+
+# --------------------------
+# 🎓 FENIX
+# --------------------------
+def fenix_app(latency: float = 0.0, error_rate: float = 0.0) -> web.Application:
+    """
+    Fenix OAuth token exchange and person API.
+
+    Any authorization code is accepted and stands for the IST id of the user
+    logging in: it comes back as the access token, and the person API answers
+    with it as the `username`. Point `callback.FENIX_BASE_URL` here.
+    """
+    app = web.Application()
+    app["stats"] = {"requests": 0}
+    _add_faults(app, latency, error_rate)
+
+    async def access_token(request: web.Request) -> web.Response:
+        request.app["stats"]["requests"] += 1
+        form = await request.post()
+        code = str(form.get("code", ""))
+        if not code or form.get("grant_type") != "authorization_code":
+            return web.json_response({"error": "invalid_grant"}, status=400)
+        return web.json_response(
+            {"access_token": code, "refresh_token": code, "expires_in": 3600}
+        )
+
+    async def person(request: web.Request) -> web.Response:
+        request.app["stats"]["requests"] += 1
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not token:
+            return web.json_response({"error": "unauthorized"}, status=401)
+        return web.json_response({"username": token, "name": f"Student {token}"})
+
+    app.router.add_post("/oauth/access_token", access_token)
+    app.router.add_get("/api/fenix/v1/person", person)
+    return app
+
+
+# --------------------------
+# 🚀 RUNNER
+# --------------------------
+@asynccontextmanager
+async def run_stub(
+    app: web.Application, host: str = "127.0.0.1", port: int = 0
+) -> AsyncGenerator[str, None]:
+    """Serve `app` on a local port and yield its base URL."""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    try:
+        bound_port = cast(int, runner.addresses[0][1])
+        yield f"http://{host}:{bound_port}"
+    finally:
+        await runner.cleanup()
+
+
+async def _serve_forever() -> None:
+    async with (
+        run_stub(mojang_app({}), port=8090) as mojang_url,
+        run_stub(whitelist_app(), port=8091) as whitelist_url,
+        run_stub(fenix_app(), port=8092) as fenix_url,
+    ):
+        log.info("Mojang stub on %s", mojang_url)
+        log.info("Whitelist stub on %s/v1/server/whitelist", whitelist_url)
+        log.info("Fenix stub on %s", fenix_url)
+        await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    setup_logging(fmt="text")
+    try:
+        asyncio.run(_serve_forever())
+    finally:
+        stop_logging()
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+# --- Configuration ---
+UUID_CACHE_SIZE = int(os.getenv("UUID_CACHE_SIZE", "4096"))
+UUID_CACHE_TTL = float(os.getenv("UUID_CACHE_TTL", "21600"))  # 6 hours
+UUID_CACHE_NEGATIVE_TTL = float(os.getenv("UUID_CACHE_NEGATIVE_TTL", "300"))
+# --- End Configuration ---
+
+class UUIDCache:
+    """
+    Bounded TTL + LRU cache for Minecraft username -> UUID lookups.
+
+    Names that resolve are kept for `ttl` seconds, names that don't exist for
+    `negative_ttl` seconds. Concurrent lookups for the same name share a single
+    in-flight request. Loader exceptions are never cached, so a Mojang outage
+    or rate limit doesn't get remembered as "username does not exist".
+    """
+
+    def __init__(
+        self,
+        maxsize: int = UUID_CACHE_SIZE,
+        ttl: float = UUID_CACHE_TTL,
+        negative_ttl: float = UUID_CACHE_NEGATIVE_TTL,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: OrderedDict[str, tuple[str | None, float]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task[str | None]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return name.casefold()
+
+    def _lookup(self, key: str) -> tuple[bool, str | None]:
+        """Return (hit, uuid), dropping the entry if it has expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        uuid, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, uuid
+
+    def peek(self, name: str) -> tuple[bool, str | None]:
+        """Return (hit, uuid) from the cache without loading on a miss."""
+        return self._lookup(self._key(name))
+
+    def put(self, name: str, uuid: str | None) -> None:
+        """Store a lookup result (None means the username does not exist)."""
+        key = self._key(name)
+        ttl = self.ttl if uuid is not None else self.negative_ttl
+        self._entries[key] = (uuid, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, name: str) -> None:
+        self._entries.pop(self._key(name), None)
+
+    async def get(
+        self, name: str, loader: Callable[[str], Awaitable[str | None]]
+    ) -> str | None:
+        """Return the cached UUID for `name`, calling `loader` on a miss."""
+        key = self._key(name)
+        hit, uuid = self._lookup(key)
+        if hit:
+            return uuid
+
+        # Join a lookup that is already running for this name, or start one.
+        # The lookup runs as its own task, so a caller that is cancelled only
+        # stops waiting and the others still get the result.
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = asyncio.create_task(self._load(key, name, loader))
+            inflight.add_done_callback(_retrieve_exception)
+            self._inflight[key] = inflight
+        return await asyncio.shield(inflight)
+
+    async def _load(
+        self, key: str, name: str, loader: Callable[[str], Awaitable[str | None]]
+    ) -> str | None:
+        try:
+            uuid = await loader(name)
+            self.put(name, uuid)
+            return uuid
+        finally:
+            del self._inflight[key]
+
+
+def _retrieve_exception(task: "asyncio.Task[str | None]") -> None:
+    """Mark a failed lookup as retrieved when nobody was left waiting for it."""
+    if not task.cancelled():
+        task.exception()
+
+# Global instance for import
+uuid_cache = UUIDCache()
@@ -1,376 +1,230 @@
-from asyncio import Lock
-import asyncio
+import logging
 import os
-import secrets
 
 from aiohttp import web
-import aiohttp
 from beartype import beartype
 from discord.ext import commands
+from dataclasses import dataclass
 from typing import Optional
-import discord
-from src.db.db import db
+from src.db.aio import db
 from src.db.player import *
 import src.constants as const
 from src.errors.db import *
+from src.errors.server import NotInGuildError
+from src.server import callback
+from src.server.callback import Logins, callback_address, create_app
+from src.server.http_client import http_client
+from src.server.ipc import IPCServer, Message
+from src.server.pages import Outcome
+from src.server.pipeline import Job, Pipeline, Stage
+from src.server.state_store import SQLiteStateStore
+from src.server.whitelist import whitelist_sync
+from src.utils import diagnostics
+from src.utils.gateway import resolve_member, resolve_user
+from src.utils.log import bind
+from src.utils.metrics import loop_lag_sampler, registry
+
+log = logging.getLogger(__name__)
 
 # --- Configuration (Replace with your actual values, consider using environment variables) ---
-FENIX_CLIENT_ID = os.getenv("FENIX_CLIENT_ID")
-FENIX_CLIENT_SECRET = os.getenv("FENIX_CLIENT_SECRET")
-# Make sure this matches the Redirect URL in your FenixEdu application registration
-FENIX_REDIRECT_URI = "http://localhost:8080/callback"
-FENIX_BASE_URL = "https://fenix.tecnico.ulisboa.pt"
-ACCESS_TOKEN_PATH = "/oauth/access_token"
-PERSON_API_PATH = "/api/fenix/v1/person"
-API_REQUEST_TIMEOUT = 10
-CONNECTION_CLEANUP_TIMEOUT = 180
+# "local": serve /callback from the bot process. "workers": leave it to
+# `python -m src.server.worker` and answer the workers over IPC instead.
+WEB_TIER = os.getenv("WEB_TIER", "local")
 # --- End Configuration ---
 
-auth_connections: dict[str, discord.Interaction] = {}  # auth_id-interaction linker
-auth_connections_lock = Lock()
-
 runner: Optional[web.AppRunner] = None  # Global variable to hold the web server runner
+ipc_server: Optional[IPCServer] = None  # Answers the web workers when WEB_TIER=workers
 
 
-async def cleanup_auth_connection(auth_id: str) -> None:
-    """Removes an auth connection after the timeout period."""
-    await asyncio.sleep(CONNECTION_CLEANUP_TIMEOUT)  # 3 minutes
-    async with auth_connections_lock:
-        if auth_id in auth_connections:
-            del auth_connections[auth_id]
-            print(f"Cleaned up expired auth connection: {auth_id}")
+# --------------------------
+# ⚙️ AUTH PIPELINE
+# --------------------------
+@dataclass(frozen=True, slots=True)
+class AuthPayload:
+    discord_user_id: int
+    ist_id: str
 
 
-async def create_auth_url(interaction: discord.Interaction) -> str:
-    """Creates the authorization URL for FenixEdu OAuth."""
-    auth_id = secrets.token_urlsafe(16)
+async def send_dm(discord_user_id: int, message: str) -> None:
+    """DM a user by id. Logs instead if they can't be found."""
+    user = await resolve_user(discord_user_id)
+    if user is None:
+        log.warning("Can't DM user %d, they weren't found.", discord_user_id)
+        return
+    await user.send(message, delete_after=const.DEFAULT_MESSAGE_DELETE_DELAY)
 
-    auth_url = f"{FENIX_BASE_URL}/oauth/userdialog?client_id={FENIX_CLIENT_ID}&redirect_uri={FENIX_REDIRECT_URI}&state={auth_id}"
 
-    # add the state to the auth_connections dictionary TODO: add
-    async with auth_connections_lock:
-        auth_connections[auth_id] = interaction
+async def grant_role(job: Job[AuthPayload]) -> None:
+    member = None
+    if const.guild is not None:
+        # Members aren't cached (see src.utils.gateway), fetch on demand
+        member = await resolve_member(const.guild, job.payload.discord_user_id)
+    if member is None:
+        raise NotInGuildError(Outcome.NOT_IN_SERVER.message)
+    assert const.ist_player_role is not None, "IST Player role is None"
+    await member.add_roles(const.ist_player_role)
 
-    # Schedule cleanup task
-    asyncio.create_task(cleanup_auth_connection(auth_id))
 
-    return auth_url
+async def grant_role_failed(job: Job[AuthPayload], e: Exception) -> str:
+    log.error("Failed to add role to user: %s", e)
+    await send_dm(
+        job.payload.discord_user_id,
+        f"Failed to add role to user: {e} \n\n Please contact the server admins.",
+    )
+    if isinstance(e, NotInGuildError):
+        return Outcome.NOT_IN_SERVER.message
+    return Outcome.ROLE_FAILED.message
+
+
+async def store_player(job: Job[AuthPayload]) -> None:
+    await db.add_ist(
+        ISTPlayer(
+            id=job.payload.ist_id,
+            discord_id=str(job.payload.discord_user_id),
+            minecraft_name=None,
+            invited_ids=[],
+            invite_limit=const.MAX_INVITES,
+        )
+    )
 
 
-async def exchange_code_for_token(
-    auth_code: str, session: aiohttp.ClientSession
-) -> dict[str, str] | None:
-    """
-    Exchanges an authorization code for an access token and refresh token.
+async def store_player_failed(job: Job[AuthPayload], e: Exception) -> str:
+    log.error("Failed to add IST player to the database: %s", e)
+    await send_dm(
+        job.payload.discord_user_id,
+        f"Failed to add IST player to the database: {e} \n\n If you think this is a mistake, please contact the server admins.",
+    )
+    if not isinstance(e, PlayerAlreadyExistsError) and const.guild is not None:
+        member = await resolve_member(const.guild, job.payload.discord_user_id)
+        if member is not None:
+            assert const.ist_player_role is not None, "IST Player role is None"
+            await member.remove_roles(const.ist_player_role)
+    return Outcome.DB_FAILED.message
 
-    Args:
-        auth_code: The authorization code received from the FenixEdu callback.
-        session: An active aiohttp.ClientSession instance.
 
-    Returns:
-        A dictionary containing token information (access_token, refresh_token,
-        expires_in, etc.) if successful, None otherwise.
-    """
-    if not auth_code:
-        print("ERROR: exchange_code_for_token called without an authorization code.")
-        return None
-
-    token_url = f"{FENIX_BASE_URL}{ACCESS_TOKEN_PATH}"
-    # Use base registered URI for token exchange based on Fenix docs example
-    redirect_uri_for_exchange = FENIX_REDIRECT_URI.split("?")[0]
-
-    token_payload = {
-        "client_id": FENIX_CLIENT_ID,
-        "client_secret": FENIX_CLIENT_SECRET,
-        "redirect_uri": redirect_uri_for_exchange,
-        "code": auth_code,
-        "grant_type": "authorization_code",
-    }
-    headers = {
-        "Accept": "application/json",
-        "Content-Type": "application/x-www-form-urlencoded",
-    }
-
-    try:
-        timeout = aiohttp.ClientTimeout(total=API_REQUEST_TIMEOUT)
-        async with session.post(
-            token_url, data=token_payload, headers=headers, timeout=timeout
-        ) as response:
-            if response.status == 200:
-                try:
-                    token_data = await response.json()
-                    return token_data
-                except aiohttp.ContentTypeError:
-                    resp_text = await response.text()
-                    print(
-                        f"Failed to decode JSON response from {token_url}. Response: {resp_text[:200]}"
-                    )
-                    return None
-            else:
-                error_details = await response.text()
-                print(
-                    f"Failed to exchange code for token. Status: {response.status}, Details: {error_details[:200]}"
-                )
-                return None
-    except asyncio.TimeoutError:
-        print(f"ERROR: Request to {token_url} timed out during code exchange.")
-        return None
-    except aiohttp.ClientError as e:
-        print(f"ERROR: Network or HTTP error during code exchange: {e}")
-        return None
-    except Exception as e:
-        print(f"ERROR: Unexpected error during code exchange: {e}")
-        return None
-
-
-async def get_fenix_user_info(
-    access_token: str, session: aiohttp.ClientSession
-) -> dict[str, str] | None:
-    """
-    Fetches user information from the FenixEdu /person API endpoint.
+async def notify_user(job: Job[AuthPayload]) -> None:
+    await send_dm(
+        job.payload.discord_user_id,
+        "Authentication successful! Welcome to the server!\n\n"
+        "Use /link to link your Minecraft account if you want to play on the server.",
+    )
 
-    Args:
-        access_token: The valid OAuth 2.0 access token for the user.
-        session: An active aiohttp.ClientSession instance.
 
-    Returns:
-        A dictionary containing the user's information if successful, None otherwise.
-        The 'username' field typically holds the IST ID (e.g., istXXXXXX).
-    """
-    if not access_token:
-        print("get_fenix_user_info called without an access token.")
-        return None
-
-    target_url = f"{FENIX_BASE_URL}{PERSON_API_PATH}"
-    headers = {"Authorization": f"Bearer {access_token}"}
-
-    try:
-        timeout = aiohttp.ClientTimeout(total=API_REQUEST_TIMEOUT)
-        async with session.get(
-            target_url, headers=headers, timeout=timeout
-        ) as response:
-            if response.status == 200:
-                try:
-                    person_data = await response.json()
-                    return person_data
-                except aiohttp.ContentTypeError:
-                    resp_text = await response.text()
-                    print(
-                        f"Failed to decode JSON response from {target_url}. Response: {resp_text[:200]}"
-                    )
-                    return None
-            else:
-                error_details = await response.text()
-                print(
-                    f"Failed to fetch user info. Status: {response.status}, Details: {error_details[:200]}"
-                )
-                return None
-    except asyncio.TimeoutError:
-        print(f"Request to {target_url} timed out.")
-        return None
-    except aiohttp.ClientError as e:
-        print(f"Network or HTTP error fetching user info: {e}")
-        return None
-    except Exception as e:
-        print(f"Unexpected error fetching user info: {e}")
-        return None
-
-
-async def handle_callback(request: web.Request) -> web.Response:
-    """Handles the OAuth callback from FenixEdu."""
-    # Set html content for response
-    html_content1 = """
-        <html>
-            <head>
-                <style>
-                    body {{
-                        font-family: Arial, sans-serif;
-                        text-align: center;
-                        margin-top: 50px;
-                    }}
-                    h1 {{
-                        color: #333;
-                    }}
-                    p {{
-                        font-size: 18px;
-                    }}
-                    #countdown {{
-                        font-weight: bold;
-                        color: red;
-                    }}
-                </style>
-                <title>Authentication Callback</title>
-                <script>
-                    let timeLeft = 10;
-                    function updateCountdown() {{
-                        document.getElementById('countdown').textContent = timeLeft;
-                        if (timeLeft == 0) {{
-                            window.close();
-                        }} else {{
-                            timeLeft--;
-                            setTimeout(updateCountdown, 1000);
-                        }}
-                    }}
-                    window.onload = updateCountdown;
-                </script>
-            </head>
-            <body>
-                <h1>Authentication Callback Received</h1>
-                <p>"""
-
-    result = "Authentication successful!"
-
-    html_content2 = """This window will close in <span id="countdown">5</span> seconds.</p>
-            </body>
-        </html>
-    """
+async def notify_user_failed(job: Job[AuthPayload], e: Exception) -> None:
+    # The user is fully set up at this point, a missing DM isn't fatal
+    log.warning("Failed to send the welcome DM: %s", e)
 
-    # Extract parameters from query
-    auth_code = request.query.get("code", None)
-    auth_id = request.query.get("state", None)
 
-    if not auth_code or not auth_id:
-        print("Callback received without code or state.")
-        result = "Invalid Callback Parameters... Contact the server admins."
-        return web.Response(
-            text=html_content1 + result + html_content2, content_type="text/html"
-        )
+auth_pipeline: Pipeline[AuthPayload] = Pipeline(
+    stages=[
+        Stage("grant_role", grant_role, grant_role_failed),
+        Stage("store_player", store_player, store_player_failed),
+        Stage("notify_user", notify_user, notify_user_failed),
+    ],
+    on_success=lambda job: Outcome.SUCCESS.message,
+)
+registry.gauge(
+    "auth_pipeline_queued_jobs",
+    "Logins waiting for a pipeline worker.",
+    lambda: len(auth_pipeline),
+)
 
-    # Check if the auth_id is valid and retrieve the interaction
-    interaction = None
-    async with auth_connections_lock:
-        interaction = auth_connections.pop(auth_id, None)
 
-    if not interaction:
-        print("No interaction found for the provided auth_id.")
-        result = "Interaction Missing... Contact the server admins."
-        return web.Response(
-            text=html_content1 + result + html_content2, content_type="text/html"
-        )
+# --------------------------
+# 🔀 LOGIN HAND-OFF
+# --------------------------
+class LocalLogins(Logins):
+    async def submit(self, state: str, discord_user_id: int, ist_id: str) -> bool:
+        return auth_pipeline.submit(state, AuthPayload(discord_user_id, ist_id))
 
-    # Gather user info from FenixEdu
-    async with aiohttp.ClientSession() as session:
-        token_result = await exchange_code_for_token(auth_code, session)
-        if not token_result:
-            print("Token exchange failed. No result returned.")
-            result = "Token exchange failed."
-            await interaction.user.send(
-                "Failed to authenticate. Please try again. \n\n if the problem persists, contact the server admins.",
-                delete_after=const.DEFAULT_MESSAGE_DELETE_DELAY,
-            )
-            return web.Response(
-                text=html_content1 + result + html_content2, content_type="text/html"
-            )
-
-        user_info = await get_fenix_user_info(token_result["access_token"], session)
-        if not user_info:
-            print("Failed to fetch user info. No result returned.")
-            result = "Failed to fetch user info."
-            await interaction.user.send(
-                "Failed to authenticate. Please try again. \n\n if the problem persists, contact the server admins.",
-                delete_after=const.DEFAULT_MESSAGE_DELETE_DELAY,
-            )
-            return web.Response(
-                text=html_content1 + result + html_content2, content_type="text/html"
-            )
-
-    try:
-        if isinstance(interaction.user, discord.Member):
-            assert const.ist_player_role is not None, "IST Player role is None"
-            await interaction.user.add_roles(const.ist_player_role)
-        else:
-            print("Interaction user is not a member of the guild.")
-            result = "User isn't in the server. Please contact the server admins."
-            raise ValueError(result)
-    except Exception as e:
-        print(f"Failed to add role to user: {e}")
-        result = (
-            f"Failed to add role to user: {e} \n\n Please contact the server admins."
-        )
-        await interaction.user.send(
-            result, delete_after=const.DEFAULT_MESSAGE_DELETE_DELAY
-        )
-        return web.Response(
-            text=html_content1 + result + html_content2, content_type="text/html"
-        )
+    async def notify(self, discord_user_id: int, message: str) -> None:
+        await send_dm(discord_user_id, message)
 
-    # add the user to the database
-    ist_player = ISTPlayer(
-        id=user_info["username"],
-        discord_id=str(interaction.user.id),
-        minecraft_name=None,
-        invited_ids=[],
-        invite_limit=const.MAX_INVITES,
-    )
+    async def status(self, state: str) -> Optional[tuple[str, str]]:
+        job = auth_pipeline.status(state)
+        return None if job is None else (job.status.value, job.message)
 
-    try:
-        db.add_ist(ist_player)
-    except Exception as e:
-        print(f"Failed to add IST player to the database: {e}")
-        result = f"Failed to add IST player to the database: {e} \n\n If you think this is a mistake, please contact the server admins."
-        await interaction.user.send(
-            result, delete_after=const.DEFAULT_MESSAGE_DELETE_DELAY
-        )
-        if not isinstance(e, PlayerAlreadyExistsError):
-            await interaction.user.remove_roles(const.ist_player_role)
-        return web.Response(
-            text=html_content1 + result + html_content2,
-            content_type="text/html",
-        )
 
-    # Success!
-    await interaction.user.send(
-        "Authentication successful! Welcome to the server!\n\n"
-        "Use /link to link your Minecraft account if you want to play on the server.",
-        delete_after=const.DEFAULT_MESSAGE_DELETE_DELAY,
-    )
+local_logins = LocalLogins()
 
-    return web.Response(
-        text=html_content1 + result + html_content2, content_type="text/html"
-    )
+
+async def handle_ipc(message: Message) -> Message:
+    """Answers a web worker's request (see src.server.worker.RemoteLogins)."""
+    with bind(**message.get("context", {})):
+        match message.get("type"):
+            case "submit":
+                accepted = await local_logins.submit(
+                    message["state"], int(message["discord_user_id"]), message["ist_id"]
+                )
+                return {"accepted": accepted}
+            case "notify":
+                await local_logins.notify(int(message["discord_user_id"]), message["message"])
+                return {}
+            case "status":
+                status = await local_logins.status(message["state"])
+                return {"status": None if status is None else list(status)}
+            case other:
+                raise ValueError(f"Unknown IPC request type '{other}'")
 
 
 # TODO: Update the URL to use a domain instead of localhost when deployed.
 @beartype
 async def start_server(bot: commands.Bot) -> None:
-    """Starts the AIOHTTP web server."""
-    if not FENIX_CLIENT_ID or not FENIX_REDIRECT_URI:
+    """
+    Starts the AIOHTTP web server, or with WEB_TIER=workers, the IPC server
+    the web workers hand their logins to.
+    """
+    global runner, ipc_server
+    if not callback.FENIX_CLIENT_ID or not callback.FENIX_REDIRECT_URI:
         raise ValueError(
             "FENIX_CLIENT_ID and FENIX_REDIRECT_URI must be set and not None."
         )
+    if WEB_TIER not in ("local", "workers"):
+        raise ValueError(f"Unknown WEB_TIER '{WEB_TIER}'. Use 'local' or 'workers'.")
+    if WEB_TIER == "workers" and not isinstance(callback.state_store, SQLiteStateStore):
+        raise ValueError("WEB_TIER=workers needs AUTH_STATE_STORE=sqlite.")
+
+    const.bot = bot  # Lets the pipeline DM users by id
+    await http_client.start()
+    loop_lag_sampler.start()
+    if diagnostics.DIAGNOSTICS:
+        diagnostics.watchdog.start()
+    callback.state_store.start()
+    auth_pipeline.start()
+    whitelist_sync.start()
+
+    if WEB_TIER == "workers":
+        ipc_server = IPCServer(handle_ipc)
+        await ipc_server.start()
+        return
 
-    app = web.Application()
-    app["bot"] = bot  # Make bot accessible in handlers
-    app.router.add_get("/callback", handle_callback)
-
-    runner = web.AppRunner(app)
+    runner = web.AppRunner(create_app(local_logins))
     await runner.setup()
-    # Extract host and port from REDIRECT_URI for binding
-    # Basic parsing, assumes http://host:port/path format
-    try:
-        from urllib.parse import urlparse
-
-        parsed_uri = urlparse(FENIX_REDIRECT_URI)
-        host = parsed_uri.hostname or "localhost"
-        port = parsed_uri.port or 8080  # Default port if not specified
-    except Exception:
-        host = "localhost"
-        port = 8080
-        print(
-            f"Warning: Could not parse REDIRECT_URI ('{FENIX_REDIRECT_URI}'). Defaulting server to {host}:{port}"
-        )
-
+    host, port = callback_address()
     site = web.TCPSite(runner, host, port)
     await site.start()
-    print(f"Web server started on {host}:{port}")
+    log.info("Web server started on %s:%d", host, port)
 
 
 @beartype
 async def stop_server() -> None:
     """Stops the AIOHTTP web server."""
-    if runner is None:
-        print("Web server is not running.")
-        return
-
-    await runner.cleanup()
-    print("Web server stopped.")
+    if ipc_server is not None:
+        await ipc_server.stop()
+        log.info("IPC server stopped.")
+    elif runner is None:
+        log.warning("Web server is not running.")
+    else:
+        await runner.cleanup()
+        log.info("Web server stopped.")
+
+    # Let queued logins finish before the database and HTTP client go away
+    await auth_pipeline.stop()
+    await db.flush()
+
+    # Close pooled connections once no handler can use them anymore
+    await whitelist_sync.stop()
+    await http_client.close()
+    await callback.state_store.stop()
+    await loop_lag_sampler.stop()
+    await diagnostics.watchdog.stop()
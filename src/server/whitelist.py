@@ -0,0 +1,315 @@
+"""
+Durable queue of whitelist changes, drained in the background.
+
+`/link` and `/unlink` only enqueue an add/remove keyed by UUID. The queue is
+persisted to disk on every change, so pending operations survive a restart,
+and a worker sends them to the panel in rate-limited batches, retrying
+failures with backoff. A periodic reconciliation pass compares the database
+with the server's whitelist and enqueues whatever is missing.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Literal, Optional, cast
+
+from src.db.aio import db
+from src.db.player import is_ist_player
+from src.db.storage import DATA_DIR, atomic_write_json
+from src.errors.db import ConcurrentModificationError
+from src.errors.server import UpstreamError
+from src.server.requests import fetch_uuids_bulk, fetch_whitelist, send_whitelist_op
+from src.utils.metrics import registry
+from src.utils.ratelimit import AsyncRateLimiter
+
+log = logging.getLogger(__name__)
+
+# --- Configuration ---
+WHITELIST_QUEUE_PATH = os.path.join(DATA_DIR, "whitelist_queue.json")
+WHITELIST_BATCH_SIZE = int(os.getenv("WHITELIST_BATCH_SIZE", "20"))
+WHITELIST_RATE = float(os.getenv("WHITELIST_RATE", "5"))  # requests/second
+WHITELIST_BURST = int(os.getenv("WHITELIST_BURST", "5"))
+WHITELIST_MAX_BACKOFF = float(os.getenv("WHITELIST_MAX_BACKOFF", "300"))
+WHITELIST_RECONCILE_INTERVAL = float(os.getenv("WHITELIST_RECONCILE_INTERVAL", "3600"))
+# Removing entries the database doesn't know about would also drop players
+# whitelisted by hand, so pruning is opt-in
+WHITELIST_PRUNE = os.getenv("WHITELIST_PRUNE", "0") == "1"
+# --- End Configuration ---
+
+Action = Literal["add", "remove"]
+
+# What reconciliation reads of each player. `invite_limit` / `invited_by`
+# only tell the two player types apart, to find the table a UUID goes to.
+RECONCILE_FIELDS = ("id", "minecraft_name", "minecraft_uuid", "invite_limit", "invited_by")
+
+
+@dataclass(slots=True)
+class WhitelistOp:
+    action: Action
+    uuid: str
+    name: str
+    attempts: int = 0
+    next_attempt: float = 0.0  # wall-clock time, so it survives restarts
+    in_flight: bool = False
+
+
+class WhitelistSync:
+    def __init__(self, path: str = WHITELIST_QUEUE_PATH):
+        self.path = path
+        self.limiter = AsyncRateLimiter(WHITELIST_RATE, WHITELIST_BURST)
+        self._ops: dict[str, WhitelistOp] = {}  # uuid -> pending operation
+        self._persist_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task[None]] = []
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._ops)
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        ops: dict[str, WhitelistOp] = {}
+        try:
+            with open(self.path) as f:
+                for raw in cast(list[dict[str, Any]], json.load(f)):
+                    op = WhitelistOp(**raw)
+                    op.in_flight = False  # Whatever was being sent gets resent
+                    ops[op.uuid] = op
+        except (ValueError, TypeError, AttributeError) as e:
+            # Don't take the bot down over it; reconciliation re-enqueues
+            # whatever the whitelist is missing
+            corrupt_path = f"{self.path}.corrupt-{time.time_ns()}"
+            os.replace(self.path, corrupt_path)
+            log.error(
+                "Whitelist queue %s is unreadable (%s), moved it to %s and started empty",
+                self.path,
+                e,
+                corrupt_path,
+            )
+            return
+        self._ops = ops
+
+    async def _persist(self) -> None:
+        snapshot = [asdict(op) for op in self._ops.values()]
+        async with self._persist_lock:
+            await asyncio.to_thread(atomic_write_json, self.path, snapshot)
+
+    # --------------------------
+    # 📥 ENQUEUE
+    # --------------------------
+    async def enqueue(self, action: Action, uuid: str, name: str) -> None:
+        """
+        Queue a whitelist change for `uuid`.
+
+        A repeat of the pending action is dropped, and an opposite action
+        cancels a pending one that hasn't been sent yet (add-then-remove is a
+        no-op). If the pending one is already in flight, the new action
+        replaces it and is sent afterwards.
+        """
+        uuid = uuid.lower()
+        current = self._ops.get(uuid)
+        if current is not None and not current.in_flight:
+            if current.action == action:
+                if current.name == name:
+                    return
+                current.name = name  # Keep the newer name across a restart
+            else:
+                del self._ops[uuid]
+        else:
+            self._ops.pop(uuid, None)  # Re-insert at the back of the queue
+            self._ops[uuid] = WhitelistOp(action=action, uuid=uuid, name=name)
+            self._wakeup.set()
+        await self._persist()
+
+    async def enqueue_add(self, uuid: str, name: str) -> None:
+        await self.enqueue("add", uuid, name)
+
+    async def enqueue_remove(self, uuid: str, name: str) -> None:
+        await self.enqueue("remove", uuid, name)
+
+    # --------------------------
+    # 📤 WORKER
+    # --------------------------
+    async def _send(self, op: WhitelistOp) -> Optional[Exception]:
+        await self.limiter.acquire()
+        try:
+            await send_whitelist_op(
+                "POST" if op.action == "add" else "DELETE", op.uuid, op.name
+            )
+        except Exception as e:
+            return e
+        return None
+
+    async def drain_once(self) -> int:
+        """Send one batch of due operations. Returns how many were attempted."""
+        now = time.time()
+        batch = [
+            op for op in self._ops.values() if not op.in_flight and op.next_attempt <= now
+        ][:WHITELIST_BATCH_SIZE]
+        if not batch:
+            return 0
+
+        for op in batch:
+            op.in_flight = True
+        errors = await asyncio.gather(*(self._send(op) for op in batch))
+
+        for op, error in zip(batch, errors):
+            op.in_flight = False
+            if error is None:
+                # Only drop it if no newer operation replaced it meanwhile
+                if self._ops.get(op.uuid) is op:
+                    del self._ops[op.uuid]
+                continue
+            op.attempts += 1
+            delay = min(WHITELIST_MAX_BACKOFF, 2.0**op.attempts)
+            op.next_attempt = time.time() + delay
+            log.warning(
+                "Whitelist %s for %s failed (attempt %d), retrying in %.0fs: %s",
+                op.action,
+                op.name,
+                op.attempts,
+                delay,
+                error,
+                extra={"uuid": op.uuid},
+            )
+
+        await self._persist()
+        return len(batch)
+
+    def _next_due_in(self) -> Optional[float]:
+        pending = [op.next_attempt for op in self._ops.values() if not op.in_flight]
+        if not pending:
+            return None
+        return max(0.0, min(pending) - time.time())
+
+    async def _drain_loop(self) -> None:
+        while True:
+            try:
+                if await self.drain_once():
+                    continue
+            except Exception as e:
+                log.exception("Whitelist sync failed: %s", e)
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._next_due_in())
+            except asyncio.TimeoutError:
+                pass
+
+    # --------------------------
+    # 🔁 RECONCILIATION
+    # --------------------------
+    async def reconcile(self) -> tuple[int, int]:
+        """
+        Diff the database against the server whitelist and enqueue the delta.
+
+        Returns the number of (adds, removes) enqueued. Players whose UUID is
+        resolved here get it stored so the next pass doesn't need Mojang.
+        """
+        server = await fetch_whitelist()
+
+        # One streamed pass over the roster, reading only what's needed here
+        desired: dict[str, str] = {}
+        unresolved: list[dict[str, Any]] = []
+        async for player in db.iter_players(fields=RECONCILE_FIELDS):
+            name = player["minecraft_name"]
+            if not name:
+                continue
+            uuid = player.get("minecraft_uuid")
+            if uuid:
+                desired[uuid.lower()] = name
+            else:
+                unresolved.append(player)
+
+        resolved = await fetch_uuids_bulk([p["minecraft_name"] for p in unresolved])
+        for player in unresolved:
+            name = player["minecraft_name"]
+            uuid = resolved.get(name)
+            if uuid and await self._store_uuid(player, uuid):
+                desired[uuid.lower()] = name
+
+        # Leave UUIDs with a queued operation alone, the queue will settle them
+        adds = [
+            (uuid, name)
+            for uuid, name in desired.items()
+            if uuid not in server and uuid not in self._ops
+        ]
+        removes = (
+            [
+                (uuid, name)
+                for uuid, name in server.items()
+                if uuid not in desired and uuid not in self._ops
+            ]
+            if WHITELIST_PRUNE
+            else []
+        )
+        for uuid, name in adds:
+            await self.enqueue_add(uuid, name)
+        for uuid, name in removes:
+            await self.enqueue_remove(uuid, name)
+        return len(adds), len(removes)
+
+    async def _store_uuid(self, player: dict[str, Any], uuid: str) -> bool:
+        """
+        Store the UUID resolved for a projected `player`, unless the player
+        was relinked or removed while Mojang was asked. Returns whether it
+        was stored.
+        """
+        table = "ist_players" if "invite_limit" in player else "invited_players"
+        try:
+            async with db.transaction() as tx:
+                current = await tx.find_player(player["id"])
+                if (
+                    current is None
+                    or is_ist_player(current) != (table == "ist_players")
+                    or current["minecraft_name"] != player["minecraft_name"]
+                ):
+                    return False
+                await tx.update(table, {"id": player["id"], "minecraft_uuid": uuid})
+        except ConcurrentModificationError:
+            return False
+        return True
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            try:
+                adds, removes = await self.reconcile()
+                if adds or removes:
+                    log.info(
+                        "Whitelist reconciliation queued %d adds and %d removes.", adds, removes
+                    )
+            except UpstreamError as e:
+                log.warning("Whitelist reconciliation skipped: %s", e.message)
+            except Exception as e:
+                log.exception("Whitelist reconciliation failed: %s", e)
+            await asyncio.sleep(WHITELIST_RECONCILE_INTERVAL)
+
+    # --------------------------
+    # 🚀 LIFECYCLE
+    # --------------------------
+    def start(self, reconcile: bool = True) -> None:
+        if self._tasks:
+            return
+        self._tasks.append(asyncio.create_task(self._drain_loop()))
+        if reconcile and WHITELIST_RECONCILE_INTERVAL > 0:
+            self._tasks.append(asyncio.create_task(self._reconcile_loop()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._persist()
+
+
+# Global instance for import
+whitelist_sync = WhitelistSync()
+registry.gauge(
+    "whitelist_pending_operations",
+    "Whitelist changes not yet accepted by the panel.",
+    lambda: len(whitelist_sync),
+)
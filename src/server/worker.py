@@ -0,0 +1,183 @@
+"""
+Serve `/callback` from worker processes, separately from the bot.
+
+    python -m src.server.worker --workers 4
+
+Every worker binds the callback port with SO_REUSEPORT, so the kernel spreads
+connections across them. They take pending logins from the shared SQLite
+state store and hand completed ones to the bot process over IPC (see
+`src.server.ipc`), so run the bot with:
+
+    WEB_TIER=workers AUTH_STATE_STORE=sqlite IPC_SECRET=...
+
+and the workers with the same AUTH_STATE_STORE, AUTH_STATE_DB and IPC_*
+settings. Rate limits and `/metrics` are per worker.
+
+Workers only load `src.server.callback`, never the database or the bot: all
+they need from the bot process goes over IPC.
+"""
+
+# Load environment variables before any module reads its settings. Spawned
+# workers re-import this module, so this also runs in each of them.
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+from typing import Optional
+
+from aiohttp import web
+
+from src.errors.server import IPCError
+from src.server import callback
+from src.server.http_client import http_client
+from src.server.ipc import IPCClient
+from src.server.state_store import SQLiteStateStore
+from src.utils.log import current_context, set_context, setup_logging, stop_logging
+from src.utils.metrics import loop_lag_sampler
+
+log = logging.getLogger(__name__)
+
+# --- Configuration ---
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(os.cpu_count() or 1)))
+# --- End Configuration ---
+
+
+class RemoteLogins(callback.Logins):
+    """Hands completed logins to the bot process over IPC."""
+
+    def __init__(self, client: IPCClient):
+        self.client = client
+
+    async def submit(self, state: str, discord_user_id: int, ist_id: str) -> bool:
+        try:
+            reply = await self.client.request(
+                "submit",
+                state=state,
+                discord_user_id=discord_user_id,
+                ist_id=ist_id,
+                context=current_context(),
+            )
+        except IPCError as e:
+            # Same answer as a full pipeline: the user retries /auth later
+            log.error("Failed to hand the login to the bot: %s", e)
+            return False
+        return bool(reply["accepted"])
+
+    async def notify(self, discord_user_id: int, message: str) -> None:
+        try:
+            await self.client.request(
+                "notify",
+                discord_user_id=discord_user_id,
+                message=message,
+                context=current_context(),
+            )
+        except IPCError as e:
+            log.error("Failed to have the bot DM user %d: %s", discord_user_id, e)
+
+    async def status(self, state: str) -> Optional[tuple[str, str]]:
+        try:
+            reply = await self.client.request("status", state=state)
+        except IPCError as e:
+            log.warning("Failed to get the login status from the bot: %s", e)
+            return None
+        status = reply["status"]
+        return None if status is None else (status[0], status[1])
+
+
+async def serve(host: str, port: int, reuse_port: bool) -> None:
+    """Run one worker until it is cancelled."""
+    if not isinstance(callback.state_store, SQLiteStateStore):
+        raise ValueError("Web workers need AUTH_STATE_STORE=sqlite.")
+
+    client = IPCClient()
+    await http_client.start()
+    loop_lag_sampler.start()
+    callback.state_store.start()
+    runner = web.AppRunner(callback.create_app(RemoteLogins(client)))
+    await runner.setup()
+    try:
+        site = web.TCPSite(runner, host, port, reuse_port=reuse_port)
+        await site.start()
+        log.info("Web worker %d serving on %s:%d", os.getpid(), host, port)
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await client.close()
+        await callback.state_store.stop()
+        await loop_lag_sampler.stop()
+        await http_client.close()
+
+
+def _interrupt(signum: int, frame: object) -> None:
+    raise KeyboardInterrupt
+
+
+def run_worker(index: int, host: str, port: int, reuse_port: bool) -> None:
+    """Entry point of a worker process."""
+    # Shut down cleanly on SIGTERM too (process managers, `terminate()`)
+    signal.signal(signal.SIGTERM, _interrupt)
+    setup_logging()
+    set_context(worker=index)
+    try:
+        asyncio.run(serve(host, port, reuse_port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_logging()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.server.worker",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--workers", type=int, default=WEB_WORKERS)
+    args = parser.parse_args()
+
+    signal.signal(signal.SIGTERM, _interrupt)
+    setup_logging()
+    host, port = callback.callback_address()
+    workers = max(1, args.workers)
+    reuse_port = sys.platform != "win32"
+    if not reuse_port and workers > 1:
+        log.warning("SO_REUSEPORT isn't available on Windows, starting 1 worker.")
+        workers = 1
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=run_worker,
+            args=(index, host, port, reuse_port),
+            name=f"web-worker-{index}",
+        )
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    log.info("Started %d web workers on %s:%d", workers, host, port)
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        log.info("Stopping web workers...")
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.kill()
+    finally:
+        stop_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ from discord.ext.commands import Bot
 from pathlib import Path
 from beartype import beartype
 
+from src.utils.diagnostics import profile_new_handlers
+
 
 @beartype
 def load_all_from(folder: Path, bot: Bot, is_event: bool = False) -> None:
@@ -14,6 +16,7 @@ def load_all_from(folder: Path, bot: Bot, is_event: bool = False) -> None:
         module = importlib.import_module(f"src.{module_name}")
 
         if hasattr(module, "setup"):
-            module.setup(bot)
+            with profile_new_handlers(bot):
+                module.setup(bot)
         elif is_event:
             raise AttributeError(f"{file.name} is missing a `setup(bot)` function")
@@ -0,0 +1,331 @@
+"""
+Opt-in diagnostics for finding what blocks the event loop (DIAGNOSTICS=1).
+
+- `StallWatchdog`: a heartbeat task on the loop and a watcher thread. When
+  the heartbeat is late by more than DIAGNOSTICS_STALL_THRESHOLD, the thread
+  captures the loop thread's stack, i.e. whatever is hogging it right now.
+- `profiled`: runs a coroutine one step at a time, recording wall time, the
+  CPU time of its own steps (not of other tasks interleaved with it) and its
+  longest step, which is how long it held the loop in one go.
+- Handlers registered through `load_all_from` and every aiohttp route are
+  profiled; `/diagnostics` reports the top handlers over a rolling window of
+  recent calls, plus the latest stalls. It needs DIAGNOSTICS_TOKEN as a bearer
+  token, like `/metrics` (see `src.utils.metrics.require_token`).
+
+With DIAGNOSTICS unset, nothing here is wrapped or started.
+"""
+
+import asyncio
+import functools
+import inspect
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Coroutine, Generator, TypeVar, cast
+
+import discord
+from aiohttp import web
+from discord import app_commands
+from discord.ext.commands import Bot
+
+from src.utils.metrics import require_token
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# --- Configuration ---
+DIAGNOSTICS = os.getenv("DIAGNOSTICS", "0") == "1"
+DIAGNOSTICS_STALL_THRESHOLD = float(os.getenv("DIAGNOSTICS_STALL_THRESHOLD", "0.1"))
+DIAGNOSTICS_HEARTBEAT = float(os.getenv("DIAGNOSTICS_HEARTBEAT", "0.02"))
+DIAGNOSTICS_WINDOW = int(os.getenv("DIAGNOSTICS_WINDOW", "1000"))  # calls per handler
+DIAGNOSTICS_TOP_N = int(os.getenv("DIAGNOSTICS_TOP_N", "10"))
+# Bearer token for `/diagnostics`; unset, the endpoint isn't served
+DIAGNOSTICS_TOKEN = os.getenv("DIAGNOSTICS_TOKEN")
+# --- End Configuration ---
+
+
+# --------------------------
+# ⏱️ HANDLER PROFILING
+# --------------------------
+@dataclass(slots=True)
+class Sample:
+    wall: float
+    cpu: float
+    max_step: float
+    steps: int
+
+
+class _Profiled:
+    """Awaitable driving `coro` step by step and timing each step."""
+
+    __slots__ = ("coro", "cpu", "max_step", "steps")
+
+    def __init__(self, coro: Coroutine[Any, Any, Any]):
+        self.coro = coro
+        self.cpu = 0.0
+        self.max_step = 0.0
+        self.steps = 0
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        value: Any = None
+        error: BaseException | None = None
+        while True:
+            wall_start = time.perf_counter()
+            cpu_start = time.thread_time()
+            try:
+                if error is not None:
+                    yielded = self.coro.throw(error)
+                else:
+                    yielded = self.coro.send(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.cpu += time.thread_time() - cpu_start
+                self.max_step = max(self.max_step, time.perf_counter() - wall_start)
+                self.steps += 1
+
+            try:
+                value, error = (yield yielded), None
+            except GeneratorExit:
+                self.coro.close()
+                raise
+            except BaseException as e:  # Forwarded into the coroutine, e.g. cancellation
+                value, error = None, e
+
+
+class Profiler:
+    """Rolling per-handler samples, reported as a top-N."""
+
+    def __init__(self, window: int = DIAGNOSTICS_WINDOW):
+        self.window = window
+        self._samples: dict[str, deque[Sample]] = {}
+
+    async def profiled(self, name: str, coro: Coroutine[Any, Any, T]) -> T:
+        """Await `coro`, recording its timings under `name`."""
+        step = _Profiled(coro)
+        start = time.perf_counter()
+        try:
+            return await step
+        finally:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(
+                Sample(time.perf_counter() - start, step.cpu, step.max_step, step.steps)
+            )
+
+    def wrap(
+        self, name: str, func: Callable[..., Coroutine[Any, Any, T]]
+    ) -> Callable[..., Coroutine[Any, Any, T]]:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            return await self.profiled(name, func(*args, **kwargs))
+
+        return wrapper
+
+    def report(self, top_n: int = DIAGNOSTICS_TOP_N) -> list[dict[str, Any]]:
+        """Handlers ranked by CPU spent on the loop over the rolling window."""
+        rows: list[dict[str, Any]] = []
+        for name, samples in self._samples.items():
+            walls = sorted(sample.wall for sample in samples)
+            rows.append(
+                {
+                    "handler": name,
+                    "calls": len(samples),
+                    "wall_p50": statistics.median(walls),
+                    "wall_p99": walls[min(len(walls) - 1, int(len(walls) * 0.99))],
+                    "cpu_total": sum(sample.cpu for sample in samples),
+                    "cpu_mean": statistics.fmean(sample.cpu for sample in samples),
+                    "max_step": max(sample.max_step for sample in samples),
+                }
+            )
+        rows.sort(key=lambda row: row["cpu_total"], reverse=True)
+        return rows[:top_n]
+
+
+# --------------------------
+# 🐢 STALL DETECTION
+# --------------------------
+@dataclass(slots=True)
+class Stall:
+    started: float  # wall-clock time
+    duration: float  # how late the heartbeat was, filled in once it recovers
+    stack: str
+
+
+class StallWatchdog:
+    """
+    Reports every time the loop fails to run a heartbeat for `threshold` seconds.
+
+    The heartbeat measures loop lag from inside the loop; the watcher thread
+    is what sees the stall while it is still happening, so it can capture
+    the stack of the code causing it.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DIAGNOSTICS_STALL_THRESHOLD,
+        heartbeat: float = DIAGNOSTICS_HEARTBEAT,
+        history: int = 50,
+    ):
+        self.threshold = threshold
+        self.heartbeat = heartbeat
+        self.stalls: deque[Stall] = deque(maxlen=history)
+        self.lag: deque[float] = deque(maxlen=1000)
+        self._beat = time.monotonic()
+        self._pending: Stall | None = None  # captured, loop not recovered yet
+        self._loop_thread = 0
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.heartbeat)
+            lag = max(0.0, time.monotonic() - self._beat - self.heartbeat)
+            self.lag.append(lag)
+            stall = self._pending
+            if stall is not None:
+                self._pending = None
+                stall.duration = lag
+                self.stalls.append(stall)
+                log.warning(
+                    "Event loop stalled for %.3fs in:\n%s", lag, stall.stack
+                )
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.threshold / 2):
+            late = time.monotonic() - self._beat - self.heartbeat
+            if late < self.threshold or self._pending is not None:
+                continue
+            # The only way to read another thread's stack; it is documented,
+            # just underscored to flag it as an implementation detail
+            frame = sys._current_frames().get(  # pyright: ignore[reportPrivateUsage]
+                self._loop_thread
+            )
+            stack = "".join(traceback.format_stack(frame)) if frame else "<unknown>"
+            self._pending = Stall(started=time.time() - late, duration=late, stack=stack)
+
+    def start(self) -> None:
+        """Start watching the running loop. Must be called on the loop thread."""
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name="stall-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def report(self) -> dict[str, Any]:
+        lag = sorted(self.lag)
+        return {
+            "lag_p50": statistics.median(lag) if lag else 0.0,
+            "lag_max": lag[-1] if lag else 0.0,
+            "stalls": [
+                {"started": stall.started, "duration": stall.duration, "stack": stall.stack}
+                for stall in reversed(self.stalls)
+            ],
+        }
+
+
+# Global instances for import
+profiler = Profiler()
+watchdog = StallWatchdog()
+
+
+# --------------------------
+# 🔌 HOOKS
+# --------------------------
+def _event_handlers(bot: Bot) -> dict[str, Any]:
+    return {
+        name: getattr(bot, name)
+        for name in dir(bot)
+        if name.startswith("on_") and inspect.iscoroutinefunction(getattr(bot, name))
+    }
+
+
+@contextmanager
+def profile_new_handlers(bot: Bot) -> Generator[None, None, None]:
+    """
+    Profile whatever slash commands, events and tree error handler get
+    registered on `bot` inside the block. Does nothing unless DIAGNOSTICS=1.
+    """
+    if not DIAGNOSTICS:
+        yield
+        return
+
+    commands_before = set(map(id, bot.tree.walk_commands()))
+    events_before = _event_handlers(bot)
+    error_handler_before = bot.tree.on_error
+    yield
+
+    for command in bot.tree.walk_commands():
+        if id(command) not in commands_before and isinstance(command, app_commands.Command):
+            command._callback = profiler.wrap(  # pyright: ignore[reportPrivateUsage]
+                f"command {command.qualified_name}",
+                command._callback,  # pyright: ignore[reportPrivateUsage]
+            )
+    for name, handler in _event_handlers(bot).items():
+        # Bound methods are recreated on every access, so compare by equality
+        if events_before.get(name) != handler:
+            setattr(bot, name, profiler.wrap(f"event {name}", handler))
+    error_handler = bot.tree.on_error
+    if error_handler != error_handler_before:
+
+        async def on_error(
+            interaction: discord.Interaction[Bot], error: app_commands.AppCommandError, /
+        ) -> None:
+            await profiler.profiled(
+                "event on_app_command_error", error_handler(interaction, error)
+            )
+
+        bot.tree.on_error = on_error
+
+
+@web.middleware
+async def profiling_middleware(
+    request: web.Request,
+    handler: Callable[[web.Request], Awaitable[web.StreamResponse]],
+) -> web.StreamResponse:
+    resource = request.match_info.route.resource
+    path = resource.canonical if resource is not None else request.path
+    coro = cast(Coroutine[Any, Any, web.StreamResponse], handler(request))
+    return await profiler.profiled(f"route {request.method} {path}", coro)
+
+
+async def handle_diagnostics(request: web.Request) -> web.Response:
+    require_token(request, DIAGNOSTICS_TOKEN)
+    return web.json_response(
+        {"handlers": profiler.report(), "loop": watchdog.report()},
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+def install(app: web.Application) -> None:
+    """Add route profiling and `/diagnostics` to `app` if DIAGNOSTICS=1."""
+    if not DIAGNOSTICS:
+        return
+    app.middlewares.insert(0, profiling_middleware)
+    app.router.add_get("/diagnostics", handle_diagnostics)
@@ -0,0 +1,100 @@
+"""
+Gateway intents and cache settings for the bot.
+
+The bot only handles slash commands in one guild and needs that guild's
+roles, so the default "minimal" profile subscribes to the `guilds` intent
+alone: no presences, messages, typing or voice events, no message cache and
+no member chunking on connect. The member cache follows the intents
+(`MemberCacheFlags.from_intents`), as discord.py would pick by default, so
+it stays right if an intent is added back. Role checks use the member each
+interaction carries (`interaction.user`, roles included); anything else is
+fetched on demand with `resolve_member`.
+
+Set BOT_CACHE_PROFILE=full to go back to `Intents.all()` and compare the
+READY time and memory printed by `on_ready`.
+"""
+
+import os
+import sys
+import time
+from typing import Any, Optional
+
+import discord
+
+import src.constants as const
+
+BOT_CACHE_PROFILE = os.getenv("BOT_CACHE_PROFILE", "minimal")
+
+# Taken at import, which happens right as the bot process starts
+PROCESS_START = time.monotonic()
+
+
+def bot_options(profile: str = BOT_CACHE_PROFILE) -> dict[str, Any]:
+    """Keyword arguments for `commands.Bot` for the given cache profile."""
+    if profile == "full":
+        return {"intents": discord.Intents.all()}
+
+    if profile == "minimal":
+        intents = discord.Intents.none()
+        intents.guilds = True  # Guild and role cache, needed for role lookups
+        return {
+            "intents": intents,
+            "max_messages": None,
+            "member_cache_flags": discord.MemberCacheFlags.from_intents(intents),
+            "chunk_guilds_at_startup": False,
+        }
+
+    raise ValueError(f"Unknown BOT_CACHE_PROFILE '{profile}'. Use 'minimal' or 'full'.")
+
+
+async def resolve_member(guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+    """Get a guild member from the cache, or fetch it if it isn't cached."""
+    member = guild.get_member(user_id)
+    if member is not None:
+        return member
+    try:
+        return await guild.fetch_member(user_id)
+    except discord.NotFound:
+        return None
+
+
+async def resolve_user(user_id: int) -> Optional[discord.User | discord.Member]:
+    """
+    Get a user to DM by id: the guild member if they are one, otherwise the
+    user from the bot's cache or the API.
+    """
+    if const.guild is not None:
+        member = await resolve_member(const.guild, user_id)
+        if member is not None:
+            return member
+    if const.bot is None:
+        return None
+    user = const.bot.get_user(user_id)
+    if user is not None:
+        return user
+    try:
+        return await const.bot.fetch_user(user_id)
+    except discord.NotFound:
+        return None
+
+
+def resident_memory_mb() -> Optional[float]:
+    """Current resident set size of the process, where the platform exposes it."""
+    if sys.platform.startswith("linux"):
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    # ru_maxrss is the peak, in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**20
+
+
+def startup_report() -> str:
+    """Time since process start and memory use, for comparing cache profiles."""
+    elapsed = time.monotonic() - PROCESS_START
+    memory = resident_memory_mb()
+    memory_text = f"{memory:.1f} MB" if memory is not None else "unknown"
+    return f"READY after {elapsed:.2f}s, RSS {memory_text} (cache profile '{BOT_CACHE_PROFILE}')"
@@ -0,0 +1,187 @@
+"""
+Logging for the bot, with formatting and I/O off the event loop.
+
+Loggers hand records to a `QueueHandler`, which only copies them onto a
+queue; a `QueueListener` thread formats them (JSON lines by default) and
+writes them to stdout. A slow pipe then stalls that thread, never the loop.
+
+Records carry the correlation ids bound in the current context (interaction
+id, OAuth `state`, `ist_id`, ...), see `bind` and `set_context`. Noisy
+messages can pass `extra={"sample": n}` to keep only one in every `n`.
+"""
+
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from contextlib import contextmanager
+from typing import IO, Any, Generator, Optional
+
+import discord
+
+# --- Configuration ---
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json | text
+# --- End Configuration ---
+
+_context: contextvars.ContextVar[dict[str, str]] = contextvars.ContextVar(
+    "log_context", default={}
+)
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+# --------------------------
+# 🔗 CORRELATION IDS
+# --------------------------
+def current_context() -> dict[str, str]:
+    return _context.get()
+
+
+def set_context(**ids: object) -> None:
+    """
+    Add ids to every record logged from now on in the current task.
+
+    Only use this where the task ends with the unit of work (a slash command
+    or modal handler); anywhere else, use `bind`.
+    """
+    _context.set({**_context.get(), **{key: str(value) for key, value in ids.items()}})
+
+
+@contextmanager
+def bind(**ids: object) -> Generator[None, None, None]:
+    """Add ids to every record logged inside the block."""
+    token = _context.set(
+        {**_context.get(), **{key: str(value) for key, value in ids.items()}}
+    )
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def bind_interaction(interaction: discord.Interaction) -> None:
+    """Tag the rest of an interaction's handler with its ids."""
+    set_context(interaction=interaction.id, discord_user=interaction.user.id)
+
+
+# --------------------------
+# 🧾 HANDLERS
+# --------------------------
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues records along with the caller's correlation ids.
+
+    The message and any traceback are rendered here, on the caller's thread,
+    while their arguments and frames are still as logged; only the JSON (or
+    text) line is formatted by the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        record.context = _context.get()
+        if record.exc_info:
+            # Frames may have moved on by the time the listener gets to it
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps one in every `record.sample` records of each message template."""
+
+    def __init__(self):
+        super().__init__()
+        self._seen: dict[tuple[str, object], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        every = getattr(record, "sample", None)
+        if not isinstance(every, int) or every <= 1:
+            return True
+        key = (record.name, record.msg)
+        seen = self._seen.get(key, 0)
+        self._seen[key] = seen + 1
+        if seen % every:
+            return False
+        record.sampled = every
+        return True
+
+
+# Attributes of every LogRecord, so anything else came from `extra`
+_RESERVED = set(logging.makeLogRecord({}).__dict__) | {"message", "context", "sample"}
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "context", {}))
+        entry.update(
+            (key, value) for key, value in record.__dict__.items() if key not in _RESERVED
+        )
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-8s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        context = getattr(record, "context", {})
+        if context:
+            text += " [" + " ".join(f"{key}={value}" for key, value in context.items()) + "]"
+        return text
+
+
+# --------------------------
+# 🚀 LIFECYCLE
+# --------------------------
+def setup_logging(
+    level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, stream: Optional[IO[str]] = None
+) -> None:
+    """
+    Route every logger through the queue, written to `stream` (stdout by
+    default). Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    queue_handler = ContextQueueHandler(records)
+    queue_handler.addFilter(SamplingFilter())
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JSONFormatter() if fmt == "json" else TextFormatter())
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(
+        records, output, respect_handler_level=True
+    )
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Write out everything still queued and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,350 @@
+"""
+In-process metrics, exposed in the Prometheus text format at `/metrics`.
+
+Every metric is updated from the event loop thread, so there is no locking:
+an update is a dict lookup plus an addition (and a bisect for histograms).
+Gauges are callbacks evaluated only when `/metrics` is scraped. The endpoint
+is served next to the public OAuth callback, so it needs METRICS_TOKEN as a
+bearer token and is off while that is unset.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import secrets
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Callable, Coroutine, Generator, Iterator, Optional, TypeVar, cast
+
+import aiohttp
+from aiohttp import web
+
+log = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Bearer token for `/metrics`; unset, the endpoint isn't served
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+# --- End Configuration ---
+
+# A coroutine function, e.g. a slash command callback
+Handler = TypeVar("Handler", bound=Callable[..., Coroutine[Any, Any, Any]])
+
+NAMESPACE = "skythentic"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds; covers both in-memory lookups and slow upstream calls
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+LOOP_LAG_INTERVAL = 0.5
+
+Labels = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Labels = ()):
+        self.name = f"{NAMESPACE}_{name}"
+        self.help = help
+        self.labelnames = labelnames
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """The sample lines of this metric, in the text format."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Labels = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Labels = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = buckets
+        # Per label set: one count per bucket plus +Inf, then the sum
+        self._values: dict[Labels, list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        counts = self._values.get(labels)
+        if counts is None:
+            counts = self._values[labels] = [0.0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Generator[None, None, None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def samples(self) -> Iterator[str]:
+        bounds = [*map(_format_value, self.buckets), "+Inf"]
+        for labels, counts in self._values.items():
+            cumulative = 0.0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {_format_value(cumulative)}"
+            suffix = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{suffix} {_format_value(counts[-1])}"
+            yield f"{self.name}_count{suffix} {_format_value(cumulative)}"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, callback: Callable[[], float]):
+        super().__init__(name, help)
+        self.callback = callback
+
+    def samples(self) -> Iterator[str]:
+        yield f"{self.name} {_format_value(self.callback())}"
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def _register(self, metric: M) -> M:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Labels = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Labels = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, callback: Callable[[], float]) -> Gauge:
+        return self._register(Gauge(name, help, callback))
+
+    def render(self) -> str:
+        blocks: list[str] = []
+        for metric in self._metrics.values():
+            try:
+                blocks.append(metric.render())
+            except Exception as e:
+                # A broken gauge callback shouldn't take down the whole scrape
+                log.exception("Failed to render metric '%s': %s", metric.name, e)
+        return "\n".join(blocks) + "\n"
+
+
+# Global instance for import
+registry = Registry()
+
+command_total = registry.counter(
+    "command_total", "Slash commands and modals handled.", ("command", "outcome")
+)
+command_duration = registry.histogram(
+    "command_duration_seconds", "Time spent handling a slash command or modal.", ("command",)
+)
+rate_limited_total = registry.counter(
+    "rate_limited_total", "Requests rejected by a rate limit.", ("source", "scope")
+)
+http_requests_total = registry.counter(
+    "http_client_requests_total", "Outbound HTTP requests.", ("target", "status")
+)
+http_duration = registry.histogram(
+    "http_client_request_duration_seconds",
+    "Time until the response headers of an outbound HTTP request arrived.",
+    ("target",),
+)
+db_total = registry.counter(
+    "db_operations_total", "Database operations.", ("operation", "outcome")
+)
+db_duration = registry.histogram(
+    "db_operation_duration_seconds",
+    "Database operation time, including the wait for the database thread.",
+    ("operation",),
+)
+loop_lag = registry.histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop woke up a sleeping task.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+
+# --------------------------
+# ⏱️ INSTRUMENTATION
+# --------------------------
+@contextmanager
+def track(histogram: Histogram, counter: Counter, *labels: str) -> Generator[None, None, None]:
+    """Time a block into `histogram` and count it as "ok" or "error" in `counter`."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        histogram.observe(time.perf_counter() - start, *labels)
+        counter.inc(*labels, outcome)
+
+
+def track_command(name: str) -> Callable[[Handler], Handler]:
+    """
+    Decorator timing a command callback or `on_submit` under `name`. The
+    callback keeps its exact type, which discord.py checks command callbacks
+    and `on_submit` overrides against.
+    """
+
+    def decorator(func: Handler) -> Handler:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with track(command_duration, command_total, name):
+                return await func(*args, **kwargs)
+
+        return cast(Handler, wrapper)
+
+    return decorator
+
+
+def http_trace_config() -> aiohttp.TraceConfig:
+    """
+    Client tracing that times each request passing `trace_request_ctx={"target": ...}`.
+
+    Requests without a target are labelled "other".
+    """
+
+    async def on_request_start(
+        session: aiohttp.ClientSession,
+        context: SimpleNamespace,
+        params: aiohttp.TraceRequestStartParams,
+    ) -> None:
+        context.start = time.perf_counter()
+
+    def finish(context: SimpleNamespace, status: str) -> None:
+        ctx: dict[str, str] = context.trace_request_ctx or {}
+        target: str = ctx.get("target", "other")
+        http_duration.observe(time.perf_counter() - context.start, target)
+        http_requests_total.inc(target, status)
+
+    async def on_request_end(
+        session: aiohttp.ClientSession,
+        context: SimpleNamespace,
+        params: aiohttp.TraceRequestEndParams,
+    ) -> None:
+        finish(context, str(params.response.status))
+
+    async def on_request_exception(
+        session: aiohttp.ClientSession,
+        context: SimpleNamespace,
+        params: aiohttp.TraceRequestExceptionParams,
+    ) -> None:
+        finish(context, "error")
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
+
+
+class LoopLagSampler:
+    """Sleeps for `interval` in a loop and records how late each wake-up was."""
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self.last = 0.0
+        self._task: asyncio.Task[None] | None = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.last = max(0.0, time.perf_counter() - start - self.interval)
+            loop_lag.observe(self.last)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+loop_lag_sampler = LoopLagSampler()
+registry.gauge(
+    "event_loop_lag_last_seconds",
+    "Lag measured by the most recent loop lag sample.",
+    lambda: loop_lag_sampler.last,
+)
+
+
+def require_token(request: web.Request, token: Optional[str]) -> None:
+    """
+    Reject `request` unless it sends `Authorization: Bearer <token>`. With no
+    `token` configured the endpoint doesn't exist, so a missing setting can't
+    leave it open.
+    """
+    if not token:
+        raise web.HTTPNotFound()
+    sent = request.headers.get("Authorization", "").encode()
+    if not secrets.compare_digest(sent, f"Bearer {token}".encode()):
+        raise web.HTTPUnauthorized(headers={"WWW-Authenticate": "Bearer"})
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    require_token(request, METRICS_TOKEN)
+    return web.Response(
+        body=registry.render().encode("utf-8"),
+        headers={"Content-Type": CONTENT_TYPE, "Cache-Control": "no-store"},
+    )
@@ -0,0 +1,140 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, TypeVar
+
+import discord
+from discord import app_commands
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    Allows bursts of up to `burst` calls, refilled at `rate` calls per second.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be > 0 and burst must be >= 1")
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def try_acquire(self, now: Optional[float] = None) -> float:
+        """
+        Take a token if one is available.
+
+        Returns 0 on success, otherwise the seconds until a token frees up
+        (nothing is taken in that case).
+        """
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AsyncRateLimiter:
+    """
+    Token bucket that callers `await` before doing rate-limited work.
+
+    Waiters are served in FIFO order.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.bucket = TokenBucket(rate, burst)
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it."""
+        async with self._lock:
+            while wait := self.bucket.try_acquire():
+                await asyncio.sleep(wait)
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        return None
+
+
+class KeyedRateLimiter:
+    """
+    One token bucket per key (user id, IP address, ...).
+
+    Buckets are kept in least-recently-used order. A bucket idle for long
+    enough to have refilled completely is indistinguishable from a new one,
+    so it is evicted; `max_keys` caps memory even under a flood of new keys.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, max_keys: int = 10_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.idle_after = burst / rate
+        self._buckets: OrderedDict[Hashable, TokenBucket] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _evict(self, now: float) -> None:
+        while self._buckets:
+            oldest = next(iter(self._buckets.values()))
+            if now - oldest.updated < self.idle_after and len(self._buckets) <= self.max_keys:
+                break
+            self._buckets.popitem(last=False)
+
+    def hit(self, key: Hashable) -> float:
+        """Count a call for `key`. Returns 0 if allowed, else the retry delay."""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+        else:
+            self._buckets.move_to_end(key)
+        retry_after = bucket.try_acquire(now)
+        self._evict(now)
+        return retry_after
+
+
+# --------------------------
+# 🚦 SLASH COMMANDS
+# --------------------------
+class RateLimited(app_commands.CheckFailure):
+    """Raised by the `rate_limit` check when a command is used too often."""
+
+    def __init__(self, retry_after: float, scope: str):
+        self.retry_after = retry_after
+        self.scope = scope
+        super().__init__(f"Rate limited ({scope}), retry in {retry_after:.1f}s.")
+
+
+def rate_limit(
+    user_calls: int, user_period: float, global_calls: int, global_period: float
+) -> Callable[[T], T]:
+    """
+    App command check allowing each user `user_calls` per `user_period`
+    seconds and everyone together `global_calls` per `global_period` seconds.
+
+    Failing the check raises `RateLimited`, answered by the tree error handler.
+    """
+    per_user = KeyedRateLimiter(user_calls / user_period, user_calls)
+    overall = TokenBucket(global_calls / global_period, global_calls)
+
+    async def predicate(interaction: discord.Interaction) -> bool:
+        # Per-user first, so one spammer can't drain the global budget
+        retry_after = per_user.hit(interaction.user.id)
+        if retry_after:
+            raise RateLimited(retry_after, "user")
+        retry_after = overall.try_acquire()
+        if retry_after:
+            raise RateLimited(retry_after, "global")
+        return True
+
+    return app_commands.check(predicate)